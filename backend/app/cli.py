@@ -0,0 +1,85 @@
+"""
+Linha de comando do backend
+
+Uso:
+    python -m app.cli import <pasta-ou-zip> [--user-id ID] [--category inbox]
+    python -m app.cli reconcile <vault>
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+from .core.database import init_database
+from .services.bulk_import import BulkImport
+from .services.job_recovery import job_recovery
+from .services.job_registry import job_registry
+from .services.vault_reconciler import vault_reconciler
+
+
+async def _run_import(args) -> dict:
+    bulk_import = BulkImport(
+        args.source,
+        args.user_id,
+        args.category,
+        batch_size=args.batch_size,
+        max_in_flight=args.max_in_flight
+    )
+    print(f"Importação {bulk_import.import_id}: {bulk_import.source}")
+    if bulk_import.manifest.entries:
+        print(f"Retomando: {len(bulk_import.manifest.entries)} arquivos já importados")
+
+    # Este processo executa os jobs: mantém o lease deles como o servidor faria
+    job_recovery.start_heartbeat()
+    try:
+        return await bulk_import.run()
+    finally:
+        # Interrupção (Ctrl+C): jobs em andamento voltam à fila em vez de serem cancelados
+        tasks = job_registry.active_tasks()
+        job_registry.interrupt_all()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await job_recovery.stop()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Ferramentas do ObsidianAI Sync")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Importa uma pasta ou ZIP (.txt, .md, .pdf, .docx)")
+    import_parser.add_argument("source", help="Pasta ou arquivo ZIP")
+    import_parser.add_argument("--user-id", default="anonymous", help="Usuário dono dos jobs")
+    import_parser.add_argument("--category", default="inbox", help="Categoria das notas")
+    import_parser.add_argument("--batch-size", type=int, default=None, help="Arquivos por lote de inserção")
+    import_parser.add_argument("--max-in-flight", type=int, default=None, help="Jobs simultâneos no pipeline")
+
+    reconcile_parser = subparsers.add_parser(
+        "reconcile", help="Atualiza os jobs com as notas editadas, movidas ou removidas no vault"
+    )
+    reconcile_parser.add_argument("vault", help="Caminho do vault")
+
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(logging.INFO)
+    init_database()
+
+    if args.command == "import":
+        progress = asyncio.run(_run_import(args))
+        print(
+            f"Status: {progress['status']} | enfileirados: {progress['queued']} | "
+            f"ignorados: {progress['skipped']} | já importados: {progress['resumed']}"
+        )
+        return 0 if progress["status"] == "completed" else 1
+    if args.command == "reconcile":
+        stats = asyncio.run(vault_reconciler.rescan(args.vault))
+        if not stats:
+            print(f"Vault não encontrado: {args.vault}")
+            return 1
+        print(
+            f"Notas: {stats['notes']} | jobs: {stats['jobs']} | movidas: {stats['moved']} | "
+            f"editadas: {stats['edited']} | removidas: {stats['missing']}"
+        )
+        return 0
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,3 @@
-import os
-from typing import Optional
 from pydantic import BaseSettings, Field
 
 
@@ -36,6 +34,97 @@ class Settings(BaseSettings):
     CLAUDE_RETRY_ATTEMPTS: int = Field(default=3, env="CLAUDE_RETRY_ATTEMPTS")
     CLAUDE_RETRY_DELAY: int = Field(default=5, env="CLAUDE_RETRY_DELAY")
     
+    # Concorrência de chamadas à IA por processo
+    MAX_CONCURRENT_AI_CALLS: int = Field(default=4, env="MAX_CONCURRENT_AI_CALLS")
+    
+    # Recuperação de jobs órfãos
+    JOB_LEASE_SECONDS: int = Field(default=120, env="JOB_LEASE_SECONDS")
+    JOB_HEARTBEAT_INTERVAL_SECONDS: int = Field(default=30, env="JOB_HEARTBEAT_INTERVAL_SECONDS")
+    JOB_RECOVERY_INTERVAL_SECONDS: int = Field(default=60, env="JOB_RECOVERY_INTERVAL_SECONDS")
+    SHUTDOWN_DRAIN_TIMEOUT_SECONDS: int = Field(default=25, env="SHUTDOWN_DRAIN_TIMEOUT_SECONDS")
+    JOB_COUNTER_RECONCILE_INTERVAL_SECONDS: int = Field(default=900, env="JOB_COUNTER_RECONCILE_INTERVAL_SECONDS")
+    
+    # Prazo de cada tentativa de um job, por prioridade, e tempo mínimo por etapa
+    JOB_DEADLINE_SECONDS: dict = Field(
+        default={"low": 600, "normal": 180, "high": 120, "urgent": 90},
+        env="JOB_DEADLINE_SECONDS"
+    )
+    JOB_STAGE_MIN_SECONDS: dict = Field(
+        default={"extract": 2, "ai": 10, "write": 1},
+        env="JOB_STAGE_MIN_SECONDS"
+    )
+    
+    # Reprocessamento automático
+    JOB_MAX_ATTEMPTS: int = Field(default=5, env="JOB_MAX_ATTEMPTS")
+    RETRY_BASE_DELAY_SECONDS: int = Field(default=10, env="RETRY_BASE_DELAY_SECONDS")
+    RETRY_MAX_DELAY_SECONDS: int = Field(default=900, env="RETRY_MAX_DELAY_SECONDS")
+    RETRY_SCHEDULER_INTERVAL_SECONDS: int = Field(default=5, env="RETRY_SCHEDULER_INTERVAL_SECONDS")
+    RETRY_BATCH_SIZE: int = Field(default=20, env="RETRY_BATCH_SIZE")
+    
+    # Controle de admissão (backlog máximo de jobs pendentes por prioridade)
+    ADMISSION_BACKLOG_LIMITS: dict = Field(
+        default={"low": 100, "normal": 300, "high": 600, "urgent": 1000},
+        env="ADMISSION_BACKLOG_LIMITS"
+    )
+    ADMISSION_DRAIN_WINDOW_SECONDS: int = Field(default=300, env="ADMISSION_DRAIN_WINDOW_SECONDS")
+    ADMISSION_MAX_RETRY_AFTER_SECONDS: int = Field(default=600, env="ADMISSION_MAX_RETRY_AFTER_SECONDS")
+    
+    # Cache de status de jobs (arquivo local compartilhado entre workers)
+    STATUS_CACHE_PATH: str = Field(default="./status_cache.db", env="STATUS_CACHE_PATH")
+    STATUS_CACHE_LOCAL_TTL_SECONDS: float = Field(default=1.0, env="STATUS_CACHE_LOCAL_TTL_SECONDS")
+    STATUS_CACHE_RETENTION_SECONDS: int = Field(default=86400, env="STATUS_CACHE_RETENTION_SECONDS")
+    
+    # Índice de metadados e busca do vault (arquivo SQLite local)
+    VAULT_INDEX_PATH: str = Field(default="./vault_index.db", env="VAULT_INDEX_PATH")
+    # Vaults sem watchdog (ex.: vaults por usuário): intervalo mínimo entre as
+    # reverificações por mtime feitas nas consultas
+    VAULT_INDEX_REFRESH_SECONDS: float = Field(default=60.0, env="VAULT_INDEX_REFRESH_SECONDS")
+    
+    # Executor dedicado às operações de arquivo do vault (montagens lentas não travam o event loop)
+    VAULT_IO_MAX_WORKERS: int = Field(default=8, env="VAULT_IO_MAX_WORKERS")
+    
+    # Escrita de notas em lote (arquivo temporário + fsync + rename atômico)
+    VAULT_WRITER_BATCH_SIZE: int = Field(default=128, env="VAULT_WRITER_BATCH_SIZE")
+    VAULT_WRITER_FSYNC: bool = Field(default=True, env="VAULT_WRITER_FSYNC")
+    
+    # Eventos do watchdog: espera sem novos eventos por caminho antes de emitir
+    # e atraso máximo para caminhos alterados continuamente
+    VAULT_EVENT_DEBOUNCE_SECONDS: float = Field(default=0.5, env="VAULT_EVENT_DEBOUNCE_SECONDS")
+    VAULT_EVENT_MAX_DELAY_SECONDS: float = Field(default=5.0, env="VAULT_EVENT_MAX_DELAY_SECONDS")
+    
+    # Varredura do vault: threads para percorrer as pastas e padrões ignorados
+    # (sintaxe do .gitignore, além de .obsidian/, .trash/, .git/ e .obsidianaiignore)
+    VAULT_SCAN_MAX_WORKERS: int = Field(default=8, env="VAULT_SCAN_MAX_WORKERS")
+    VAULT_SCAN_IGNORE: list = Field(default=[], env="VAULT_SCAN_IGNORE")
+    
+    # Sincronização via git (sync_method="git"): commits em lote por tamanho ou
+    # tempo e push periódico para o remoto
+    GIT_SYNC_BATCH_SIZE: int = Field(default=200, env="GIT_SYNC_BATCH_SIZE")
+    GIT_SYNC_BATCH_SECONDS: float = Field(default=30.0, env="GIT_SYNC_BATCH_SECONDS")
+    GIT_SYNC_PUSH_INTERVAL_SECONDS: float = Field(default=300.0, env="GIT_SYNC_PUSH_INTERVAL_SECONDS")
+    GIT_SYNC_REMOTE: str = Field(default="origin", env="GIT_SYNC_REMOTE")
+    GIT_SYNC_AUTHOR_NAME: str = Field(default="ObsidianAI Sync", env="GIT_SYNC_AUTHOR_NAME")
+    GIT_SYNC_AUTHOR_EMAIL: str = Field(default="obsidian-ai@localhost", env="GIT_SYNC_AUTHOR_EMAIL")
+    
+    # Importação em lote (pastas e ZIP)
+    IMPORT_ROOT: str = Field(default="./imports", env="IMPORT_ROOT")
+    IMPORT_MANIFEST_DIR: str = Field(default="./imports/.manifests", env="IMPORT_MANIFEST_DIR")
+    IMPORT_BATCH_SIZE: int = Field(default=100, env="IMPORT_BATCH_SIZE")
+    IMPORT_EXTRACT_CONCURRENCY: int = Field(default=4, env="IMPORT_EXTRACT_CONCURRENCY")
+    IMPORT_MAX_IN_FLIGHT: int = Field(default=2, env="IMPORT_MAX_IN_FLIGHT")
+    IMPORT_MAX_FILE_BYTES: int = Field(default=20 * 1024 * 1024, env="IMPORT_MAX_FILE_BYTES")
+    
+    # Webhooks de conclusão de jobs
+    WEBHOOK_QUEUE_SIZE: int = Field(default=10000, env="WEBHOOK_QUEUE_SIZE")
+    WEBHOOK_MAX_CONCURRENCY: int = Field(default=8, env="WEBHOOK_MAX_CONCURRENCY")
+    WEBHOOK_BATCH_SIZE: int = Field(default=50, env="WEBHOOK_BATCH_SIZE")
+    WEBHOOK_BATCH_WINDOW_SECONDS: float = Field(default=1.0, env="WEBHOOK_BATCH_WINDOW_SECONDS")
+    WEBHOOK_MAX_ATTEMPTS: int = Field(default=6, env="WEBHOOK_MAX_ATTEMPTS")
+    WEBHOOK_RETRY_BASE_DELAY_SECONDS: float = Field(default=2.0, env="WEBHOOK_RETRY_BASE_DELAY_SECONDS")
+    WEBHOOK_RETRY_MAX_DELAY_SECONDS: float = Field(default=300.0, env="WEBHOOK_RETRY_MAX_DELAY_SECONDS")
+    WEBHOOK_TIMEOUT_SECONDS: float = Field(default=10.0, env="WEBHOOK_TIMEOUT_SECONDS")
+    WEBHOOK_ALLOW_PRIVATE_URLS: bool = Field(default=False, env="WEBHOOK_ALLOW_PRIVATE_URLS")
+    
     # Configurações do Redis
     REDIS_URL: str = Field(default="redis://localhost:6379", env="REDIS_URL")
     
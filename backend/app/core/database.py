@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine
+from pathlib import Path
+
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
@@ -31,6 +33,13 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Base para os modelos
 Base = declarative_base()
 
+# Migrações do Alembic (backend/migrations)
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+
+# Revisão do schema criado por create_all antes das migrações existirem
+# (usada quando o schema do banco não corresponde a nenhuma revisão)
+BASELINE_REVISION = "0001"
+
 
 def get_database() -> Session:
     """Dependency para obter sessão do banco de dados"""
@@ -45,14 +54,92 @@ def get_database() -> Session:
         db.close()
 
 
+def upsert(connection, table, values: dict, increments: dict):
+    """
+    INSERT ... ON CONFLICT DO UPDATE somando `increments` às colunas da linha
+    existente (conflito na chave primária). Atômico no SQLite e no PostgreSQL:
+    escritores concorrentes da mesma chave não falham com IntegrityError
+    """
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    statement = insert(table).values(**values, **increments)
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_={column: table.c[column] + value for column, value in increments.items()}
+    ))
+
+
+def _alembic_config(connection):
+    from alembic.config import Config
+    
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    config.attributes["connection"] = connection
+    return config
+
+
+def _schema_columns(connection) -> set:
+    """Pares (tabela, coluna) do banco, sem a tabela de controle do Alembic"""
+    inspector = inspect(connection)
+    return {
+        (table, column["name"])
+        for table in inspector.get_table_names() if table != "alembic_version"
+        for column in inspector.get_columns(table)
+    }
+
+
+def _detect_revision(connection) -> str:
+    """
+    Revisão correspondente a um banco sem versão (criado por create_all): a
+    última cujas tabelas e colunas são as do banco, aplicando as migrações uma
+    a uma num SQLite em memória
+    """
+    from alembic import command
+    from alembic.script import ScriptDirectory
+    
+    existing = _schema_columns(connection)
+    scratch = create_engine("sqlite://", poolclass=StaticPool)
+    try:
+        with scratch.connect() as scratch_connection:
+            config = _alembic_config(scratch_connection)
+            revisions = reversed(list(ScriptDirectory.from_config(config).walk_revisions()))
+            detected = None
+            for script in revisions:
+                command.upgrade(config, script.revision)
+                if _schema_columns(scratch_connection) == existing:
+                    detected = script.revision
+    finally:
+        scratch.dispose()
+    return detected or BASELINE_REVISION
+
+
+def upgrade_schema(bind=None):
+    """Aplica as migrações pendentes (bancos anteriores às migrações são marcados antes com a revisão detectada)"""
+    from alembic import command
+    
+    bind = bind or engine
+    with bind.connect() as connection:
+        tables = set(inspect(connection).get_table_names())
+        revision = None
+        if "text_processing_jobs" in tables and "alembic_version" not in tables:
+            revision = _detect_revision(connection)
+    
+    with bind.connect() as connection:
+        config = _alembic_config(connection)
+        if revision:
+            logger.info(f"Banco existente sem versão; marcado como revisão {revision}")
+            command.stamp(config, revision)
+        command.upgrade(config, "head")
+        connection.commit()
+
+
 def init_database():
-    """Inicializa o banco de dados criando todas as tabelas"""
+    """Cria ou atualiza o schema do banco de dados"""
     try:
-        # Importa todos os modelos para garantir que sejam registrados
-        from ..models import text_processing, user_configuration
-        
-        # Cria todas as tabelas
-        Base.metadata.create_all(bind=engine)
+        upgrade_schema()
         logger.info("Banco de dados inicializado com sucesso")
         
     except Exception as e:
@@ -64,7 +151,7 @@ def check_database_connection() -> bool:
     """Verifica se a conexão com o banco está funcionando"""
     try:
         with engine.connect() as connection:
-            connection.execute("SELECT 1")
+            connection.execute(text("SELECT 1"))
         return True
     except Exception as e:
         logger.error(f"Erro na conexão com banco de dados: {e}")
@@ -0,0 +1,159 @@
+import os
+from typing import Dict
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Buckets pensados para etapas que vão de milissegundos (escrita no vault)
+# a dezenas de segundos (geração na IA)
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0
+)
+
+REQUEST_LATENCY = Histogram(
+    "obsidian_ai_http_request_duration_seconds",
+    "Latência das requisições HTTP por rota",
+    ["method", "route", "status_code"],
+    buckets=LATENCY_BUCKETS
+)
+
+JOB_STAGE_LATENCY = Histogram(
+    "obsidian_ai_job_stage_duration_seconds",
+    "Duração das etapas do pipeline por categoria e modelo",
+    ["stage", "category", "model"],
+    buckets=LATENCY_BUCKETS
+)
+
+QUEUE_DEPTH = Gauge(
+    "obsidian_ai_jobs",
+    "Quantidade de jobs por status",
+    ["status"],
+    multiprocess_mode="mostrecent"
+)
+
+AI_TOKENS = Counter(
+    "obsidian_ai_ai_tokens_total",
+    "Tokens consumidos na IA por provedor",
+    ["provider", "direction"]
+)
+
+AI_ERRORS = Counter(
+    "obsidian_ai_ai_errors_total",
+    "Erros nas chamadas à IA por provedor",
+    ["provider", "error_type"]
+)
+
+ADMISSION_REJECTIONS = Counter(
+    "obsidian_ai_admission_rejections_total",
+    "Submissões recusadas pelo controle de admissão",
+    ["priority"]
+)
+
+CACHE_LOOKUPS = Counter(
+    "obsidian_ai_cache_lookups_total",
+    "Consultas a caches (hit/miss) para cálculo da taxa de acerto",
+    ["cache", "result"]
+)
+
+WEBHOOK_DELIVERIES = Counter(
+    "obsidian_ai_webhook_deliveries_total",
+    "Entregas de webhook por resultado (delivered, failed, dropped)",
+    ["result"]
+)
+
+VAULT_WRITE_LATENCY = Histogram(
+    "obsidian_ai_vault_write_duration_seconds",
+    "Latência de escrita de notas no vault",
+    buckets=LATENCY_BUCKETS
+)
+
+VAULT_IO_QUEUE_TIME = Histogram(
+    "obsidian_ai_vault_io_queue_seconds",
+    "Espera na fila do executor de I/O do vault por operação",
+    ["operation"],
+    buckets=LATENCY_BUCKETS
+)
+
+VAULT_IO_DURATION = Histogram(
+    "obsidian_ai_vault_io_duration_seconds",
+    "Duração das operações no executor de I/O do vault",
+    ["operation"],
+    buckets=LATENCY_BUCKETS
+)
+
+VAULT_IO_PENDING = Gauge(
+    "obsidian_ai_vault_io_pending",
+    "Operações de I/O do vault aguardando ou em execução",
+    multiprocess_mode="livesum"
+)
+
+VAULT_EVENTS = Counter(
+    "obsidian_ai_vault_events_total",
+    "Eventos do watchdog por destino (emitidos, agrupados ou escritas próprias suprimidas)",
+    ["outcome"]
+)
+
+VAULT_WRITE_BATCH_SIZE = Histogram(
+    "obsidian_ai_vault_write_batch_size",
+    "Notas gravadas por lote (group commit) do escritor do vault",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500)
+)
+
+GIT_SYNC_OPERATIONS = Counter(
+    "obsidian_ai_git_sync_operations_total",
+    "Commits e pushes da sincronização via git por resultado (ok, failed, conflict)",
+    ["operation", "result"]
+)
+
+
+def multiprocess_enabled() -> bool:
+    """Indica se o modo multiprocesso do prometheus_client está ativo"""
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def observe_job_stages(timings: Dict[str, float], category: str, model: str):
+    """Registra a duração de cada etapa do job nos histogramas"""
+    for stage, seconds in timings.items():
+        JOB_STAGE_LATENCY.labels(
+            stage=stage,
+            category=category or "unknown",
+            model=model or "unknown"
+        ).observe(seconds)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Contabiliza acerto ou falha de cache"""
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def set_queue_depth(counts: Dict[str, int]):
+    """Atualiza o gauge de profundidade da fila por status"""
+    for status, count in counts.items():
+        QUEUE_DEPTH.labels(status=status).set(count)
+
+
+def render_metrics() -> bytes:
+    """Gera a exposição de métricas (agrega processos quando multiprocesso)"""
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead():
+    """Remove métricas "live" do processo atual no modo multiprocesso"""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(os.getpid())
+
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
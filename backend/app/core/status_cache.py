@@ -0,0 +1,153 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatusCache:
+    """
+    Cache de status de jobs em dois níveis: memória do processo (TTL curto)
+    e um arquivo SQLite local compartilhado entre os workers da máquina
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        local_ttl_seconds: float = None,
+        max_local_entries: int = 10000,
+        retention_seconds: int = None
+    ):
+        self.path = path or settings.STATUS_CACHE_PATH
+        self.local_ttl = settings.STATUS_CACHE_LOCAL_TTL_SECONDS if local_ttl_seconds is None else local_ttl_seconds
+        self.max_local_entries = max_local_entries
+        self.retention = retention_seconds or settings.STATUS_CACHE_RETENTION_SECONDS
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread_state = threading.local()
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão SQLite por thread"""
+        conn = getattr(self._thread_state, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_status ("
+                " job_id TEXT PRIMARY KEY,"
+                " version INTEGER NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            self._thread_state.conn = conn
+        return conn
+
+    def _remember(self, job_id: str, snapshot: Dict[str, Any]):
+        with self._lock:
+            self._local[job_id] = (time.monotonic(), snapshot)
+            self._local.move_to_end(job_id)
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna o snapshot de status do job, se presente no cache"""
+        with self._lock:
+            entry = self._local.get(job_id)
+            if entry and time.monotonic() - entry[0] < self.local_ttl:
+                return entry[1]
+
+        try:
+            row = self._connection().execute(
+                "SELECT payload FROM job_status WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao ler cache de status: {e}")
+            return None
+
+        if not row:
+            return None
+        snapshot = json.loads(row[0])
+        self._remember(job_id, snapshot)
+        return snapshot
+
+    def get_many(self, job_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Retorna os snapshots presentes no cache (uma única consulta ao SQLite)"""
+        found = {}
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            for job_id in job_ids:
+                entry = self._local.get(job_id)
+                if entry and now - entry[0] < self.local_ttl:
+                    found[job_id] = entry[1]
+                else:
+                    missing.append(job_id)
+
+        if not missing:
+            return found
+
+        try:
+            placeholders = ",".join("?" * len(missing))
+            rows = self._connection().execute(
+                f"SELECT job_id, payload FROM job_status WHERE job_id IN ({placeholders})", missing
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao ler cache de status: {e}")
+            return found
+
+        for job_id, payload in rows:
+            snapshot = json.loads(payload)
+            self._remember(job_id, snapshot)
+            found[job_id] = snapshot
+        return found
+
+    def put_many(self, snapshots: Iterable[Dict[str, Any]]):
+        """Grava snapshots (write-through); nunca substitui uma versão mais nova"""
+        rows = []
+        now = time.time()
+        for snapshot in snapshots:
+            self._remember(snapshot["job_id"], snapshot)
+            rows.append((snapshot["job_id"], snapshot["version"], json.dumps(snapshot), now))
+        if not rows:
+            return
+
+        try:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT INTO job_status (job_id, version, payload, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(job_id) DO UPDATE SET version = excluded.version, "
+                "payload = excluded.payload, updated_at = excluded.updated_at "
+                "WHERE excluded.version >= job_status.version",
+                rows
+            )
+            self._writes += len(rows)
+            if self._writes >= 1000:
+                self._writes = 0
+                conn.execute("DELETE FROM job_status WHERE updated_at < ?", (now - self.retention,))
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao gravar cache de status: {e}")
+
+    def put(self, snapshot: Dict[str, Any]):
+        """Grava um snapshot de status"""
+        self.put_many([snapshot])
+
+    def invalidate(self, job_id: str):
+        """Remove o job do cache (para escritas feitas fora do ORM)"""
+        with self._lock:
+            self._local.pop(job_id, None)
+        try:
+            self._connection().execute("DELETE FROM job_status WHERE job_id = ?", (job_id,))
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao invalidar cache de status: {e}")
+
+
+# Instância global do cache de status
+status_cache = JobStatusCache()
@@ -1,16 +1,33 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import func
 import logging
 import sys
+import time
 from pathlib import Path
 
 # Adiciona o diretório raiz ao path para imports
 sys.path.append(str(Path(__file__).parent.parent))
 
 from app.core.config import settings
-from app.core.database import init_database, check_database_connection
-from app.routers import processing
+from app.core.database import init_database, check_database_connection, SessionLocal, engine
+from app.core import metrics
+from app.models.job_counter import JobCounter
+from app.models.text_processing import ProcessingStatus
+from app.routers import processing, webhooks, imports, vault
+from app.services.drain import drain_controller
+from app.services.git_sync import git_syncs
+from app.services.job_counters import job_counter_reconciler
+from app.services.job_pipeline import obsidian_sync
+from app.services.job_recovery import job_recovery
+from app.services.retry_scheduler import retry_scheduler
+from app.services.vault_io import vault_io
+from app.services.vault_reconciler import vault_reconciler
+from app.services.vault_registry import vault_syncs
+from app.services.vault_scanner import vault_scanner
+from app.services.vault_writer import vault_writer
+from app.services.webhooks import webhook_dispatcher
 
 # Configuração de logs
 logging.basicConfig(
@@ -44,6 +61,29 @@ app.add_middleware(
 
 # Inclusão dos routers
 app.include_router(processing.router)
+app.include_router(webhooks.router)
+app.include_router(imports.router)
+app.include_router(vault.router)
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Mede a latência de cada requisição por rota"""
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Usa o template da rota para não explodir a cardinalidade com IDs
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        metrics.REQUEST_LATENCY.labels(
+            method=request.method,
+            route=route_path,
+            status_code=str(status_code)
+        ).observe(time.perf_counter() - start)
 
 
 @app.on_event("startup")
@@ -63,6 +103,22 @@ async def startup_event():
             logger.error("Falha na conexão com banco de dados")
             sys.exit(1)
         
+        # Recupera jobs interrompidos e inicia varredura periódica
+        job_recovery.start()
+        retry_scheduler.start()
+        job_counter_reconciler.start()
+        webhook_dispatcher.start()
+        drain_controller.install_signal_handler()
+        
+        # Índice de metadados do vault padrão, mantido pelo watchdog; edições e
+        # movimentações das notas são refletidas nos jobs (inclusive as feitas
+        # com o serviço parado)
+        if settings.DEFAULT_VAULT_PATH:
+            await obsidian_sync.start_monitoring(
+                subscribers=[vault_reconciler.subscriber(obsidian_sync.vault_path)]
+            )
+            vault_reconciler.start(obsidian_sync.vault_path)
+        
         logger.info(f"ObsidianAI Sync iniciado com sucesso na porta {settings.PORT}")
         
     except Exception as e:
@@ -74,6 +130,18 @@ async def startup_event():
 async def shutdown_event():
     """Evento executado no encerramento da aplicação"""
     logger.info("Encerrando ObsidianAI Sync...")
+    # Sem efeito se a drenagem já ocorreu via SIGTERM
+    await drain_controller.drain()
+    await obsidian_sync.stop_monitoring()
+    # Notas ainda nas filas dos escritores (vault padrão e vaults por usuário) são gravadas antes de sair
+    vault_writer.stop()
+    vault_syncs.stop()
+    # Último lote dos vaults sincronizados via git (commit e push)
+    await git_syncs.stop()
+    vault_io.shutdown()
+    vault_scanner.shutdown()
+    metrics.mark_process_dead()
+    engine.dispose()
 
 
 @app.get("/")
@@ -91,6 +159,13 @@ async def root():
 async def health_check():
     """Health check da aplicação"""
     try:
+        # Em drenagem: o balanceador deve parar de enviar tráfego
+        if drain_controller.draining:
+            return JSONResponse(
+                status_code=503,
+                content={"status": "draining"}
+            )
+        
         # Verifica banco de dados
         db_ok = check_database_connection()
         
@@ -99,10 +174,14 @@ async def health_check():
         
         status = "healthy" if db_ok and config_ok else "unhealthy"
         
+        # Push do git falhando não derruba o serviço (as notas seguem no vault), mas fica visível
+        git_failures = git_syncs.failing()
+        
         return {
             "status": status,
             "database": "ok" if db_ok else "error",
             "config": "ok" if config_ok else "error",
+            "git_sync": {"status": "error", "repositories": git_failures} if git_failures else "ok",
             "timestamp": "2025-08-04T10:00:00Z"
         }
         
@@ -117,6 +196,25 @@ async def health_check():
         )
 
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Exposição de métricas no formato Prometheus"""
+    db = SessionLocal()
+    try:
+        rows = db.query(
+            JobCounter.status, func.sum(JobCounter.count)
+        ).group_by(JobCounter.status).all()
+        counts = {status.value: 0 for status in ProcessingStatus}
+        counts.update({status: int(count or 0) for status, count in rows})
+        metrics.set_queue_depth(counts)
+    except Exception as e:
+        logger.error(f"Erro ao atualizar profundidade da fila: {e}")
+    finally:
+        db.close()
+    
+    return Response(content=metrics.render_metrics(), media_type=metrics.METRICS_CONTENT_TYPE)
+
+
 @app.get("/api/categories")
 async def get_categories():
     """Retorna categorias disponíveis"""
@@ -177,7 +275,8 @@ async def http_exception_handler(request, exc):
         content={
             "error": exc.detail,
             "status_code": exc.status_code
-        }
+        },
+        headers=getattr(exc, "headers", None)
     )
 
 
@@ -1,8 +1,14 @@
 from .text_processing import TextProcessingJob, ProcessingStatus
 from .user_configuration import UserConfiguration
+from .change_sequence import ChangeSequence
+from .job_counter import JobCounter
+from .webhook import WebhookSubscription
 
 __all__ = [
     "TextProcessingJob",
     "ProcessingStatus", 
-    "UserConfiguration"
+    "UserConfiguration",
+    "ChangeSequence",
+    "JobCounter",
+    "WebhookSubscription"
 ] 
\ No newline at end of file
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, select
+
+from ..core.database import Base, upsert
+
+
+class ChangeSequence(Base):
+    """Contadores monotônicos usados para ordenar alterações (feed incremental)"""
+    __tablename__ = "change_sequences"
+    
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+def next_change_seq(connection, name: str = "jobs", count: int = 1) -> int:
+    """
+    Reserva o próximo valor da sequência na transação corrente (ou um bloco
+    de `count` valores, retornando o último deles).
+    
+    O upsert bloqueia a linha do contador até o commit, então a ordem dos
+    valores acompanha a ordem dos commits: um cliente que já leu o valor N
+    nunca verá depois uma alteração com valor menor que N. A linha é criada
+    pela migração; o upsert cobre bancos sem ela sem disputar o INSERT.
+    """
+    table = ChangeSequence.__table__
+    upsert(connection, table, {"name": name}, {"value": count})
+    return connection.execute(
+        select(table.c.value).where(table.c.name == name)
+    ).scalar_one()
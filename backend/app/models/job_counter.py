@@ -0,0 +1,47 @@
+from collections import Counter
+from typing import Dict, Tuple
+
+from sqlalchemy import Column, Integer, String
+
+from ..core.database import Base, upsert
+
+# Chave de um contador: (user_id, category, status)
+CounterKey = Tuple[str, str, str]
+
+
+class JobCounter(Base):
+    """Contagem de jobs por usuário, categoria e status (mantida a cada transição)"""
+    __tablename__ = "job_counters"
+    
+    user_id = Column(String(50), primary_key=True)
+    category = Column(String(50), primary_key=True)
+    status = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+def apply_counter_deltas(connection, deltas: Dict[CounterKey, int]):
+    """Aplica variações nos contadores dentro da transação corrente"""
+    table = JobCounter.__table__
+    # Ordem fixa das chaves: transações concorrentes bloqueiam as linhas na
+    # mesma ordem e não entram em deadlock
+    for (user_id, category, status), delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        upsert(
+            connection,
+            table,
+            {"user_id": user_id, "category": category, "status": status},
+            {"count": delta}
+        )
+
+def transition_deltas(user_id: str, category: str, old_status: str, new_status: str) -> Dict[CounterKey, int]:
+    """Variações correspondentes à mudança de status de um job"""
+    deltas: Dict[CounterKey, int] = Counter()
+    if old_status == new_status:
+        return deltas
+    if old_status:
+        deltas[(user_id, category, old_status)] -= 1
+    if new_status:
+        deltas[(user_id, category, new_status)] += 1
+    return deltas
+
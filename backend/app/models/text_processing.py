@@ -1,11 +1,19 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, Boolean
-from sqlalchemy.ext.declarative import declarative_base
-from datetime import datetime
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, Enum, Index, event
+from sqlalchemy.orm import Session, column_property, object_session
+from sqlalchemy.orm.attributes import get_history
+from datetime import datetime, timedelta
 import enum
 import json
-from typing import List, Dict, Any
+import logging
+from typing import Callable, List, Dict, Any, Optional
 
+from ..core.config import settings
 from ..core.database import Base
+from ..core.status_cache import status_cache
+from .change_sequence import next_change_seq
+from .job_counter import apply_counter_deltas, transition_deltas
+
+logger = logging.getLogger(__name__)
 
 
 class ProcessingStatus(enum.Enum):
@@ -17,11 +25,19 @@ class ProcessingStatus(enum.Enum):
     SYNCED = "synced"
     FAILED = "failed"
     CANCELLED = "cancelled"
+    DEAD_LETTER = "dead_letter"
+
+
+# Etapas do pipeline, na ordem de execução
+PIPELINE_STAGES = ["extract", "ai", "render", "write"]
 
 
 class TextProcessingJob(Base):
     """Modelo para jobs de processamento de texto"""
     __tablename__ = "text_processing_jobs"
+    __table_args__ = (
+        Index("ix_text_processing_jobs_user_change_seq", "user_id", "change_seq"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String(50), nullable=False, index=True)
@@ -37,25 +53,39 @@ class TextProcessingJob(Base):
     processed_markdown = Column(Text)
     ai_response = Column(Text)  # Resposta completa da IA
     extracted_metadata = Column(Text)  # JSON com metadados extraídos
+    checkpoints = Column(Text)  # JSON com a saída de cada etapa concluída
     
     # Status e controle
-    status = Column(Enum(ProcessingStatus), default=ProcessingStatus.QUEUED, index=True)
+    # active_history: o status anterior é necessário para manter os contadores
+    status = column_property(
+        Column(Enum(ProcessingStatus), default=ProcessingStatus.QUEUED, index=True),
+        active_history=True
+    )
     error_message = Column(Text)
     retry_count = Column(Integer, default=0)
+    status_version = Column(Integer, default=0, nullable=False)  # Incrementada a cada escrita (ETag)
+    change_seq = Column(Integer)  # Posição no feed de alterações (global)
+    error_kind = Column(String(20))  # transient | parse | permanent
+    next_attempt_at = Column(DateTime, index=True)  # Próxima tentativa automática
+    heartbeat_at = Column(DateTime, default=datetime.utcnow, index=True)  # Lease do worker
+    deadline_at = Column(DateTime)  # Prazo da tentativa em andamento
     
     # Caminhos de arquivo
     obsidian_file_path = Column(String(500))
+    note_content_hash = Column(String(64))  # Hash da nota no vault (escrita ou última edição vista)
+    note_edited_at = Column(DateTime)  # Última edição da nota feita fora do serviço
     temp_file_path = Column(String(500))
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
-    processed_at = Column(DateTime)
+    processed_at = Column(DateTime, index=True)
     synced_at = Column(DateTime)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Configurações de processamento
     ai_model_used = Column(String(100))
-    processing_time_seconds = Column(Integer)
+    processing_time_seconds = Column(Float)
+    stage_timings = Column(Text)  # JSON com duração de cada etapa (segundos)
     word_count = Column(Integer)
     char_count = Column(Integer)
     
@@ -97,10 +127,71 @@ class TextProcessingJob(Base):
         """Define metadados extraídos como JSON string"""
         self.extracted_metadata = json.dumps(metadata)
     
+    def get_checkpoints(self) -> Dict[str, Any]:
+        """Retorna checkpoints das etapas como dict"""
+        if self.checkpoints:
+            try:
+                return json.loads(self.checkpoints)
+            except json.JSONDecodeError:
+                return {}
+        return {}
+    
+    def get_checkpoint(self, stage: str) -> Optional[Dict[str, Any]]:
+        """Retorna a saída persistida de uma etapa, se concluída"""
+        return self.get_checkpoints().get(stage)
+    
+    def save_checkpoint(self, stage: str, output: Dict[str, Any]):
+        """Persiste a saída de uma etapa concluída"""
+        checkpoints = self.get_checkpoints()
+        checkpoints[stage] = output
+        self.checkpoints = json.dumps(checkpoints, ensure_ascii=False)
+    
+    def clear_checkpoints(self, from_stage: str):
+        """Descarta checkpoints da etapa informada em diante"""
+        index = PIPELINE_STAGES.index(from_stage)
+        checkpoints = self.get_checkpoints()
+        for stage in PIPELINE_STAGES[index:]:
+            checkpoints.pop(stage, None)
+        self.checkpoints = json.dumps(checkpoints, ensure_ascii=False)
+    
+    def get_stage_timings(self) -> Dict[str, float]:
+        """Retorna tempos por etapa do pipeline como dict"""
+        if self.stage_timings:
+            try:
+                return json.loads(self.stage_timings)
+            except json.JSONDecodeError:
+                return {}
+        return {}
+    
+    def record_stage_timings(self, timings: Dict[str, float]):
+        """Mescla tempos de etapas (segundos) no registro do job"""
+        merged = self.get_stage_timings()
+        for stage, seconds in timings.items():
+            merged[stage] = round(seconds, 4)
+        self.stage_timings = json.dumps(merged, separators=(",", ":"))
+    
+    def heartbeat(self):
+        """Renova o lease do job para o worker atual"""
+        self.heartbeat_at = datetime.utcnow()
+    
+    def release_lease(self, status: ProcessingStatus):
+        """Devolve o job à fila com o lease expirado (retomada imediata por outro worker)"""
+        self.status = status
+        self.heartbeat_at = datetime(1970, 1, 1)
+        self.updated_at = datetime.utcnow()
+    
+    def start_deadline(self) -> datetime:
+        """Define o prazo da nova tentativa a partir da prioridade do job"""
+        budgets = settings.JOB_DEADLINE_SECONDS
+        seconds = budgets.get(self.priority or "normal", budgets.get("normal", 180))
+        self.deadline_at = datetime.utcnow() + timedelta(seconds=seconds)
+        return self.deadline_at
+    
     def mark_processing_started(self):
         """Marca início do processamento"""
         self.status = ProcessingStatus.PROCESSING
         self.updated_at = datetime.utcnow()
+        self.heartbeat()
     
     def mark_processing_completed(self, processed_markdown: str, ai_response: str, metadata: Dict[str, Any]):
         """Marca processamento como concluído"""
@@ -110,6 +201,8 @@ class TextProcessingJob(Base):
         self.set_metadata(metadata)
         self.processed_at = datetime.utcnow()
         self.updated_at = datetime.utcnow()
+        self.error_kind = None
+        self.next_attempt_at = None
         
         # Calcula estatísticas
         self.word_count = len(processed_markdown.split())
@@ -119,19 +212,55 @@ class TextProcessingJob(Base):
         """Marca início da sincronização"""
         self.status = ProcessingStatus.SYNCING
         self.updated_at = datetime.utcnow()
+        self.heartbeat()
     
-    def mark_sync_completed(self, file_path: str):
+    def mark_sync_completed(self, file_path: str, content_hash: str = None):
         """Marca sincronização como concluída"""
         self.status = ProcessingStatus.SYNCED
         self.obsidian_file_path = file_path
+        self.note_content_hash = content_hash
         self.synced_at = datetime.utcnow()
         self.updated_at = datetime.utcnow()
     
-    def mark_failed(self, error_message: str):
+    def reconcile_note(self, file_path: Optional[str], content_hash: Optional[str]) -> List[str]:
+        """
+        Aplica o estado da nota encontrado no vault (movida, editada ou removida);
+        retorna as alterações aplicadas
+        """
+        changes = []
+        if file_path != self.obsidian_file_path:
+            changes.append("moved" if file_path else "missing")
+            self.obsidian_file_path = file_path
+        if content_hash != self.note_content_hash:
+            # Sem hash anterior (notas antigas) o atual vira a referência
+            if content_hash and self.note_content_hash:
+                changes.append("edited")
+                self.note_edited_at = datetime.utcnow()
+            self.note_content_hash = content_hash
+        return changes
+    
+    def mark_failed(self, error_message: str, error_kind: str = None, next_attempt_at: datetime = None):
         """Marca job como falhado"""
         self.status = ProcessingStatus.FAILED
         self.error_message = error_message
-        self.retry_count += 1
+        self.error_kind = error_kind
+        self.next_attempt_at = next_attempt_at
+        self.retry_count = (self.retry_count or 0) + 1
+        self.updated_at = datetime.utcnow()
+    
+    def mark_dead_letter(self, error_message: str = None):
+        """Move job esgotado para a fila de dead-letter"""
+        self.status = ProcessingStatus.DEAD_LETTER
+        if error_message:
+            self.error_message = error_message
+        self.next_attempt_at = None
+        self.updated_at = datetime.utcnow()
+    
+    def requeue_from_dead_letter(self, next_attempt_at: datetime):
+        """Devolve job da dead-letter ao agendador com tentativas zeradas"""
+        self.status = ProcessingStatus.FAILED
+        self.retry_count = 0
+        self.next_attempt_at = next_attempt_at
         self.updated_at = datetime.utcnow()
     
     def mark_cancelled(self):
@@ -139,13 +268,43 @@ class TextProcessingJob(Base):
         self.status = ProcessingStatus.CANCELLED
         self.updated_at = datetime.utcnow()
     
+    def resume_stage(self) -> str:
+        """Retorna a primeira etapa do pipeline ainda não concluída"""
+        checkpoints = self.get_checkpoints()
+        if not self.original_text and "extract" not in checkpoints:
+            return "extract"
+        # Jobs anteriores aos checkpoints: o markdown persistido equivale à etapa "ai"
+        if "ai" not in checkpoints and not self.processed_markdown:
+            return "ai"
+        if "render" not in checkpoints:
+            return "render"
+        return "write"
+    
     def can_retry(self) -> bool:
         """Verifica se job pode ser reprocessado"""
         return (
             self.status == ProcessingStatus.FAILED and 
-            self.retry_count < 3
+            (self.retry_count or 0) < settings.JOB_MAX_ATTEMPTS
         )
     
+    def status_snapshot(self) -> Dict[str, Any]:
+        """Snapshot servido pelo endpoint de status (e pelo cache de status)"""
+        return {
+            "job_id": self.job_id,
+            "user_id": self.user_id,
+            "version": self.status_version or 0,
+            "status": self.status.value,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "processed_at": self.processed_at.isoformat() if self.processed_at else None,
+            "synced_at": self.synced_at.isoformat() if self.synced_at else None,
+            "obsidian_file_path": self.obsidian_file_path,
+            "error_message": self.error_message,
+            "word_count": self.word_count,
+            "char_count": self.char_count,
+            "processing_time_seconds": self.processing_time_seconds,
+            "stage_timings": self.get_stage_timings()
+        }
+    
     def to_dict(self) -> Dict[str, Any]:
         """Converte modelo para dict"""
         return {
@@ -160,9 +319,96 @@ class TextProcessingJob(Base):
             "processed_at": self.processed_at.isoformat() if self.processed_at else None,
             "synced_at": self.synced_at.isoformat() if self.synced_at else None,
             "obsidian_file_path": self.obsidian_file_path,
+            "note_edited_at": self.note_edited_at.isoformat() if self.note_edited_at else None,
             "word_count": self.word_count,
             "char_count": self.char_count,
             "processing_time_seconds": self.processing_time_seconds,
+            "stage_timings": self.get_stage_timings(),
             "error_message": self.error_message,
-            "retry_count": self.retry_count
-        } 
\ No newline at end of file
+            "error_kind": self.error_kind,
+            "retry_count": self.retry_count,
+            "next_attempt_at": self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            "deadline_at": self.deadline_at.isoformat() if self.deadline_at else None,
+            "change_seq": self.change_seq
+        } 
+
+
+# Write-through do cache de status: cada escrita do job incrementa a versão,
+# avança o feed de alterações e o snapshot é publicado somente após o commit
+
+@event.listens_for(TextProcessingJob, "before_insert")
+def _assign_change_seq(mapper, connection, target):
+    target.change_seq = next_change_seq(connection)
+
+
+@event.listens_for(TextProcessingJob, "before_update")
+def _bump_status_version(mapper, connection, target):
+    session = object_session(target)
+    if session is None or session.is_modified(target, include_collections=False):
+        target.status_version = (target.status_version or 0) + 1
+        target.change_seq = next_change_seq(connection)
+
+
+# Contadores por usuário/categoria/status, atualizados na mesma transação
+
+def _status_value(status) -> Optional[str]:
+    return status.value if isinstance(status, ProcessingStatus) else status
+
+
+@event.listens_for(TextProcessingJob, "after_insert")
+def _count_new_job(mapper, connection, target):
+    apply_counter_deltas(connection, transition_deltas(
+        target.user_id, target.category, None, _status_value(target.status)
+    ))
+
+
+@event.listens_for(TextProcessingJob, "after_update")
+def _count_status_transition(mapper, connection, target):
+    history = get_history(target, "status")
+    if not history.has_changes():
+        return
+    old_status = history.deleted[0] if history.deleted else None
+    apply_counter_deltas(connection, transition_deltas(
+        target.user_id, target.category, _status_value(old_status), _status_value(target.status)
+    ))
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("job_transitions", []).append(target.status_snapshot())
+
+
+@event.listens_for(TextProcessingJob, "after_insert")
+@event.listens_for(TextProcessingJob, "after_update")
+def _stage_status_snapshot(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("job_status_snapshots", {})[target.job_id] = target.status_snapshot()
+
+
+# Callbacks notificados (após o commit) com os snapshots dos jobs que mudaram de status
+_transition_listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+
+
+def on_status_transition(callback: Callable[[List[Dict[str, Any]]], None]):
+    """Registra um callback para transições de status já confirmadas no banco"""
+    _transition_listeners.append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_status_snapshots(session):
+    snapshots = session.info.pop("job_status_snapshots", None)
+    if snapshots:
+        status_cache.put_many(snapshots.values())
+    
+    transitions = session.info.pop("job_transitions", None)
+    if transitions:
+        for callback in _transition_listeners:
+            try:
+                callback(transitions)
+            except Exception as e:
+                logger.error(f"Erro ao notificar transição de status: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_status_snapshots(session):
+    session.info.pop("job_status_snapshots", None)
+    session.info.pop("job_transitions", None)
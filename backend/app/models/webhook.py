@@ -0,0 +1,60 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean
+from datetime import datetime
+import json
+from typing import List, Dict, Any
+
+from ..core.database import Base
+
+# Eventos de job que podem ser assinados
+WEBHOOK_EVENTS = ["job.synced", "job.failed"]
+
+
+class WebhookSubscription(Base):
+    """Assinatura de webhook de um usuário (notificação de conclusão de jobs)"""
+    __tablename__ = "webhook_subscriptions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String(50), nullable=False, index=True)
+    url = Column(String(500), nullable=False)
+    secret = Column(String(100), nullable=False)  # Chave do HMAC das entregas
+    events = Column(Text)  # JSON array
+    active = Column(Boolean, default=True)
+    
+    # Controle de entregas
+    last_delivery_at = Column(DateTime)
+    last_error = Column(Text)
+    consecutive_failures = Column(Integer, default=0)
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def get_events(self) -> List[str]:
+        """Retorna eventos assinados"""
+        if self.events:
+            try:
+                return json.loads(self.events)
+            except json.JSONDecodeError:
+                return []
+        return []
+    
+    def set_events(self, events: List[str]):
+        """Define eventos assinados"""
+        self.events = json.dumps(events)
+    
+    def wants(self, event_type: str) -> bool:
+        """Indica se a assinatura recebe o evento"""
+        return bool(self.active) and event_type in self.get_events()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte modelo para dict (sem o segredo)"""
+        return {
+            "id": self.id,
+            "url": self.url,
+            "events": self.get_events(),
+            "active": self.active,
+            "last_delivery_at": self.last_delivery_at.isoformat() if self.last_delivery_at else None,
+            "last_error": self.last_error,
+            "consecutive_failures": self.consecutive_failures,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
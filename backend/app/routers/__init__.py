@@ -1,3 +1,6 @@
 from .processing import router as processing_router
+from .webhooks import router as webhooks_router
+from .imports import router as imports_router
+from .vault import router as vault_router
 
-__all__ = ["processing_router"] 
\ No newline at end of file
+__all__ = ["processing_router", "webhooks_router", "imports_router", "vault_router"] 
\ No newline at end of file
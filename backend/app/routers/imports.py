@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pathlib import Path
+from typing import Dict, Optional
+import logging
+
+from ..core.config import settings
+from ..core.security import get_current_user_optional
+from ..services.bulk_import import bulk_imports
+from ..utils.validators import BulkImportValidator
+from .processing import reject_while_draining
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/imports", tags=["imports"])
+
+
+@router.post("", dependencies=[Depends(reject_while_draining)])
+async def start_import(
+    request: BulkImportValidator,
+    current_user: Optional[Dict] = Depends(get_current_user_optional)
+):
+    """
+    Inicia (ou retoma) a importação em lote de uma pasta ou ZIP do servidor
+    """
+    try:
+        user_id = current_user["user_id"] if current_user else "anonymous"
+        
+        # Apenas caminhos dentro de IMPORT_ROOT
+        root = Path(settings.IMPORT_ROOT).resolve()
+        source = (root / request.source_path).resolve()
+        if source != root and root not in source.parents:
+            raise HTTPException(
+                status_code=400,
+                detail="Caminho fora da pasta de importação"
+            )
+        if not source.exists():
+            raise HTTPException(
+                status_code=404,
+                detail="Pasta ou arquivo não encontrado"
+            )
+        
+        bulk_import = bulk_imports.start(str(source), user_id, request.category)
+        logger.info(f"Importação {bulk_import.import_id} iniciada para usuário {user_id}: {source}")
+        
+        return bulk_import.progress()
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao iniciar importação: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Erro interno do servidor"
+        )
+
+
+@router.get("/{import_id}")
+async def get_import(
+    import_id: str,
+    current_user: Optional[Dict] = Depends(get_current_user_optional)
+):
+    """
+    Retorna o progresso de uma importação
+    """
+    user_id = current_user["user_id"] if current_user else "anonymous"
+    
+    progress = bulk_imports.get(import_id, user_id)
+    if not progress:
+        raise HTTPException(
+            status_code=404,
+            detail="Importação não encontrada"
+        )
+    return progress
@@ -1,29 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from typing import Dict, Any, Optional
+from typing import Dict, Optional
 import logging
 
+from ..core import metrics
 from ..core.database import get_database
+from ..core.status_cache import status_cache
 from ..core.security import get_current_user_optional
+from ..models.job_counter import JobCounter
 from ..models.text_processing import TextProcessingJob, ProcessingStatus
-from ..models.user_configuration import UserConfiguration
-from ..services.ai_processor import AIProcessor
-from ..services.obsidian_sync import ObsidianSync
-from ..utils.validators import TextInputValidator
+from ..services.admission import admission_controller
+from ..services.drain import drain_controller
+from ..services.job_pipeline import process_text_background, resume_job, status_for_stage
+from ..services.job_registry import job_registry
+from ..services.retry_scheduler import retry_scheduler
+from ..utils.validators import TextInputValidator, JobIdsValidator, JobStatusBatchValidator
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/processing", tags=["processing"])
 
-# Instâncias dos serviços
-ai_processor = AIProcessor()
-obsidian_sync = ObsidianSync()
+
+def reject_while_draining():
+    """Recusa novo trabalho enquanto o processo drena para encerrar"""
+    if drain_controller.draining:
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor em reinicialização, tente novamente em instantes",
+            headers={"Retry-After": "5"}
+        )
 
 
-@router.post("/text")
+@router.post("/text", dependencies=[Depends(reject_while_draining)])
 async def process_text(
     request: TextInputValidator,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_database),
     current_user: Optional[Dict] = Depends(get_current_user_optional)
 ):
@@ -33,6 +44,15 @@ async def process_text(
     try:
         user_id = current_user["user_id"] if current_user else "anonymous"
         
+        # Backpressure: recusa novos jobs quando o backlog da prioridade está cheio
+        decision = admission_controller.evaluate(db, request.priority)
+        if not decision.admitted:
+            raise HTTPException(
+                status_code=429,
+                detail="Fila de processamento cheia, tente novamente mais tarde",
+                headers={"Retry-After": str(decision.retry_after)}
+            )
+        
         # Cria job de processamento
         job = TextProcessingJob(
             user_id=user_id,
@@ -45,12 +65,12 @@ async def process_text(
         db.add(job)
         db.commit()
         db.refresh(job)
+        admission_controller.record_admission()
         
         # Adiciona processamento em background
-        background_tasks.add_task(
-            process_text_background,
+        job_registry.submit(
             job.job_id,
-            user_id
+            process_text_background(job.job_id, user_id)
         )
         
         logger.info(f"Job criado: {job.job_id} para usuário {user_id}")
@@ -62,6 +82,8 @@ async def process_text(
             "message": "Texto enviado para processamento"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao processar texto: {e}")
         raise HTTPException(
@@ -73,6 +95,7 @@ async def process_text(
 @router.get("/status/{job_id}")
 async def get_job_status(
     job_id: str,
+    request: Request,
     db: Session = Depends(get_database),
     current_user: Optional[Dict] = Depends(get_current_user_optional)
 ):
@@ -82,29 +105,32 @@ async def get_job_status(
     try:
         user_id = current_user["user_id"] if current_user else "anonymous"
         
-        job = db.query(TextProcessingJob).filter(
-            TextProcessingJob.job_id == job_id,
-            TextProcessingJob.user_id == user_id
-        ).first()
+        # Cache write-through: evita consulta ao banco a cada polling
+        snapshot = status_cache.get(job_id)
+        if snapshot and snapshot["user_id"] == user_id:
+            metrics.record_cache_lookup("job_status", hit=True)
+        else:
+            metrics.record_cache_lookup("job_status", hit=False)
+            job = db.query(TextProcessingJob).filter(
+                TextProcessingJob.job_id == job_id,
+                TextProcessingJob.user_id == user_id
+            ).first()
+            
+            if not job:
+                raise HTTPException(
+                    status_code=404,
+                    detail="Job não encontrado"
+                )
+            
+            snapshot = job.status_snapshot()
+            status_cache.put(snapshot)
         
-        if not job:
-            raise HTTPException(
-                status_code=404,
-                detail="Job não encontrado"
-            )
+        etag = f'"{job_id}-{snapshot["version"]}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
         
-        return {
-            "job_id": job.job_id,
-            "status": job.status.value,
-            "created_at": job.created_at.isoformat() if job.created_at else None,
-            "processed_at": job.processed_at.isoformat() if job.processed_at else None,
-            "synced_at": job.synced_at.isoformat() if job.synced_at else None,
-            "obsidian_file_path": job.obsidian_file_path,
-            "error_message": job.error_message,
-            "word_count": job.word_count,
-            "char_count": job.char_count,
-            "processing_time_seconds": job.processing_time_seconds
-        }
+        payload = {key: value for key, value in snapshot.items() if key != "user_id"}
+        return JSONResponse(content=payload, headers={"ETag": etag})
         
     except HTTPException:
         raise
@@ -116,6 +142,58 @@ async def get_job_status(
         )
 
 
+@router.post("/status:batch")
+async def get_jobs_status_batch(
+    request: JobStatusBatchValidator,
+    db: Session = Depends(get_database),
+    current_user: Optional[Dict] = Depends(get_current_user_optional)
+):
+    """
+    Retorna o status de vários jobs de uma vez, apenas dos que mudaram
+    desde a versão informada pelo cliente
+    """
+    try:
+        user_id = current_user["user_id"] if current_user else "anonymous"
+        
+        snapshots = {
+            job_id: snapshot
+            for job_id, snapshot in status_cache.get_many(request.job_ids).items()
+            if snapshot["user_id"] == user_id
+        }
+        
+        # Faltantes no cache: uma única consulta com IN
+        missing = [job_id for job_id in request.job_ids if job_id not in snapshots]
+        for job_id in request.job_ids:
+            metrics.record_cache_lookup("job_status", hit=job_id in snapshots)
+        if missing:
+            jobs = db.query(TextProcessingJob).filter(
+                TextProcessingJob.job_id.in_(missing),
+                TextProcessingJob.user_id == user_id
+            ).all()
+            loaded = [job.status_snapshot() for job in jobs]
+            status_cache.put_many(loaded)
+            snapshots.update((snapshot["job_id"], snapshot) for snapshot in loaded)
+        
+        changed = []
+        for job_id in request.job_ids:
+            snapshot = snapshots.get(job_id)
+            if snapshot and snapshot["version"] > request.versions.get(job_id, -1):
+                changed.append({key: value for key, value in snapshot.items() if key != "user_id"})
+        
+        return {
+            "jobs": changed,
+            "unchanged": len(snapshots) - len(changed),
+            "not_found": [job_id for job_id in request.job_ids if job_id not in snapshots]
+        }
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter status em lote: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Erro interno do servidor"
+        )
+
+
 @router.get("/jobs")
 async def list_user_jobs(
     limit: int = 20,
@@ -169,6 +247,78 @@ async def list_user_jobs(
         )
 
 
+@router.get("/stats")
+async def get_job_stats(
+    db: Session = Depends(get_database),
+    current_user: Optional[Dict] = Depends(get_current_user_optional)
+):
+    """
+    Contagem de jobs do usuário por status e categoria (lida dos contadores)
+    """
+    try:
+        user_id = current_user["user_id"] if current_user else "anonymous"
+        
+        counters = db.query(JobCounter).filter(
+            JobCounter.user_id == user_id,
+            JobCounter.count > 0
+        ).all()
+        
+        by_status = {status.value: 0 for status in ProcessingStatus}
+        by_category: Dict[str, int] = {}
+        for counter in counters:
+            by_status[counter.status] = by_status.get(counter.status, 0) + counter.count
+            by_category[counter.category] = by_category.get(counter.category, 0) + counter.count
+        
+        return {
+            "total": sum(by_status.values()),
+            "by_status": by_status,
+            "by_category": by_category
+        }
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter estatísticas: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Erro interno do servidor"
+        )
+
+
+@router.get("/changes")
+async def get_job_changes(
+    since: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_database),
+    current_user: Optional[Dict] = Depends(get_current_user_optional)
+):
+    """
+    Feed incremental: jobs alterados depois da posição `since`
+    """
+    try:
+        user_id = current_user["user_id"] if current_user else "anonymous"
+        limit = max(1, min(limit, 500))
+        
+        jobs = db.query(TextProcessingJob).filter(
+            TextProcessingJob.user_id == user_id,
+            TextProcessingJob.change_seq > since
+        ).order_by(TextProcessingJob.change_seq).limit(limit + 1).all()
+        
+        has_more = len(jobs) > limit
+        jobs = jobs[:limit]
+        
+        return {
+            "changes": [job.to_dict() for job in jobs],
+            "next_since": jobs[-1].change_seq if jobs else since,
+            "has_more": has_more
+        }
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter feed de alterações: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Erro interno do servidor"
+        )
+
+
 @router.delete("/jobs/{job_id}")
 async def cancel_job(
     job_id: str,
@@ -202,6 +352,9 @@ async def cancel_job(
         job.mark_cancelled()
         db.commit()
         
+        # Interrompe a tarefa em andamento (libera chamada à IA e slot)
+        job_registry.cancel(job_id)
+        
         return {
             "success": True,
             "message": "Job cancelado com sucesso"
@@ -217,7 +370,7 @@ async def cancel_job(
         )
 
 
-@router.post("/jobs/{job_id}/retry")
+@router.post("/jobs/{job_id}/retry", dependencies=[Depends(reject_while_draining)])
 async def retry_job(
     job_id: str,
     db: Session = Depends(get_database),
@@ -246,18 +399,16 @@ async def retry_job(
                 detail="Job não pode ser reprocessado"
             )
         
-        # Reseta status para fila
-        job.status = ProcessingStatus.QUEUED
+        # Retoma a partir da primeira etapa sem checkpoint (ex.: falha na
+        # sincronização refaz apenas a escrita, sem nova chamada à IA)
+        stage = job.resume_stage()
+        job.status = status_for_stage(stage)
         job.error_message = None
+        job.next_attempt_at = None
         db.commit()
         
         # Adiciona reprocessamento em background
-        from .processing import process_text_background
-        import asyncio
-        
-        asyncio.create_task(
-            process_text_background(job.job_id, user_id)
-        )
+        resume_job(job.job_id, user_id, stage)
         
         return {
             "success": True,
@@ -274,130 +425,65 @@ async def retry_job(
         )
 
 
-async def process_text_background(job_id: str, user_id: str):
+@router.get("/dead-letter")
+async def list_dead_letter_jobs(
+    limit: int = 20,
+    offset: int = 0,
+    db: Session = Depends(get_database),
+    current_user: Optional[Dict] = Depends(get_current_user_optional)
+):
     """
-    Processa texto em background
+    Lista jobs que esgotaram as tentativas automáticas
     """
-    from ..core.database import SessionLocal
-    
-    db = SessionLocal()
     try:
-        # Busca job
-        job = db.query(TextProcessingJob).filter(
-            TextProcessingJob.job_id == job_id
-        ).first()
+        user_id = current_user["user_id"] if current_user else "anonymous"
         
-        if not job:
-            logger.error(f"Job não encontrado: {job_id}")
-            return
+        query = db.query(TextProcessingJob).filter(
+            TextProcessingJob.user_id == user_id,
+            TextProcessingJob.status == ProcessingStatus.DEAD_LETTER
+        ).order_by(TextProcessingJob.updated_at.desc())
         
-        # Busca configurações do usuário
-        user_config = db.query(UserConfiguration).filter(
-            UserConfiguration.user_id == user_id
-        ).first()
+        total = query.count()
+        jobs = query.offset(offset).limit(limit).all()
         
-        # Marca início do processamento
-        job.mark_processing_started()
-        db.commit()
+        return {
+            "jobs": [job.to_dict() for job in jobs],
+            "total": total,
+            "limit": limit,
+            "offset": offset
+        }
         
-        try:
-            # Processa com IA
-            user_preferences = user_config.get_ai_preferences() if user_config else None
-            
-            processed_data = await ai_processor.process_text(
-                text=job.original_text,
-                category=job.category,
-                user_preferences=user_preferences
-            )
-            
-            # Marca processamento concluído
-            job.mark_processing_completed(
-                processed_markdown=processed_data["content"],
-                ai_response=str(processed_data),
-                metadata=processed_data.get("metadata", {})
-            )
-            
-            # Adiciona metadados de processamento
-            if "processing_metadata" in processed_data:
-                job.processing_time_seconds = processed_data["processing_metadata"].get("processing_time_seconds", 0)
-                job.ai_model_used = processed_data["processing_metadata"].get("ai_model_used", "unknown")
-            
-            db.commit()
-            
-            # Sincroniza com Obsidian
-            if user_config and user_config.auto_sync_enabled:
-                await sync_to_obsidian_background(job_id, user_id)
-            
-        except Exception as e:
-            logger.error(f"Erro no processamento: {e}")
-            job.mark_failed(str(e))
-            db.commit()
-            
     except Exception as e:
-        logger.error(f"Erro no processamento em background: {e}")
-    finally:
-        db.close()
+        logger.error(f"Erro ao listar dead-letter: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Erro interno do servidor"
+        )
 
 
-async def sync_to_obsidian_background(job_id: str, user_id: str):
+@router.post("/dead-letter/requeue")
+async def requeue_dead_letter_jobs(
+    request: JobIdsValidator,
+    current_user: Optional[Dict] = Depends(get_current_user_optional)
+):
     """
-    Sincroniza nota com Obsidian em background
+    Devolve jobs da dead-letter ao agendador de reprocessamento
     """
-    from ..core.database import SessionLocal
-    
-    db = SessionLocal()
     try:
-        # Busca job
-        job = db.query(TextProcessingJob).filter(
-            TextProcessingJob.job_id == job_id
-        ).first()
-        
-        if not job or job.status != ProcessingStatus.PROCESSED:
-            return
-        
-        # Busca configurações do usuário
-        user_config = db.query(UserConfiguration).filter(
-            UserConfiguration.user_id == user_id
-        ).first()
+        user_id = current_user["user_id"] if current_user else "anonymous"
         
-        if not user_config or not user_config.obsidian_vault_path:
-            logger.warning(f"Vault não configurado para usuário {user_id}")
-            return
+        requeued = retry_scheduler.requeue_dead_letters(user_id, request.job_ids)
         
-        # Marca início da sincronização
-        job.mark_sync_started()
-        db.commit()
+        return {
+            "success": True,
+            "requeued": len(requeued),
+            "job_ids": requeued,
+            "message": "Jobs reenviados para reprocessamento"
+        }
         
-        try:
-            # Cria nota no Obsidian
-            obsidian_sync.vault_path = user_config.obsidian_vault_path
-            
-            processed_data = {
-                "title": job.processed_markdown.split('\n')[0].replace('# ', '') if job.processed_markdown else "Nota",
-                "content": job.processed_markdown,
-                "tags": job.get_tags(),
-                "category": job.category,
-                "metadata": job.get_metadata()
-            }
-            
-            file_path = await obsidian_sync.create_note(
-                processed_data=processed_data,
-                category=job.category,
-                user_id=user_id
-            )
-            
-            # Marca sincronização concluída
-            job.mark_sync_completed(file_path)
-            db.commit()
-            
-            logger.info(f"Nota sincronizada: {file_path}")
-            
-        except Exception as e:
-            logger.error(f"Erro na sincronização: {e}")
-            job.mark_failed(f"Erro na sincronização: {str(e)}")
-            db.commit()
-            
     except Exception as e:
-        logger.error(f"Erro na sincronização em background: {e}")
-    finally:
-        db.close() 
\ No newline at end of file
+        logger.error(f"Erro ao reenfileirar dead-letter: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Erro interno do servidor"
+        )
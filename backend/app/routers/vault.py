@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from pathlib import Path
+from typing import Dict, Optional
+import logging
+import time
+
+from ..core.config import settings
+from ..core.database import get_database
+from ..core.security import get_current_user_optional
+from ..models.user_configuration import UserConfiguration
+from ..services.vault_index import vault_index
+from ..services.vault_io import vault_io
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/vault", tags=["vault"])
+
+
+@router.get("/search")
+async def search_vault(
+    q: str,
+    limit: int = 20,
+    db: Session = Depends(get_database),
+    current_user: Optional[Dict] = Depends(get_current_user_optional)
+):
+    """
+    Busca textual nas notas do vault (título, corpo e tags), com ranking BM25
+    """
+    try:
+        user_id = current_user["user_id"] if current_user else "anonymous"
+        query = q.strip()
+        if not query or len(query) > 200:
+            raise HTTPException(
+                status_code=400,
+                detail="Consulta deve ter entre 1 e 200 caracteres"
+            )
+        limit = max(1, min(limit, 100))
+
+        user_config = db.query(UserConfiguration).filter(
+            UserConfiguration.user_id == user_id
+        ).first()
+        vault_path = (user_config.obsidian_vault_path if user_config else None) or settings.DEFAULT_VAULT_PATH
+        if not vault_path or not await vault_io.run(Path(vault_path).is_dir, operation="stat"):
+            raise HTTPException(
+                status_code=404,
+                detail="Vault não configurado"
+            )
+
+        # SQLite fora do event loop (a primeira busca pode construir o índice)
+        start = time.perf_counter()
+        found = await vault_io.run(vault_index.search, vault_path, query, limit, operation="search")
+
+        return {
+            "query": query,
+            "ranking": found["ranking"],
+            "results": found["results"],
+            "took_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro na busca do vault: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Erro interno do servidor"
+        )
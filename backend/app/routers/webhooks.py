@@ -0,0 +1,118 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Dict, Optional
+import asyncio
+import logging
+import secrets
+
+from ..core.config import settings
+from ..core.database import get_database
+from ..core.security import get_current_user_optional
+from ..models.webhook import WebhookSubscription
+from ..utils.validators import WebhookSubscriptionValidator, is_public_url
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/webhooks", tags=["webhooks"])
+
+
+@router.post("")
+async def create_webhook(
+    request: WebhookSubscriptionValidator,
+    db: Session = Depends(get_database),
+    current_user: Optional[Dict] = Depends(get_current_user_optional)
+):
+    """
+    Cria uma assinatura de webhook; o segredo do HMAC só é exibido aqui
+    """
+    # As entregas partem do servidor: endereços internos não são aceitos
+    if not settings.WEBHOOK_ALLOW_PRIVATE_URLS and not await asyncio.to_thread(is_public_url, request.url):
+        raise HTTPException(
+            status_code=422,
+            detail="A URL do webhook deve resolver para um endereço público"
+        )
+    
+    try:
+        user_id = current_user["user_id"] if current_user else "anonymous"
+        
+        subscription = WebhookSubscription(
+            user_id=user_id,
+            url=request.url,
+            secret=secrets.token_hex(32)
+        )
+        subscription.set_events(request.events)
+        db.add(subscription)
+        db.commit()
+        db.refresh(subscription)
+        
+        return {**subscription.to_dict(), "secret": subscription.secret}
+        
+    except Exception as e:
+        logger.error(f"Erro ao criar webhook: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Erro interno do servidor"
+        )
+
+
+@router.get("")
+async def list_webhooks(
+    db: Session = Depends(get_database),
+    current_user: Optional[Dict] = Depends(get_current_user_optional)
+):
+    """
+    Lista as assinaturas de webhook do usuário
+    """
+    try:
+        user_id = current_user["user_id"] if current_user else "anonymous"
+        
+        subscriptions = db.query(WebhookSubscription).filter(
+            WebhookSubscription.user_id == user_id
+        ).order_by(WebhookSubscription.created_at).all()
+        
+        return {"webhooks": [subscription.to_dict() for subscription in subscriptions]}
+        
+    except Exception as e:
+        logger.error(f"Erro ao listar webhooks: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Erro interno do servidor"
+        )
+
+
+@router.delete("/{subscription_id}")
+async def delete_webhook(
+    subscription_id: int,
+    db: Session = Depends(get_database),
+    current_user: Optional[Dict] = Depends(get_current_user_optional)
+):
+    """
+    Remove uma assinatura de webhook
+    """
+    try:
+        user_id = current_user["user_id"] if current_user else "anonymous"
+        
+        subscription = db.query(WebhookSubscription).filter(
+            WebhookSubscription.id == subscription_id,
+            WebhookSubscription.user_id == user_id
+        ).first()
+        
+        if not subscription:
+            raise HTTPException(
+                status_code=404,
+                detail="Webhook não encontrado"
+            )
+        
+        db.delete(subscription)
+        db.commit()
+        
+        return {"message": "Webhook removido com sucesso"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao remover webhook: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Erro interno do servidor"
+        )
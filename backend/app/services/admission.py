@@ -0,0 +1,107 @@
+"""
+Controle de admissão de novos jobs (backpressure)
+"""
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..core import metrics
+from ..core.config import settings
+from ..models.job_counter import JobCounter
+from ..models.text_processing import TextProcessingJob, ProcessingStatus
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AdmissionDecision:
+    """Resultado da avaliação de admissão"""
+    admitted: bool
+    queue_depth: int
+    limit: int
+    drain_rate: float
+    retry_after: int = 0
+
+
+class AdmissionController:
+    """Limita o backlog por classe de prioridade usando profundidade da fila e vazão observada"""
+
+    PENDING_STATUSES = [ProcessingStatus.QUEUED, ProcessingStatus.PROCESSING]
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, int]] = None,
+        drain_window_seconds: int = None,
+        snapshot_ttl_seconds: float = 1.0
+    ):
+        self.limits = limits or settings.ADMISSION_BACKLOG_LIMITS
+        self.drain_window = drain_window_seconds or settings.ADMISSION_DRAIN_WINDOW_SECONDS
+        self.snapshot_ttl = snapshot_ttl_seconds
+        self._snapshot: Optional[Tuple[float, int, float]] = None
+        self._lock = threading.Lock()
+
+    def _load_snapshot(self, db: Session) -> Tuple[int, float]:
+        """Lê profundidade da fila e taxa de escoamento (jobs/s), com cache curto"""
+        with self._lock:
+            now = time.monotonic()
+            if self._snapshot and now - self._snapshot[0] < self.snapshot_ttl:
+                return self._snapshot[1], self._snapshot[2]
+
+        depth = db.query(func.sum(JobCounter.count)).filter(
+            JobCounter.status.in_([status.value for status in self.PENDING_STATUSES])
+        ).scalar() or 0
+
+        window_start = datetime.utcnow() - timedelta(seconds=self.drain_window)
+        drained = db.query(TextProcessingJob).filter(
+            TextProcessingJob.processed_at >= window_start
+        ).count()
+        drain_rate = drained / self.drain_window
+
+        with self._lock:
+            self._snapshot = (time.monotonic(), depth, drain_rate)
+        return depth, drain_rate
+
+    def record_admission(self):
+        """Contabiliza localmente um job admitido até o próximo snapshot"""
+        with self._lock:
+            if self._snapshot:
+                taken_at, depth, drain_rate = self._snapshot
+                self._snapshot = (taken_at, depth + 1, drain_rate)
+
+    def limit_for(self, priority: str) -> int:
+        """Backlog máximo aceito para a prioridade"""
+        return self.limits.get(priority, self.limits.get("normal", 0))
+
+    def evaluate(self, db: Session, priority: str = "normal") -> AdmissionDecision:
+        """Decide se um novo job da prioridade informada pode entrar na fila"""
+        depth, drain_rate = self._load_snapshot(db)
+        limit = self.limit_for(priority)
+
+        if depth < limit:
+            return AdmissionDecision(True, depth, limit, drain_rate)
+
+        # Tempo estimado até a fila voltar abaixo do limite desta prioridade
+        excess = depth - limit + 1
+        if drain_rate > 0:
+            retry_after = math.ceil(excess / drain_rate)
+        else:
+            retry_after = settings.ADMISSION_MAX_RETRY_AFTER_SECONDS
+        retry_after = max(1, min(retry_after, settings.ADMISSION_MAX_RETRY_AFTER_SECONDS))
+
+        metrics.ADMISSION_REJECTIONS.labels(priority=priority).inc()
+        logger.warning(
+            f"Admissão recusada (prioridade {priority}): fila {depth}/{limit}, "
+            f"escoamento {drain_rate:.2f} jobs/s, retry em {retry_after}s"
+        )
+        return AdmissionDecision(False, depth, limit, drain_rate, retry_after)
+
+
+# Instância global do controle de admissão
+admission_controller = AdmissionController()
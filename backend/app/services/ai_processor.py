@@ -1,21 +1,62 @@
 import asyncio
 import json
 import logging
+import re
 from typing import Dict, List, Optional, Any
+import time
 from datetime import datetime
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import RetryCallState, retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
-from anthropic import Anthropic
+from anthropic import (
+    AsyncAnthropic,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError
+)
 from ..core.config import settings
+from ..core import metrics
+from .job_registry import job_registry
+from ..utils.deadline import Deadline, DeadlineExceeded
+from ..utils.timing import StageTimer
 
 logger = logging.getLogger(__name__)
 
+# Falhas do provedor que devem ser reprocessadas depois, e não convertidas em fallback
+TRANSIENT_PROVIDER_ERRORS = (
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError
+)
+
+
+# Espera entre as retentativas locais da chamada à API
+API_RETRY_WAIT = wait_exponential(multiplier=1, min=4, max=10)
+
+
+def _stop_at_deadline(retry_state: RetryCallState) -> bool:
+    """Encerra as retentativas quando a espera seguinte não caberia no prazo do job"""
+    deadline = retry_state.kwargs.get("deadline")
+    if deadline is None:
+        return False
+    needed = API_RETRY_WAIT(retry_state) + settings.JOB_STAGE_MIN_SECONDS.get("ai", 0)
+    return deadline.remaining() < needed
+
+
+class AIResponseParseError(Exception):
+    """Resposta da IA recebida, mas fora do formato JSON esperado"""
+    
+    def __init__(self, message: str, raw_response: str = ""):
+        super().__init__(message)
+        self.raw_response = raw_response
+
 
 class AIProcessor:
     """Serviço para processamento de texto com Claude API"""
     
     def __init__(self):
-        self.client = Anthropic(api_key=settings.CLAUDE_API_KEY)
+        self.client = AsyncAnthropic(api_key=settings.CLAUDE_API_KEY)
         self.model = settings.CLAUDE_MODEL
         self.max_tokens = settings.CLAUDE_MAX_TOKENS
         self.temperature = settings.CLAUDE_TEMPERATURE
@@ -161,69 +202,132 @@ class AIProcessor:
         }
     
     @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10)
+        stop=stop_after_attempt(3) | _stop_at_deadline,
+        wait=API_RETRY_WAIT,
+        # Só falhas transitórias do provedor: cancelamento (CancelledError),
+        # prazo esgotado e erros de requisição não geram nova chamada paga
+        retry=retry_if_exception_type(TRANSIENT_PROVIDER_ERRORS),
+        reraise=True
     )
-    async def _call_claude_api(self, messages: List[Dict[str, str]]) -> str:
-        """Chama API do Claude com retry automático"""
-        try:
-            response = await self.client.messages.create(
-                model=self.model,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                messages=messages
-            )
-            
-            return response.content[0].text
-            
-        except Exception as e:
-            logger.error(f"Erro na chamada da API Claude: {str(e)}")
-            
-            # Diferentes tipos de erro
-            if "rate_limit" in str(e).lower():
-                await asyncio.sleep(60)  # Aguarda 1 minuto para rate limit
-                raise
-            elif "context_length" in str(e).lower():
-                raise ValueError("Texto muito longo para processamento")
-            else:
+    async def _call_claude_api(
+        self,
+        messages: List[Dict[str, str]],
+        timer: Optional[StageTimer] = None,
+        deadline: Optional[Deadline] = None
+    ) -> str:
+        """Chama API do Claude dentro do prazo do job (quando informado)"""
+        # A espera pelo slot de concorrência fica fora do prazo da etapa: numa
+        # rajada os jobs aguardam a vez sem esgotar o orçamento (e sem gastar
+        # retentativas); o slot é liberado ao sair do bloco, inclusive no cancelamento
+        queued_at = time.perf_counter()
+        async with job_registry.ai_slots:
+            waited = time.perf_counter() - queued_at
+            if timer:
+                timer.record("ai_slot_wait", waited)
+            try:
+                if deadline is None:
+                    return await self._stream_completion(self.client, messages, timer)
+                
+                # O timeout do cliente (e de suas retentativas internas) acompanha o
+                # orçamento restante, contado a partir da obtenção do slot
+                deadline.extend(waited)
+                client = self.client.with_options(timeout=deadline.require("ai"))
+                return await deadline.run("ai", self._stream_completion(client, messages, timer))
+                
+            except DeadlineExceeded:
+                metrics.AI_ERRORS.labels(provider="anthropic", error_type="DeadlineExceeded").inc()
                 raise
+            except Exception as e:
+                logger.error(f"Erro na chamada da API Claude: {str(e)}")
+                metrics.AI_ERRORS.labels(provider="anthropic", error_type=type(e).__name__).inc()
+                
+                # Diferentes tipos de erro
+                if "rate_limit" in str(e).lower():
+                    # Aguarda 1 minuto para rate limit, sem ultrapassar o prazo do job
+                    await asyncio.sleep(max(0.0, min(60.0, deadline.remaining())) if deadline else 60)
+                    raise
+                elif "context_length" in str(e).lower():
+                    raise ValueError("Texto muito longo para processamento")
+                else:
+                    raise
+    
+    async def _stream_completion(
+        self,
+        client: AsyncAnthropic,
+        messages: List[Dict[str, str]],
+        timer: Optional[StageTimer] = None
+    ) -> str:
+        """Executa a geração em streaming e contabiliza os tokens"""
+        # A Messages API recebe o prompt de sistema à parte, não como mensagem
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        options = {"system": system} if system else {}
+        
+        # O stream HTTP é fechado ao sair do bloco, inclusive quando a tarefa
+        # do job é cancelada
+        async with client.messages.stream(
+            model=self.model,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            messages=[m for m in messages if m["role"] != "system"],
+            **options
+        ) as stream:
+            request_start = time.perf_counter()
+            chunks = []
+            async for text in stream.text_stream:
+                if not chunks and timer:
+                    timer.timings["time_to_first_token"] = time.perf_counter() - request_start
+                chunks.append(text)
+            
+            final_message = await stream.get_final_message()
+        
+        usage = getattr(final_message, "usage", None)
+        if usage:
+            metrics.AI_TOKENS.labels(provider="anthropic", direction="input").inc(usage.input_tokens)
+            metrics.AI_TOKENS.labels(provider="anthropic", direction="output").inc(usage.output_tokens)
+        
+        return "".join(chunks)
     
     async def process_text(
         self, 
         text: str, 
         category: str = "inbox",
-        user_preferences: Optional[Dict[str, Any]] = None
+        user_preferences: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None
     ) -> Dict[str, Any]:
         """
         Processa texto usando Claude API
         """
         start_time = datetime.utcnow()
+        timer = StageTimer()
         
         try:
-            # Obtém prompt para categoria
-            prompt_config = self.prompts.get(category, self.prompts["inbox"])
-            
-            # Personaliza prompt baseado em preferências do usuário
-            if user_preferences:
-                prompt_config = self._customize_prompt(prompt_config, user_preferences)
-            
-            # Constrói mensagens para Claude
-            messages = [
-                {
-                    "role": "system",
-                    "content": prompt_config["system"]
-                },
-                {
-                    "role": "user", 
-                    "content": prompt_config["user_template"].format(text=text)
-                }
-            ]
+            with timer.stage("prompt_build"):
+                # Obtém prompt para categoria
+                prompt_config = self.prompts.get(category, self.prompts["inbox"])
+                
+                # Personaliza prompt baseado em preferências do usuário
+                if user_preferences:
+                    prompt_config = self._customize_prompt(prompt_config, user_preferences)
+                
+                # Constrói mensagens para Claude
+                messages = [
+                    {
+                        "role": "system",
+                        "content": prompt_config["system"]
+                    },
+                    {
+                        "role": "user", 
+                        "content": prompt_config["user_template"].format(text=text)
+                    }
+                ]
             
             # Chama API
-            response_text = await self._call_claude_api(messages)
+            with timer.stage("provider_latency"):
+                response_text = await self._call_claude_api(messages, timer, deadline=deadline)
             
             # Parse da resposta
-            processed_data = self._parse_ai_response(response_text)
+            with timer.stage("parse"):
+                processed_data = self._parse_ai_response(response_text)
             
             # Adiciona metadados de processamento
             processing_time = (datetime.utcnow() - start_time).total_seconds()
@@ -232,12 +336,16 @@ class AIProcessor:
                 "ai_model_used": self.model,
                 "category_used": category,
                 "text_length": len(text),
-                "word_count": len(text.split())
+                "word_count": len(text.split()),
+                "stage_timings": timer.timings
             }
             
             logger.info(f"Texto processado com sucesso em {processing_time:.2f}s")
             return processed_data
             
+        except (AIResponseParseError, DeadlineExceeded, *TRANSIENT_PROVIDER_ERRORS):
+            # Tratados pelo agendador de reprocessamento (reparo ou backoff)
+            raise
         except Exception as e:
             logger.error(f"Erro no processamento de texto: {str(e)}")
             # Fallback para processamento básico
@@ -295,7 +403,37 @@ class AIProcessor:
             return data
             
         except (json.JSONDecodeError, ValueError) as e:
-            raise Exception(f"Erro ao processar resposta da IA: {str(e)}")
+            raise AIResponseParseError(f"Erro ao processar resposta da IA: {str(e)}", response)
+    
+    def repair_ai_response(self, raw_response: str, text: str, category: str) -> Dict[str, Any]:
+        """
+        Tenta recuperar uma resposta malformada sem nova chamada à IA
+        """
+        try:
+            # Isola o objeto JSON mais externo e remove vírgulas finais
+            start = raw_response.find("{")
+            end = raw_response.rfind("}")
+            if start == -1 or end <= start:
+                raise AIResponseParseError("Resposta sem objeto JSON", raw_response)
+            
+            candidate = raw_response[start:end + 1]
+            candidate = re.sub(r",\s*([}\]])", r"\1", candidate)
+            
+            data = self._parse_ai_response(candidate)
+            data.setdefault("metadata", {})["repaired"] = True
+            data["processing_metadata"] = {
+                "processing_time_seconds": 0,
+                "ai_model_used": self.model,
+                "category_used": category,
+                "text_length": len(text),
+                "word_count": len(text.split())
+            }
+            logger.info("Resposta da IA reparada sem nova geração")
+            return data
+            
+        except AIResponseParseError as e:
+            logger.warning(f"Reparo da resposta falhou, usando processamento básico: {e}")
+            return self._basic_processing_fallback(text, category)
     
     def _basic_processing_fallback(self, text: str, category: str) -> Dict[str, Any]:
         """Processamento básico quando IA falha"""
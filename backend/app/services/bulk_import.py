@@ -0,0 +1,501 @@
+"""
+Importação em lote de pastas e arquivos ZIP para o pipeline de processamento
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import insert
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.change_sequence import next_change_seq
+from ..models.job_counter import apply_counter_deltas
+from ..models.text_processing import TextProcessingJob, ProcessingStatus
+from .admission import admission_controller
+from .job_pipeline import process_text_background
+from .job_registry import JobTaskRegistry, job_registry
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".pdf", ".docx")
+
+# Jobs de importação: "imp-<import_id>-<hash do caminho>"
+IMPORT_JOB_PREFIX = "imp-"
+
+# Arquivo da fonte: (caminho relativo, tamanho em bytes, abre um caminho local legível)
+SourceFile = Tuple[str, int, Callable[[], ContextManager[str]]]
+
+
+@contextmanager
+def open_source(source: Path) -> Iterator[Iterator[SourceFile]]:
+    """
+    Abre a pasta ou o ZIP e fornece um iterador em ordem determinística, sem
+    carregar a lista inteira em memória (o ZIP fica aberto até o fim do bloco)
+    """
+    if source.is_dir():
+        yield _iter_directory(source)
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            yield _iter_archive(archive)
+    else:
+        raise ValueError(f"Fonte de importação inválida: {source}")
+
+
+def _iter_directory(source: Path) -> Iterator[SourceFile]:
+    for root, dirs, files in os.walk(source):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if Path(name).suffix.lower() not in SUPPORTED_EXTENSIONS:
+                continue
+            path = Path(root) / name
+            yield path.relative_to(source).as_posix(), path.stat().st_size, partial(nullcontext, str(path))
+
+
+def _iter_archive(archive: zipfile.ZipFile) -> Iterator[SourceFile]:
+    lock = threading.Lock()
+    for info in archive.infolist():
+        if info.is_dir() or Path(info.filename).suffix.lower() not in SUPPORTED_EXTENSIONS:
+            continue
+        yield info.filename, info.file_size, partial(_extract_member, archive, info, lock)
+
+
+@contextmanager
+def _extract_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, lock: threading.Lock):
+    """Extrai um membro do ZIP para um arquivo temporário (o nome do membro não é usado como caminho)"""
+    handle, temp_path = tempfile.mkstemp(suffix=Path(info.filename).suffix.lower())
+    try:
+        with os.fdopen(handle, "wb") as target, lock, archive.open(info) as member:
+            shutil.copyfileobj(member, target)
+        yield temp_path
+    finally:
+        os.unlink(temp_path)
+
+
+def import_id_of(job_id: str) -> Optional[str]:
+    """import_id de um job criado por importação (None para os demais jobs)"""
+    if not job_id.startswith(IMPORT_JOB_PREFIX):
+        return None
+    return job_id[len(IMPORT_JOB_PREFIX):].split("-", 1)[0]
+
+
+def _is_placeholder(text: str) -> bool:
+    """O FileProcessor devolve marcadores como "[PDF sem texto extraível]" em vez de exceções"""
+    text = text.strip()
+    return not text or (text.startswith("[") and text.endswith("]") and "\n" not in text)
+
+
+class ImportManifest:
+    """Manifesto JSONL da importação: uma linha por arquivo concluído, usado para retomar"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.header: Dict[str, Any] = {}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.summary: Optional[Dict[str, Any]] = None
+
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as manifest_file:
+                for line in manifest_file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Última linha incompleta após uma interrupção
+                        continue
+                    if "path" in record:
+                        self.entries[record["path"]] = record
+                    elif "import_id" in record:
+                        self.header = record
+                    elif "summary" in record:
+                        self.summary = record["summary"]
+
+    def _append(self, records: List[Dict[str, Any]]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as manifest_file:
+            for record in records:
+                manifest_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            manifest_file.flush()
+            os.fsync(manifest_file.fileno())
+
+    def start(self, header: Dict[str, Any]):
+        """Grava o cabeçalho (apenas na primeira execução)"""
+        if not self.header:
+            self.header = header
+            self._append([header])
+
+    def record(self, entries: List[Dict[str, Any]]):
+        """Registra arquivos concluídos (após o commit do lote)"""
+        if entries:
+            self._append(entries)
+            self.entries.update((entry["path"], entry) for entry in entries)
+
+    def finish(self, summary: Dict[str, Any]):
+        """Marca a importação como concluída"""
+        self.summary = summary
+        self._append([{"summary": summary}])
+
+
+class BulkImport:
+    """
+    Importa uma pasta ou ZIP: extrai o texto com o FileProcessor, cria os jobs
+    em inserts em lote e alimenta o pipeline com poucos jobs por vez, para não
+    disputar as vagas da IA com os usuários interativos
+    """
+
+    def __init__(
+        self,
+        source: str,
+        user_id: str,
+        category: str = "inbox",
+        registry: JobTaskRegistry = job_registry,
+        batch_size: int = None,
+        max_in_flight: int = None,
+        extract_concurrency: int = None,
+        manifest_dir: str = None
+    ):
+        self.source = Path(source).resolve()
+        self.user_id = user_id
+        self.category = category
+        self.registry = registry
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.max_in_flight = max_in_flight or settings.IMPORT_MAX_IN_FLIGHT
+        self.extract_slots = asyncio.Semaphore(extract_concurrency or settings.IMPORT_EXTRACT_CONCURRENCY)
+
+        # Mesma fonte e usuário -> mesmo import_id: executar de novo retoma a importação
+        self.import_id = hashlib.sha1(f"{user_id}:{self.source}".encode()).hexdigest()[:16]
+        self.manifest = ImportManifest(
+            Path(manifest_dir or settings.IMPORT_MANIFEST_DIR) / f"{self.import_id}.jsonl"
+        )
+
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.stats = {"scanned": 0, "queued": 0, "skipped": 0, "resumed": 0}
+        self._in_flight: Set[asyncio.Task] = set()
+        self._leased: Set[str] = set()
+
+    def job_id_for(self, relative_path: str) -> str:
+        """job_id determinístico por arquivo: torna os inserts idempotentes na retomada"""
+        digest = hashlib.sha1(relative_path.encode()).hexdigest()[:20]
+        return f"{IMPORT_JOB_PREFIX}{self.import_id}-{digest}"
+
+    def progress(self) -> Dict[str, Any]:
+        """Estado atual da importação"""
+        return {
+            "import_id": self.import_id,
+            "source": str(self.source),
+            "category": self.category,
+            "status": self.status,
+            "error": self.error,
+            "in_flight": len(self._in_flight),
+            **self.stats
+        }
+
+    async def run(self) -> Dict[str, Any]:
+        """Executa (ou retoma) a importação até o fim"""
+        self.status = "running"
+        self.manifest.start({
+            "import_id": self.import_id,
+            "user_id": self.user_id,
+            "source": str(self.source),
+            "category": self.category,
+            "created_at": datetime.utcnow().isoformat()
+        })
+        lease_task = asyncio.create_task(self._renew_leases())
+        try:
+            # Jobs criados por uma execução interrompida e ainda não processados
+            for job_id in self._claim_released_jobs():
+                self._leased.add(job_id)
+                await self._submit(job_id)
+
+            with open_source(self.source) as source_files:
+                batch: List[SourceFile] = []
+                for item in source_files:
+                    if item[0] in self.manifest.entries:
+                        self.stats["resumed"] += 1
+                        continue
+                    self.stats["scanned"] += 1
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        await self._process_batch(batch)
+                        batch = []
+                if batch:
+                    await self._process_batch(batch)
+
+            while self._in_flight:
+                await asyncio.wait(set(self._in_flight))
+
+            self.status = "completed"
+            self.manifest.finish({**self.stats, "finished_at": datetime.utcnow().isoformat()})
+            logger.info(f"Importação {self.import_id} concluída: {self.stats}")
+        except asyncio.CancelledError:
+            self.status = "interrupted"
+            self._release_pending()
+            raise
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            self._release_pending()
+            logger.error(f"Erro na importação {self.import_id}: {e}")
+        finally:
+            lease_task.cancel()
+        return self.progress()
+
+    async def _process_batch(self, batch: List[SourceFile]):
+        """Extrai, insere e enfileira um lote de arquivos"""
+        extracted = await asyncio.gather(*(self._extract(item) for item in batch))
+
+        rows = []
+        entries = []
+        for (relative_path, _, _), (text, error) in zip(batch, extracted):
+            if error:
+                entries.append({"path": relative_path, "status": "skipped", "error": error})
+                continue
+            job_id = self.job_id_for(relative_path)
+            rows.append({"job_id": job_id, "original_text": text})
+            entries.append({"path": relative_path, "status": "queued", "job_id": job_id})
+
+        await self._wait_for_admission()
+        new_job_ids = self._insert_jobs(rows)
+        self.manifest.record(entries)
+        self.stats["queued"] += len(rows)
+        self.stats["skipped"] += len(entries) - len(rows)
+
+        self._leased.update(new_job_ids)
+        for job_id in new_job_ids:
+            await self._submit(job_id)
+
+    async def _extract(self, item: SourceFile) -> Tuple[Optional[str], Optional[str]]:
+        """Extrai o texto de um arquivo em thread; retorna (texto, erro)"""
+        relative_path, size, opener = item
+        if size > settings.IMPORT_MAX_FILE_BYTES:
+            return None, f"Arquivo maior que {settings.IMPORT_MAX_FILE_BYTES} bytes"
+
+        # Importação tardia: PDF/DOCX/OCR são dependências opcionais
+        from .file_processor import FileProcessor
+
+        def extract() -> str:
+            with opener() as local_path:
+                return FileProcessor().extract_text_from_file(local_path)
+
+        async with self.extract_slots:
+            try:
+                text = await asyncio.to_thread(extract)
+            except Exception as e:
+                return None, f"Erro na extração: {e}"
+
+        if _is_placeholder(text):
+            return None, text.strip() or "Arquivo vazio"
+        if len(text) > settings.MAX_TEXT_LENGTH:
+            return None, f"Texto muito longo ({len(text)} caracteres)"
+        return text, None
+
+    async def _wait_for_admission(self):
+        """Cede espaço aos usuários interativos enquanto o backlog de baixa prioridade estiver cheio"""
+        while True:
+            db = SessionLocal()
+            try:
+                decision = admission_controller.evaluate(db, "low")
+            finally:
+                db.close()
+            if decision.admitted:
+                return
+            self.status = "throttled"
+            await asyncio.sleep(decision.retry_after)
+            self.status = "running"
+
+    def _insert_jobs(self, rows: List[Dict[str, Any]]) -> List[str]:
+        """Insere os jobs do lote numa única transação; retorna os job_ids criados"""
+        if not rows:
+            return []
+
+        db = SessionLocal()
+        try:
+            existing = {
+                job_id for (job_id,) in db.query(TextProcessingJob.job_id).filter(
+                    TextProcessingJob.job_id.in_([row["job_id"] for row in rows])
+                )
+            }
+            rows = [row for row in rows if row["job_id"] not in existing]
+            if not rows:
+                return []
+
+            # INSERT em lote não passa pelos eventos do ORM: sequência e contadores manuais
+            connection = db.connection()
+            last_seq = next_change_seq(connection, count=len(rows))
+            now = datetime.utcnow()
+            for offset, row in enumerate(rows):
+                row.update(
+                    user_id=self.user_id,
+                    category=self.category,
+                    priority="low",
+                    status=ProcessingStatus.QUEUED,
+                    status_version=0,
+                    change_seq=last_seq - len(rows) + 1 + offset,
+                    heartbeat_at=now,
+                    created_at=now,
+                    updated_at=now
+                )
+            db.execute(insert(TextProcessingJob.__table__), rows)
+            apply_counter_deltas(connection, {
+                (self.user_id, self.category, ProcessingStatus.QUEUED.value): len(rows)
+            })
+            db.commit()
+            return [row["job_id"] for row in rows]
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _claim_released_jobs(self) -> List[str]:
+        """Assume os jobs desta importação ainda na fila e com lease expirado"""
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+        db = SessionLocal()
+        try:
+            candidates = db.query(TextProcessingJob.job_id, TextProcessingJob.heartbeat_at).filter(
+                TextProcessingJob.job_id.like(f"{IMPORT_JOB_PREFIX}{self.import_id}-%"),
+                TextProcessingJob.status == ProcessingStatus.QUEUED,
+                TextProcessingJob.heartbeat_at < cutoff
+            ).all()
+
+            claimed = []
+            for job_id, heartbeat_at in candidates:
+                if self.registry.is_running(job_id):
+                    continue
+                # Compare-and-set: a recuperação de outro worker pode assumir o mesmo job
+                updated = db.query(TextProcessingJob).filter(
+                    TextProcessingJob.job_id == job_id,
+                    TextProcessingJob.status == ProcessingStatus.QUEUED,
+                    TextProcessingJob.heartbeat_at == heartbeat_at
+                ).update({TextProcessingJob.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+                if updated:
+                    claimed.append(job_id)
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    async def _submit(self, job_id: str):
+        """Envia o job ao pipeline respeitando o limite de jobs simultâneos da importação"""
+        while len(self._in_flight) >= self.max_in_flight:
+            await asyncio.wait(set(self._in_flight), return_when=asyncio.FIRST_COMPLETED)
+
+        task = self.registry.submit(job_id, process_text_background(job_id, self.user_id))
+        self._in_flight.add(task)
+        task.add_done_callback(lambda t, jid=job_id: self._finished(jid, t))
+
+    def _finished(self, job_id: str, task: asyncio.Task):
+        self._in_flight.discard(task)
+        self._leased.discard(job_id)
+
+    def _update_leases(self, job_ids: List[str], heartbeat_at: datetime):
+        db = SessionLocal()
+        try:
+            db.query(TextProcessingJob).filter(
+                TextProcessingJob.job_id.in_(job_ids),
+                TextProcessingJob.status == ProcessingStatus.QUEUED
+            ).update({TextProcessingJob.heartbeat_at: heartbeat_at}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    async def _renew_leases(self):
+        """Mantém o lease dos jobs criados e ainda não enviados (a recuperação não os assume)"""
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_INTERVAL_SECONDS)
+            pending = [job_id for job_id in self._leased if not self.registry.is_running(job_id)]
+            if pending:
+                try:
+                    self._update_leases(pending, datetime.utcnow())
+                except Exception as e:
+                    logger.error(f"Erro ao renovar lease da importação: {e}")
+
+    def _release_pending(self):
+        """
+        Importação interrompida: libera o lease dos jobs não enviados. A
+        recuperação retoma a importação, que os reenvia dentro do limite
+        """
+        pending = [job_id for job_id in self._leased if not self.registry.is_running(job_id)]
+        if pending:
+            try:
+                self._update_leases(pending, datetime(1970, 1, 1))
+            except Exception as e:
+                logger.error(f"Erro ao liberar jobs da importação: {e}")
+
+
+class BulkImportService:
+    """Importações em execução neste processo"""
+
+    def __init__(self):
+        self._imports: Dict[str, BulkImport] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def start(self, source: str, user_id: str, category: str = "inbox") -> BulkImport:
+        """Inicia (ou retoma) a importação; chamadas repetidas não duplicam a execução"""
+        bulk_import = BulkImport(source, user_id, category)
+        running = self._tasks.get(bulk_import.import_id)
+        if running and not running.done():
+            return self._imports[bulk_import.import_id]
+
+        self._imports[bulk_import.import_id] = bulk_import
+        self._tasks[bulk_import.import_id] = asyncio.create_task(bulk_import.run())
+        return bulk_import
+
+    def resume(self, import_id: str) -> bool:
+        """
+        Retoma uma importação interrompida a partir do manifesto (os jobs
+        liberados voltam ao pipeline pelo limite da importação); False se não
+        houver manifesto
+        """
+        running = self._tasks.get(import_id)
+        if running and not running.done():
+            return True
+
+        manifest = ImportManifest(Path(settings.IMPORT_MANIFEST_DIR) / f"{import_id}.jsonl")
+        header = manifest.header
+        if not header.get("source") or not header.get("user_id"):
+            return False
+        logger.info(f"Retomando a importação {import_id} ({header['source']})")
+        self.start(header["source"], header["user_id"], header.get("category", "inbox"))
+        return True
+
+    def get(self, import_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """Progresso da importação (em memória ou, após reinício, do manifesto)"""
+        bulk_import = self._imports.get(import_id)
+        if bulk_import:
+            return bulk_import.progress() if bulk_import.user_id == user_id else None
+
+        manifest = ImportManifest(Path(settings.IMPORT_MANIFEST_DIR) / f"{import_id}.jsonl")
+        if manifest.header.get("user_id") != user_id:
+            return None
+        statuses = [entry["status"] for entry in manifest.entries.values()]
+        return {
+            "import_id": import_id,
+            "source": manifest.header.get("source"),
+            "category": manifest.header.get("category"),
+            "status": "completed" if manifest.summary else "interrupted",
+            "queued": statuses.count("queued"),
+            "skipped": statuses.count("skipped")
+        }
+
+    async def stop(self):
+        """Interrompe as importações (o manifesto permite retomá-las)"""
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Instância global do serviço de importação
+bulk_imports = BulkImportService()
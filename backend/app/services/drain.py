@@ -0,0 +1,97 @@
+"""
+Drenagem do processo no encerramento (deploys enviam SIGTERM)
+"""
+import asyncio
+import logging
+import os
+import signal
+from typing import Optional
+
+from ..core.config import settings
+from .bulk_import import bulk_imports
+from .job_counters import job_counter_reconciler
+from .job_recovery import job_recovery
+from .job_registry import JobTaskRegistry, job_registry
+from .retry_scheduler import retry_scheduler
+from .webhooks import webhook_dispatcher
+
+logger = logging.getLogger(__name__)
+
+
+class DrainController:
+    """
+    Coordena o encerramento gracioso: deixa de aceitar trabalho, aguarda os
+    jobs em andamento até o prazo, devolve à fila os que não terminaram e
+    esvazia os buffers antes de o servidor encerrar
+    """
+
+    def __init__(self, registry: JobTaskRegistry = job_registry, timeout_seconds: float = None):
+        self.registry = registry
+        self.timeout = settings.SHUTDOWN_DRAIN_TIMEOUT_SECONDS if timeout_seconds is None else timeout_seconds
+        self.draining = False
+        self._drain_task: Optional[asyncio.Task] = None
+
+    def install_signal_handler(self):
+        """
+        Substitui o tratamento de SIGTERM do uvicorn: a drenagem acontece com o
+        servidor ainda respondendo (o /health passa a informar "draining") e só
+        depois o encerramento normal é disparado via SIGINT
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGTERM, self._on_sigterm)
+        except (NotImplementedError, RuntimeError):
+            # Windows ou fora da thread principal: fica o comportamento padrão
+            logger.warning("Drenagem por SIGTERM indisponível nesta plataforma")
+
+    def _on_sigterm(self):
+        if self._drain_task:
+            logger.info("SIGTERM recebido novamente; drenagem já em andamento")
+            return
+        logger.info("SIGTERM recebido; iniciando drenagem")
+        self._drain_task = asyncio.create_task(self._drain_and_exit())
+
+    async def _drain_and_exit(self):
+        try:
+            await self.drain()
+        finally:
+            os.kill(os.getpid(), signal.SIGINT)
+
+    async def drain(self, timeout: float = None) -> int:
+        """Executa a drenagem (idempotente); retorna quantos jobs foram devolvidos à fila"""
+        if self.draining:
+            if self._drain_task and self._drain_task is not asyncio.current_task():
+                await asyncio.gather(self._drain_task, return_exceptions=True)
+            return 0
+        self.draining = True
+        timeout = self.timeout if timeout is None else timeout
+
+        # Nada de novo trabalho: sem varreduras nem reprocessamentos automáticos
+        await retry_scheduler.stop()
+        await job_recovery.stop()
+        await job_counter_reconciler.stop()
+        # Importações param de alimentar o pipeline; o manifesto permite retomá-las
+        await bulk_imports.stop()
+
+        tasks = self.registry.active_tasks()
+        handed_off = 0
+        if tasks:
+            logger.info(f"Aguardando {len(tasks)} jobs em andamento (até {timeout}s)")
+            # Mantém o lease enquanto espera, para que outro processo não assuma os jobs
+            job_recovery.renew_leases()
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            if pending:
+                interrupted = self.registry.interrupt_all()
+                await asyncio.gather(*pending, return_exceptions=True)
+                handed_off = len(interrupted)
+                logger.warning(f"{handed_off} jobs devolvidos à fila após o prazo de drenagem")
+
+        # Entregas pendentes de webhook
+        await webhook_dispatcher.stop()
+
+        logger.info("Drenagem concluída")
+        return handed_off
+
+
+# Instância global do controle de drenagem
+drain_controller = DrainController()
@@ -3,15 +3,16 @@ Serviço para extrair conteúdo de arquivos (PDF, DOC, Imagens)
 """
 import os
 from pathlib import Path
-from typing import Dict, List
+from typing import List
 import PyPDF2
 from docx import Document
 from PIL import Image
 import pytesseract
 
 class FileProcessor:
-    def __init__(self):
-        pass
+    def __init__(self, ocr_timeout: float = 0):
+        # Limite (s) do processo do Tesseract; 0 = sem limite
+        self.ocr_timeout = ocr_timeout
     
     def extract_text_from_file(self, file_path: str) -> str:
         """
@@ -27,10 +28,13 @@ class FileProcessor:
                 return self._extract_from_docx(file_path)
             elif extension in ['.png', '.jpg', '.jpeg', '.gif', '.webp']:
                 return self._extract_from_image(file_path)
-            elif extension == '.txt':
+            elif extension in ['.txt', '.md', '.markdown']:
                 return self._extract_from_txt(file_path)
             else:
                 return f"[Arquivo {file_path.name} - tipo não suportado para extração]"
+        except TimeoutError:
+            # Prazo esgotado não é conteúdo: deixa o chamador decidir
+            raise
         except Exception as e:
             return f"[Erro ao extrair texto de {file_path.name}: {str(e)}]"
     
@@ -89,14 +93,21 @@ class FileProcessor:
             
             # Tentar extrair texto usando OCR
             try:
-                text = pytesseract.image_to_string(image, lang='por')
+                text = pytesseract.image_to_string(image, lang='por', timeout=self.ocr_timeout)
                 if text.strip():
                     return f"[Texto extraído da imagem {file_path.name}]\n{text.strip()}"
                 else:
                     return f"[Imagem {file_path.name} - sem texto detectado pelo OCR]"
             except pytesseract.TesseractNotFoundError:
                 return f"[Imagem {file_path.name} - OCR não disponível (Tesseract não instalado)]"
+            except RuntimeError as e:
+                # pytesseract encerra o processo e sinaliza o timeout com RuntimeError
+                if "timeout" in str(e).lower():
+                    raise TimeoutError(f"OCR excedeu {self.ocr_timeout:.1f}s em {file_path.name}")
+                raise
         
+        except TimeoutError:
+            raise
         except Exception as e:
             return f"[Erro ao processar imagem: {str(e)}]"
     
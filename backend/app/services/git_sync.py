@@ -0,0 +1,347 @@
+"""
+Sincronização via git: notas gravadas na árvore de trabalho e commitadas em lotes
+"""
+import asyncio
+import logging
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from ..core import metrics
+from ..core.config import settings
+from .vault_io import vault_io
+
+logger = logging.getLogger(__name__)
+
+# Caminhos listados na mensagem de cada commit
+COMMIT_MESSAGE_PATHS = 20
+
+# Um lock por repositório no processo: commits e pushes de contextos
+# diferentes nunca disputam o .git/index.lock
+_repo_locks: Dict[str, threading.Lock] = {}
+_repo_locks_guard = threading.Lock()
+
+
+def repo_lock(root: str) -> threading.Lock:
+    """Lock do repositório (caminho da raiz da árvore de trabalho)"""
+    with _repo_locks_guard:
+        return _repo_locks.setdefault(root, threading.Lock())
+
+
+class GitSyncError(Exception):
+    """Falha de um comando git"""
+
+
+class GitSyncConflict(GitSyncError):
+    """Commits do serviço não puderam ser reaplicados sobre os do remoto"""
+
+
+def run_git(root: str, *args: str, input: str = None, check: bool = True) -> subprocess.CompletedProcess:
+    """Executa git na raiz informada (bloqueante: usar fora do event loop)"""
+    env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+    result = subprocess.run(
+        ["git", "--literal-pathspecs", "-C", root, *args],
+        input=input,
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        env=env
+    )
+    if check and result.returncode != 0:
+        raise GitSyncError(f"git {args[0]} falhou ({result.returncode}): {result.stderr.strip()}")
+    return result
+
+
+def identity_args() -> List[str]:
+    """Autor e committer dos commits do serviço (o repositório pode não ter identidade configurada)"""
+    return [
+        "-c", f"user.name={settings.GIT_SYNC_AUTHOR_NAME}",
+        "-c", f"user.email={settings.GIT_SYNC_AUTHOR_EMAIL}"
+    ]
+
+
+def parse_status(output: str) -> List[Tuple[str, str]]:
+    """Entradas (código XY, caminho) de `git status --porcelain -z`"""
+    entries = output.split("\0")
+    parsed = []
+    index = 0
+    while index < len(entries):
+        entry = entries[index]
+        index += 1
+        if len(entry) < 4:
+            continue
+        code, path = entry[:2], entry[3:]
+        if code[0] in "RC":
+            # Renomeações e cópias trazem o caminho de origem na entrada seguinte
+            index += 1
+        parsed.append((code, path))
+    return parsed
+
+
+class GitSyncTransport:
+    """
+    Acumula as notas gravadas no vault (um repositório git) e as commita em
+    lotes: quando o lote chega a batch_size notas ou batch_seconds após a
+    primeira nota pendente, o que vier antes. Um commit por nota deixaria
+    importações grandes lentas e o histórico inchado. Os commits são enviados
+    ao remoto periodicamente (push_interval_seconds), reaplicados sobre os
+    commits novos do remoto quando necessário
+
+    O lote só existe em memória: notas gravadas e não commitadas antes de o
+    processo encerrar são recuperadas pelo `git status` (recover)
+    """
+
+    def __init__(
+        self,
+        root: str,
+        remote: str = None,
+        batch_size: int = None,
+        batch_seconds: float = None,
+        push_interval_seconds: float = None
+    ):
+        self.root = root
+        self.remote = settings.GIT_SYNC_REMOTE if remote is None else remote
+        self.batch_size = batch_size or settings.GIT_SYNC_BATCH_SIZE
+        self.batch_seconds = settings.GIT_SYNC_BATCH_SECONDS if batch_seconds is None else batch_seconds
+        self.push_interval = push_interval_seconds or settings.GIT_SYNC_PUSH_INTERVAL_SECONDS
+        self.lock = repo_lock(root)
+        self._pending: Set[str] = set()
+        self._unpushed = 0
+        self.last_push_error: Optional[str] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._push_task: Optional[asyncio.Task] = None
+
+    def add(self, file_path):
+        """Registra uma nota já gravada na árvore de trabalho (não espera o commit)"""
+        self._enqueue([Path(file_path).resolve().relative_to(self.root).as_posix()])
+
+    def _enqueue(self, paths: List[str]):
+        self._pending.update(paths)
+        if self._push_task is None:
+            self._push_task = asyncio.create_task(self._push_loop())
+        if len(self._pending) >= self.batch_size:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.batch_seconds, self._schedule_flush)
+
+    async def recover(self, vault_path) -> int:
+        """
+        Inclui no lote as notas do vault alteradas ou não rastreadas na árvore
+        de trabalho (gravadas antes de um encerramento, sem o commit do lote).
+        Alterações já adicionadas ao índice pelo usuário continuam de fora
+        """
+        try:
+            paths = await vault_io.run(self._uncommitted_notes, vault_path, operation="git")
+        except Exception as e:
+            logger.error(f"Erro ao verificar notas não commitadas em {vault_path}: {e}")
+            return 0
+        if paths:
+            logger.info(f"{len(paths)} notas não commitadas em {vault_path} incluídas no próximo lote")
+            self._enqueue(paths)
+        return len(paths)
+
+    def _uncommitted_notes(self, vault_path) -> List[str]:
+        with self.lock:
+            output = run_git(
+                self.root, "status", "--porcelain", "-z", "--untracked-files=all",
+                "--", str(Path(vault_path).expanduser().resolve())
+            ).stdout
+        return [
+            path for code, path in parse_status(output)
+            if path.endswith(".md") and (code == "??" or (code[0] == " " and code[1] == "M"))
+        ]
+
+    def _schedule_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Um commit por vez; as notas que chegam enquanto isso formam o próximo lote
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while self._pending:
+            if not await self.flush():
+                # Falhou: as notas voltam para o lote e o próximo intervalo tenta de novo
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(self.batch_seconds, self._schedule_flush)
+                return
+            if len(self._pending) < self.batch_size:
+                if self._pending and self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(self.batch_seconds, self._schedule_flush)
+                return
+
+    async def flush(self) -> bool:
+        """Commita um lote (até batch_size notas pendentes) agora; False se o commit falhar"""
+        paths = sorted(self._pending)[:self.batch_size]
+        self._pending.difference_update(paths)
+        if not paths:
+            return True
+        try:
+            committed = await vault_io.run(self._commit, paths, operation="git")
+        except Exception as e:
+            metrics.GIT_SYNC_OPERATIONS.labels(operation="commit", result="failed").inc()
+            logger.error(f"Erro ao commitar {len(paths)} notas em {self.root}: {e}")
+            self._pending.update(paths)
+            return False
+        metrics.GIT_SYNC_OPERATIONS.labels(operation="commit", result="ok").inc()
+        if committed:
+            self._unpushed += 1
+            logger.info(f"Commit de {committed} notas no repositório do vault {self.root}")
+        return True
+
+    def _commit(self, paths: List[str]) -> int:
+        """git add + commit apenas das notas do lote (alterações do usuário no índice ficam de fora)"""
+        with self.lock:
+            existing = [path for path in paths if os.path.exists(os.path.join(self.root, path))]
+            if existing:
+                run_git(self.root, "add", "--pathspec-from-file=-", "--pathspec-file-nul",
+                        input="\0".join(existing))
+            staged = set(run_git(self.root, "diff", "--cached", "--name-only", "-z").stdout.split("\0"))
+            changed = [path for path in paths if path in staged]
+            if not changed:
+                return 0
+
+            listed = "\n".join(f"- {path}" for path in changed[:COMMIT_MESSAGE_PATHS])
+            if len(changed) > COMMIT_MESSAGE_PATHS:
+                listed += f"\n- ... e mais {len(changed) - COMMIT_MESSAGE_PATHS}"
+            message = f"ObsidianAI: {len(changed)} notas sincronizadas\n\n{listed}\n"
+            run_git(
+                self.root,
+                *identity_args(),
+                "commit", "--quiet", "--no-verify", "-m", message,
+                "--pathspec-from-file=-", "--pathspec-file-nul",
+                input="\0".join(changed)
+            )
+            return len(changed)
+
+    async def _push_loop(self):
+        while True:
+            await asyncio.sleep(self.push_interval)
+            await self.push()
+
+    async def push(self) -> bool:
+        """Envia os commits ao remoto, se houver commits novos e remoto configurado"""
+        if not self._unpushed or not self.remote:
+            return True
+        unpushed = self._unpushed
+        try:
+            pushed = await vault_io.run(self._push, operation="git")
+        except Exception as e:
+            result = "conflict" if isinstance(e, GitSyncConflict) else "failed"
+            metrics.GIT_SYNC_OPERATIONS.labels(operation="push", result=result).inc()
+            self.last_push_error = str(e)
+            logger.error(f"Erro no push do repositório do vault {self.root}: {e}")
+            return False
+        if pushed:
+            metrics.GIT_SYNC_OPERATIONS.labels(operation="push", result="ok").inc()
+            self.last_push_error = None
+            self._unpushed -= unpushed
+        return True
+
+    def _push(self) -> bool:
+        with self.lock:
+            remotes = run_git(self.root, "remote").stdout.split()
+            if self.remote not in remotes:
+                logger.warning(f"Remoto {self.remote} não configurado em {self.root}; push ignorado")
+                return False
+            start = time.perf_counter()
+            branch = run_git(self.root, "symbolic-ref", "--quiet", "--short", "HEAD").stdout.strip()
+            run_git(self.root, "fetch", "--quiet", self.remote)
+            self._rebase_onto(f"refs/remotes/{self.remote}/{branch}")
+            run_git(self.root, "push", "--quiet", self.remote, "HEAD")
+            logger.info(f"Push do vault {self.root} em {time.perf_counter() - start:.2f}s")
+            return True
+
+    def _rebase_onto(self, upstream: str):
+        """Reaplica os commits locais sobre os do remoto (outro dispositivo pode ter enviado notas)"""
+        if run_git(self.root, "rev-parse", "--verify", "--quiet", upstream, check=False).returncode != 0:
+            # Ramo ainda não existe no remoto
+            return
+        if run_git(self.root, "merge-base", "--is-ancestor", upstream, "HEAD", check=False).returncode == 0:
+            return
+        stashes = self._stash_count()
+        rebase = run_git(self.root, *identity_args(), "rebase", "--quiet", "--autostash", upstream, check=False)
+        if rebase.returncode != 0:
+            # Conflito: o repositório volta ao estado anterior e o push fica para o próximo ciclo
+            run_git(self.root, "rebase", "--abort", check=False)
+            raise GitSyncConflict(f"rebase sobre {upstream} falhou: {rebase.stderr.strip() or rebase.stdout.strip()}")
+        unmerged = run_git(self.root, "diff", "--name-only", "--diff-filter=U", check=False).stdout.split()
+        if unmerged or self._stash_count() > stashes:
+            # O rebase terminou (código 0), mas reaplicar as alterações não
+            # commitadas conflitou: marcadores no arquivo e o autostash guardado
+            # na pilha. Volta ao commit anterior e devolve as alterações intactas
+            run_git(self.root, "reset", "--hard", "--quiet", "ORIG_HEAD", check=False)
+            run_git(self.root, "stash", "pop", "--quiet", check=False)
+            raise GitSyncConflict(f"alterações não commitadas conflitam com {upstream} após o rebase")
+
+    def _stash_count(self) -> int:
+        return len(run_git(self.root, "stash", "list", check=False).stdout.splitlines())
+
+    async def stop(self):
+        """Commita o lote pendente e faz o push final"""
+        if self._push_task is not None:
+            self._push_task.cancel()
+            await asyncio.gather(self._push_task, return_exceptions=True)
+        if self._flush_task is not None:
+            # Um commit em andamento termina antes do último lote
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        self._push_task = self._flush_task = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending and await self.flush():
+            pass
+        await self.push()
+
+
+class GitSyncRegistry:
+    """Um GitSyncTransport por repositório (vaults no mesmo repositório compartilham o lote)"""
+
+    def __init__(self):
+        self._transports: Dict[str, GitSyncTransport] = {}
+        self._roots: Dict[str, str] = {}
+
+    async def get(self, vault_path: str) -> GitSyncTransport:
+        """Transporte do repositório que contém o vault (GitSyncError se não for um repositório)"""
+        root = self._roots.get(vault_path)
+        if root is None:
+            result = await vault_io.run(
+                run_git, str(Path(vault_path).expanduser()), "rev-parse", "--show-toplevel", operation="git"
+            )
+            root = str(Path(result.stdout.strip()).resolve())
+            transport = self._transport(root)
+            # Primeiro uso do vault neste processo: notas gravadas antes de um
+            # encerramento e ainda fora de um commit voltam ao lote
+            self._roots[vault_path] = root
+            await transport.recover(vault_path)
+            return transport
+        return self._transport(root)
+
+    def _transport(self, root: str) -> GitSyncTransport:
+        transport = self._transports.get(root)
+        if transport is None:
+            transport = self._transports[root] = GitSyncTransport(root)
+            logger.info(f"Sincronização via git ativa para o repositório: {root}")
+        return transport
+
+    def failing(self) -> Dict[str, str]:
+        """Repositórios cujo último push falhou (raiz -> erro)"""
+        return {
+            root: transport.last_push_error
+            for root, transport in self._transports.items()
+            if transport.last_push_error
+        }
+
+    async def stop(self):
+        """Encerra todos os transportes (commit e push do que estiver pendente)"""
+        for transport in list(self._transports.values()):
+            await transport.stop()
+
+
+# Instância global do registro de repositórios git
+git_syncs = GitSyncRegistry()
@@ -0,0 +1,98 @@
+"""
+Reconciliação periódica dos contadores de jobs
+"""
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, Optional
+
+from sqlalchemy import String, cast, func, literal, select, union_all
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.job_counter import CounterKey, JobCounter, apply_counter_deltas
+from ..models.text_processing import ProcessingStatus, TextProcessingJob
+
+logger = logging.getLogger(__name__)
+
+
+class JobCounterReconciler:
+    """Recalcula os contadores a partir da tabela de jobs e corrige divergências"""
+
+    def __init__(self, interval_seconds: int = None):
+        self.interval = interval_seconds or settings.JOB_COUNTER_RECONCILE_INTERVAL_SECONDS
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def reconcile(self) -> int:
+        """Corrige os contadores pela contagem real dos jobs; retorna o total de divergência encontrada"""
+        db = SessionLocal()
+        try:
+            # Jobs e contadores lidos numa única consulta (um só snapshot): uma
+            # transição concorrente aparece nos dois ou em nenhum
+            jobs = select(
+                literal("job").label("source"),
+                TextProcessingJob.user_id,
+                TextProcessingJob.category,
+                cast(TextProcessingJob.status, String).label("status"),
+                func.count(TextProcessingJob.id).label("count")
+            ).group_by(
+                TextProcessingJob.user_id,
+                TextProcessingJob.category,
+                TextProcessingJob.status
+            )
+            counters = select(
+                literal("counter").label("source"),
+                JobCounter.user_id,
+                JobCounter.category,
+                JobCounter.status,
+                JobCounter.count
+            )
+
+            actual: Dict[CounterKey, int] = Counter()
+            stored: Dict[CounterKey, int] = Counter()
+            for source, user_id, category, status, count in db.execute(union_all(jobs, counters)):
+                if source == "job":
+                    # O Enum é gravado pelo nome; os contadores usam o valor
+                    actual[(user_id, category, ProcessingStatus[status].value)] += count
+                else:
+                    stored[(user_id, category, status)] += count
+
+            # Correção por diferença, como as transições: os incrementos
+            # comutam com os de transições que commitarem depois da leitura
+            deltas = {key: actual[key] - stored[key] for key in set(actual) | set(stored)}
+            apply_counter_deltas(db.connection(), deltas)
+            db.commit()
+
+            drift = sum(abs(delta) for delta in deltas.values())
+            if drift:
+                logger.warning(f"Contadores de jobs corrigidos (divergência: {drift})")
+            return drift
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.reconcile)
+            except Exception as e:
+                logger.error(f"Erro na reconciliação dos contadores: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Inicia a reconciliação periódica (a primeira é imediata)"""
+        if not self._loop_task:
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Interrompe a reconciliação periódica"""
+        if self._loop_task:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+
+
+# Instância global do reconciliador
+job_counter_reconciler = JobCounterReconciler()
@@ -0,0 +1,331 @@
+"""
+Pipeline de processamento dos jobs em background
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from ..core import metrics
+from ..core.database import SessionLocal
+from ..models.text_processing import TextProcessingJob, ProcessingStatus
+from ..models.user_configuration import UserConfiguration
+from ..utils.deadline import Deadline
+from ..utils.timing import StageTimer
+from .ai_processor import AIProcessor, AIResponseParseError
+from .git_sync import git_syncs
+from .job_registry import job_registry
+from .obsidian_sync import ObsidianSync
+from .retry_policy import ERROR_PARSE, record_failure
+from .vault_index import content_hash
+from .vault_io import vault_io
+from .vault_registry import vault_syncs
+
+logger = logging.getLogger(__name__)
+
+# Instâncias dos serviços (obsidian_sync monitora o vault padrão; as notas
+# são gravadas pelo contexto do vault de cada usuário, em vault_syncs)
+ai_processor = AIProcessor()
+obsidian_sync = ObsidianSync()
+
+
+# Etapas executadas por process_text_background; as demais pertencem à sincronização
+AI_STAGES = ("extract", "ai")
+
+
+async def process_text_background(job_id: str, user_id: str):
+    """
+    Processa texto em background
+    """
+    db = SessionLocal()
+    timer = StageTimer()
+    try:
+        # Busca job
+        job = db.query(TextProcessingJob).filter(
+            TextProcessingJob.job_id == job_id
+        ).first()
+        
+        if not job:
+            logger.error(f"Job não encontrado: {job_id}")
+            return
+        
+        if job.status == ProcessingStatus.CANCELLED:
+            logger.info(f"Job {job_id} cancelado antes do início")
+            return
+        
+        if job.created_at:
+            timer.record("queue_wait", (datetime.utcnow() - job.created_at).total_seconds())
+        
+        # Busca configurações do usuário
+        with timer.stage("config_load"):
+            user_config = db.query(UserConfiguration).filter(
+                UserConfiguration.user_id == user_id
+            ).first()
+        
+        # Marca início do processamento; o prazo vale para toda a tentativa,
+        # inclusive a sincronização executada em seguida
+        job.mark_processing_started()
+        deadline = Deadline(job.start_deadline())
+        db.commit()
+        
+        try:
+            if job.resume_stage() == "extract":
+                with timer.stage("extract"):
+                    await _run_extract_stage(job, deadline)
+                db.commit()
+            
+            if job.resume_stage() == "ai":
+                await _run_ai_stage(db, job, user_config, timer, deadline)
+                if job.status == ProcessingStatus.CANCELLED:
+                    return
+            else:
+                # Saída da IA já persistida em checkpoint: não paga nova geração
+                logger.info(f"Job {job_id} retomado após a etapa de IA")
+                job.status = ProcessingStatus.PROCESSED
+            
+            job.record_stage_timings(timer.timings)
+            with timer.stage("db_commit"):
+                db.commit()
+            
+            # Sincroniza com Obsidian
+            if user_config and user_config.auto_sync_enabled:
+                await sync_to_obsidian_background(job_id, user_id, timer=timer, deadline=deadline)
+            else:
+                job.record_stage_timings({"db_commit": timer.timings["db_commit"]})
+                db.commit()
+                metrics.observe_job_stages(timer.timings, job.category, job.ai_model_used)
+            
+        except asyncio.CancelledError:
+            logger.info(f"Processamento do job {job_id} interrompido")
+            db.rollback()
+            db.refresh(job)
+            if job_registry.was_interrupted(job_id):
+                _hand_off(db, job)
+            elif job.status in [ProcessingStatus.QUEUED, ProcessingStatus.PROCESSING]:
+                job.mark_cancelled()
+                db.commit()
+            raise
+        except AIResponseParseError as e:
+            logger.error(f"Resposta da IA inválida: {e}")
+            job.ai_response = e.raw_response
+            record_failure(job, e)
+            db.commit()
+        except Exception as e:
+            logger.error(f"Erro no processamento: {e}")
+            record_failure(job, e)
+            db.commit()
+            
+    except Exception as e:
+        logger.error(f"Erro no processamento em background: {e}")
+    finally:
+        db.close()
+
+
+async def _run_extract_stage(job: TextProcessingJob, deadline: Deadline):
+    """Etapa "extract": obtém o texto do arquivo de origem do job"""
+    if not job.temp_file_path:
+        raise ValueError("Job sem texto e sem arquivo de origem")
+    
+    # Importação tardia: PDF/DOCX/OCR são dependências opcionais
+    from .file_processor import FileProcessor
+    
+    # O Tesseract recebe o mesmo orçamento e é encerrado, em vez de prender a thread
+    processor = FileProcessor(ocr_timeout=deadline.require("extract"))
+    text = await deadline.run(
+        "extract",
+        asyncio.to_thread(processor.extract_text_from_file, job.temp_file_path)
+    )
+    job.original_text = text
+    job.save_checkpoint("extract", {"source": job.temp_file_path, "chars": len(text)})
+
+
+async def _run_ai_stage(db, job: TextProcessingJob, user_config, timer: StageTimer, deadline: Deadline):
+    """Etapa "ai": gera (ou repara) a nota e persiste o checkpoint"""
+    if job.error_kind == ERROR_PARSE and job.ai_response:
+        # Resposta anterior já paga: apenas tenta repará-la
+        processed_data = ai_processor.repair_ai_response(
+            job.ai_response, job.original_text, job.category
+        )
+    else:
+        # Processa com IA
+        user_preferences = user_config.get_ai_preferences() if user_config else None
+        
+        processed_data = await ai_processor.process_text(
+            text=job.original_text,
+            category=job.category,
+            user_preferences=user_preferences,
+            deadline=deadline
+        )
+    
+    # Cancelamento feito por outro processo durante a chamada à IA
+    db.refresh(job)
+    if job.status == ProcessingStatus.CANCELLED:
+        logger.info(f"Job {job.job_id} cancelado durante o processamento")
+        return
+    
+    # A espera por slot de IA não conta para o prazo: registra o prazo adiado
+    job.deadline_at = deadline.expires_at
+    
+    # Marca processamento concluído
+    job.mark_processing_completed(
+        processed_markdown=processed_data["content"],
+        ai_response=str(processed_data),
+        metadata=processed_data.get("metadata", {})
+    )
+    # O conteúdo fica em processed_markdown; o checkpoint guarda o restante
+    job.save_checkpoint("ai", {
+        "title": processed_data.get("title"),
+        "tags": processed_data.get("tags", []),
+        "category": processed_data.get("category", job.category)
+    })
+    
+    # Adiciona metadados de processamento
+    if "processing_metadata" in processed_data:
+        job.processing_time_seconds = processed_data["processing_metadata"].get("processing_time_seconds", 0)
+        job.ai_model_used = processed_data["processing_metadata"].get("ai_model_used", "unknown")
+        timer.timings.update(processed_data["processing_metadata"].get("stage_timings", {}))
+
+
+async def sync_to_obsidian_background(
+    job_id: str,
+    user_id: str,
+    timer: Optional[StageTimer] = None,
+    deadline: Optional[Deadline] = None
+):
+    """
+    Sincroniza nota com Obsidian em background (dentro do prazo recebido ou,
+    quando executada isoladamente, de um prazo próprio da tentativa)
+    """
+    db = SessionLocal()
+    timer = timer or StageTimer()
+    try:
+        # Busca job
+        job = db.query(TextProcessingJob).filter(
+            TextProcessingJob.job_id == job_id
+        ).first()
+        
+        if not job or job.status != ProcessingStatus.PROCESSED:
+            return
+        
+        # Busca configurações do usuário
+        user_config = db.query(UserConfiguration).filter(
+            UserConfiguration.user_id == user_id
+        ).first()
+        
+        if not user_config or not user_config.obsidian_vault_path:
+            logger.warning(f"Vault não configurado para usuário {user_id}")
+            return
+        
+        # Marca início da sincronização
+        job.mark_sync_started()
+        if deadline is None:
+            deadline = Deadline(job.start_deadline())
+        
+        try:
+            vault_sync = await vault_syncs.get(user_config.obsidian_vault_path)
+            
+            # Etapa "render": reaproveitada nas novas tentativas, o que mantém
+            # o mesmo nome de arquivo e evita notas duplicadas
+            render = job.get_checkpoint("render")
+            if not render:
+                ai_output = job.get_checkpoint("ai") or {}
+                processed_data = {
+                    "title": ai_output.get("title") or (job.processed_markdown.split('\n')[0].replace('# ', '') if job.processed_markdown else "Nota"),
+                    "content": job.processed_markdown,
+                    "tags": job.get_tags(),
+                    "category": job.category,
+                    "metadata": job.get_metadata(),
+                    "job_id": job.job_id
+                }
+                
+                with timer.stage("frontmatter_render"):
+                    relative_path, content = await vault_io.run(
+                        vault_sync.render_note,
+                        processed_data=processed_data,
+                        category=job.category,
+                        user_id=user_id,
+                        operation="render"
+                    )
+                render = {"relative_path": relative_path, "content": content}
+                job.save_checkpoint("render", render)
+            db.commit()
+            
+            # Etapa "write": cria nota no Obsidian
+            file_path = await deadline.run("write", vault_sync.write_note(
+                render["relative_path"],
+                render["content"],
+                timer=timer
+            ))
+            
+            # Conteúdo renderizado não é mais necessário após a escrita
+            note_hash = content_hash(render["content"].encode("utf-8"))
+            job.save_checkpoint("render", {"relative_path": render["relative_path"]})
+            job.save_checkpoint("write", {"file_path": file_path})
+            
+            # Marca sincronização concluída
+            job.mark_sync_completed(file_path, note_hash)
+            job.record_stage_timings(timer.timings)
+            db.commit()
+            metrics.observe_job_stages(timer.timings, job.category, job.ai_model_used)
+            
+            logger.info(f"Nota sincronizada: {file_path}")
+            
+            if user_config.sync_method == "git":
+                await _queue_git_commit(user_config.obsidian_vault_path, file_path)
+            
+        except asyncio.CancelledError:
+            # Apenas interrupções (drenagem) chegam aqui; a escrita é idempotente
+            db.rollback()
+            db.refresh(job)
+            if job_registry.was_interrupted(job_id):
+                _hand_off(db, job)
+            raise
+        except Exception as e:
+            logger.error(f"Erro na sincronização: {e}")
+            record_failure(job, e, f"Erro na sincronização: {str(e)}")
+            db.commit()
+            
+    except Exception as e:
+        logger.error(f"Erro na sincronização em background: {e}")
+    finally:
+        db.close()
+
+
+async def _queue_git_commit(vault_path: str, file_path: str):
+    """Inclui a nota no próximo commit do repositório do vault (a nota já está gravada)"""
+    try:
+        transport = await git_syncs.get(vault_path)
+        transport.add(file_path)
+    except Exception as e:
+        logger.warning(f"Nota não incluída no commit git ({vault_path}): {e}")
+
+
+def _hand_off(db, job: TextProcessingJob):
+    """Devolve um job interrompido à fila a partir da última etapa concluída"""
+    if job.status not in [
+        ProcessingStatus.QUEUED,
+        ProcessingStatus.PROCESSING,
+        ProcessingStatus.PROCESSED,
+        ProcessingStatus.SYNCING
+    ]:
+        return
+    stage = job.resume_stage()
+    job.release_lease(status_for_stage(stage))
+    db.commit()
+    logger.info(f"Job {job.job_id} devolvido à fila na etapa '{stage}'")
+
+
+def status_for_stage(stage: str) -> ProcessingStatus:
+    """Status em que um job deve ser reenfileirado para retomar na etapa"""
+    if stage in AI_STAGES:
+        return ProcessingStatus.QUEUED
+    return ProcessingStatus.PROCESSED
+
+
+def resume_job(job_id: str, user_id: str, stage: str) -> asyncio.Task:
+    """Agenda o job a partir da primeira etapa incompleta"""
+    if stage in AI_STAGES:
+        coro = process_text_background(job_id, user_id)
+    else:
+        coro = sync_to_obsidian_background(job_id, user_id)
+    return job_registry.submit(job_id, coro)
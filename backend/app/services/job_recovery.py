@@ -0,0 +1,198 @@
+"""
+Recuperação de jobs órfãos (processo encerrado no meio do pipeline)
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Set
+
+from sqlalchemy import and_, or_
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.status_cache import status_cache
+from ..models.change_sequence import next_change_seq
+from ..models.job_counter import apply_counter_deltas, transition_deltas
+from ..models.text_processing import TextProcessingJob, ProcessingStatus
+from ..models.user_configuration import UserConfiguration
+from .bulk_import import bulk_imports, import_id_of
+from .job_pipeline import AI_STAGES, resume_job, status_for_stage
+from .job_registry import JobTaskRegistry, job_registry
+
+logger = logging.getLogger(__name__)
+
+
+class JobRecoveryService:
+    """Renova o lease dos jobs em execução e reenfileira jobs com lease expirado"""
+
+    RECOVERABLE_STATUSES = [
+        ProcessingStatus.QUEUED,
+        ProcessingStatus.PROCESSING,
+        ProcessingStatus.PROCESSED,
+        ProcessingStatus.SYNCING
+    ]
+
+    def __init__(self, registry: JobTaskRegistry = job_registry, batch_size: int = 200):
+        self.registry = registry
+        self.batch_size = batch_size
+        self.lease = timedelta(seconds=settings.JOB_LEASE_SECONDS)
+        self._loops: List[asyncio.Task] = []
+
+    def renew_leases(self) -> int:
+        """Atualiza o heartbeat de todos os jobs ativos neste processo"""
+        job_ids = self.registry.active_jobs()
+        if not job_ids:
+            return 0
+
+        db = SessionLocal()
+        try:
+            updated = db.query(TextProcessingJob).filter(
+                TextProcessingJob.job_id.in_(job_ids)
+            ).update(
+                {TextProcessingJob.heartbeat_at: datetime.utcnow()},
+                synchronize_session=False
+            )
+            db.commit()
+            return updated
+        finally:
+            db.close()
+
+    def recover_orphaned_jobs(self) -> List[str]:
+        """Reenfileira jobs cujo lease expirou a partir da última etapa concluída"""
+        cutoff = datetime.utcnow() - self.lease
+        recovered = []
+
+        db = SessionLocal()
+        try:
+            candidates = db.query(TextProcessingJob).filter(
+                TextProcessingJob.status.in_(self.RECOVERABLE_STATUSES),
+                or_(
+                    TextProcessingJob.heartbeat_at < cutoff,
+                    and_(
+                        TextProcessingJob.heartbeat_at.is_(None),
+                        TextProcessingJob.updated_at < cutoff
+                    )
+                )
+            ).order_by(TextProcessingJob.created_at).limit(self.batch_size).all()
+
+            auto_sync_cache: Dict[str, bool] = {}
+            resumed_imports: Set[str] = set()
+            for job in candidates:
+                if self.registry.is_running(job.job_id):
+                    continue
+
+                # Jobs de importação ainda na fila voltam pela própria importação,
+                # que respeita IMPORT_MAX_IN_FLIGHT
+                import_id = import_id_of(job.job_id)
+                if import_id and job.status == ProcessingStatus.QUEUED:
+                    if import_id in resumed_imports or bulk_imports.resume(import_id):
+                        resumed_imports.add(import_id)
+                        continue
+
+                stage = job.resume_stage()
+                if job.status == ProcessingStatus.PROCESSED:
+                    # PROCESSED é estado final quando o usuário não usa sync automático
+                    if not self._auto_sync_enabled(db, job.user_id, auto_sync_cache):
+                        continue
+                    if stage in AI_STAGES:
+                        continue
+
+                if not self._claim(db, job, stage):
+                    continue
+
+                resume_job(job.job_id, job.user_id, stage)
+                recovered.append(job.job_id)
+
+                logger.warning(f"Job órfão {job.job_id} retomado na etapa '{stage}'")
+
+            return recovered
+        finally:
+            db.close()
+
+    def _claim(self, db, job: TextProcessingJob, stage: str) -> bool:
+        """Assume o job de forma atômica (outros workers podem varrer ao mesmo tempo)"""
+        heartbeat_filter = (
+            TextProcessingJob.heartbeat_at.is_(None)
+            if job.heartbeat_at is None
+            else TextProcessingJob.heartbeat_at == job.heartbeat_at
+        )
+        now = datetime.utcnow()
+        new_status = status_for_stage(stage)
+
+        claimed = db.query(TextProcessingJob).filter(
+            TextProcessingJob.id == job.id,
+            TextProcessingJob.status == job.status,
+            heartbeat_filter
+        ).update(
+            {
+                TextProcessingJob.status: new_status,
+                TextProcessingJob.heartbeat_at: now,
+                TextProcessingJob.updated_at: now,
+                TextProcessingJob.status_version: TextProcessingJob.status_version + 1,
+                TextProcessingJob.change_seq: next_change_seq(db.connection())
+            },
+            synchronize_session=False
+        )
+        # UPDATE em massa não passa pelos eventos do ORM
+        if claimed:
+            apply_counter_deltas(db.connection(), transition_deltas(
+                job.user_id, job.category, job.status.value, new_status.value
+            ))
+        db.commit()
+        status_cache.invalidate(job.job_id)
+        return claimed == 1
+
+    def _auto_sync_enabled(self, db, user_id: str, cache: Dict[str, bool]) -> bool:
+        """Verifica (com cache por varredura) se o usuário tem sync automático"""
+        if user_id not in cache:
+            user_config = db.query(UserConfiguration).filter(
+                UserConfiguration.user_id == user_id
+            ).first()
+            cache[user_id] = bool(
+                user_config and user_config.auto_sync_enabled and user_config.obsidian_vault_path
+            )
+        return cache[user_id]
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_INTERVAL_SECONDS)
+            try:
+                self.renew_leases()
+            except Exception as e:
+                logger.error(f"Erro ao renovar lease dos jobs: {e}")
+
+    async def _recovery_loop(self):
+        while True:
+            try:
+                recovered = self.recover_orphaned_jobs()
+                if recovered:
+                    logger.info(f"{len(recovered)} jobs órfãos recuperados")
+            except Exception as e:
+                logger.error(f"Erro na varredura de jobs órfãos: {e}")
+            await asyncio.sleep(settings.JOB_RECOVERY_INTERVAL_SECONDS)
+
+    def start(self):
+        """Inicia heartbeat e varredura periódica (a primeira varredura é imediata)"""
+        if self._loops:
+            return
+        self._loops = [
+            asyncio.create_task(self._heartbeat_loop()),
+            asyncio.create_task(self._recovery_loop())
+        ]
+
+    def start_heartbeat(self):
+        """Apenas renova leases, sem assumir jobs órfãos (processos auxiliares, ex.: CLI)"""
+        if self._loops:
+            return
+        self._loops = [asyncio.create_task(self._heartbeat_loop())]
+
+    async def stop(self):
+        """Interrompe as tarefas periódicas"""
+        for task in self._loops:
+            task.cancel()
+        await asyncio.gather(*self._loops, return_exceptions=True)
+        self._loops = []
+
+
+# Instância global do serviço de recuperação
+job_recovery = JobRecoveryService()
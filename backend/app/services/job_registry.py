@@ -0,0 +1,96 @@
+"""
+Registro de tarefas em execução por job_id
+"""
+import asyncio
+import logging
+from typing import Awaitable, Dict, List, Optional, Set
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class JobTaskRegistry:
+    """Mantém as tarefas asyncio de cada job para permitir cancelamento real"""
+
+    def __init__(self, max_concurrent_ai_calls: int = None):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._interrupted: Set[str] = set()
+        self._max_ai_calls = max_concurrent_ai_calls or settings.MAX_CONCURRENT_AI_CALLS
+        self._ai_slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def ai_slots(self) -> asyncio.Semaphore:
+        """Semáforo que limita chamadas simultâneas à IA"""
+        # Criado sob demanda para ficar associado ao event loop em execução
+        if self._ai_slots is None:
+            self._ai_slots = asyncio.Semaphore(self._max_ai_calls)
+        return self._ai_slots
+
+    def submit(self, job_id: str, coro: Awaitable) -> asyncio.Task:
+        """Agenda a corrotina do job e registra a tarefa"""
+        previous = self._tasks.get(job_id)
+        if previous and not previous.done():
+            previous.cancel()
+
+        task = asyncio.create_task(coro, name=f"job:{job_id}")
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda t, jid=job_id: self._discard(jid, t))
+        return task
+
+    def _discard(self, job_id: str, task: asyncio.Task):
+        """Remove a tarefa do registro quando termina"""
+        if self._tasks.get(job_id) is task:
+            del self._tasks[job_id]
+            self._interrupted.discard(job_id)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Tarefa do job {job_id} terminou com erro: {task.exception()}")
+
+    def cancel(self, job_id: str) -> bool:
+        """Interrompe a tarefa em execução do job, se houver"""
+        task = self._tasks.get(job_id)
+        if not task or task.done():
+            return False
+
+        task.cancel()
+        logger.info(f"Tarefa do job {job_id} cancelada")
+        return True
+
+    def interrupt_all(self) -> List[str]:
+        """
+        Interrompe todas as tarefas ativas sem cancelar os jobs: o pipeline
+        devolve cada um à fila para ser retomado por outro processo
+        """
+        interrupted = []
+        for job_id, task in list(self._tasks.items()):
+            if task.done():
+                continue
+            self._interrupted.add(job_id)
+            task.cancel()
+            interrupted.append(job_id)
+        return interrupted
+
+    def was_interrupted(self, job_id: str) -> bool:
+        """Indica se a tarefa do job foi interrompida por interrupt_all"""
+        return job_id in self._interrupted
+
+    def active_tasks(self) -> List[asyncio.Task]:
+        """Tarefas ainda em execução"""
+        return [task for task in self._tasks.values() if not task.done()]
+
+    def is_running(self, job_id: str) -> bool:
+        """Indica se o job possui tarefa ativa neste processo"""
+        task = self._tasks.get(job_id)
+        return bool(task and not task.done())
+
+    def active_jobs(self) -> list:
+        """Lista job_ids com tarefas ativas"""
+        return [job_id for job_id, task in self._tasks.items() if not task.done()]
+
+    def active_count(self) -> int:
+        """Número de tarefas ativas"""
+        return len(self.active_jobs())
+
+
+# Instância global do registro
+job_registry = JobTaskRegistry()
@@ -2,19 +2,51 @@
 Serviço de sincronização com Obsidian
 """
 import os
+import logging
+import threading
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any
 from dotenv import load_dotenv
+from watchdog.observers import Observer
+
+from .obsidian_sync import ObsidianVaultMonitor
+from .vault_events import self_writes
+from .vault_index import vault_index
+from .vault_writer import vault_writer
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class ObsidianService:
     def __init__(self):
         self.vault_path = Path(os.getenv("OBSIDIAN_VAULT_PATH", ""))
         self.folders = {
             "inbox": os.getenv("DEFAULT_INBOX_FOLDER", "Inbox")
         }
+        self.index = vault_index
+        self.observer = None
+        self._index_lock = threading.Lock()
+        
+    def _ensure_index(self):
+        """
+        Na primeira utilização, inicia o watchdog do vault e atualiza o índice
+        (as consultas seguintes não precisam varrer as pastas)
+        """
+        if self.observer is not None:
+            return
+        with self._index_lock:
+            if self.observer is not None:
+                return
+            # Sem event loop aqui: o pipeline de eventos roda numa thread própria
+            monitor = ObsidianVaultMonitor(self, self.index)
+            monitor.start()
+            observer = Observer()
+            observer.schedule(monitor, str(self.vault_path), recursive=True)
+            observer.start()
+            self.index.refresh(self.vault_path)
+            self.observer = observer
         
     def ensure_folders(self):
         """
@@ -65,8 +97,14 @@ tags: [ai-processed, {category}]
 """
                 content = metadata + content
             
-            # Salva o arquivo
-            file_path.write_text(content, encoding='utf-8')
+            # Salva o arquivo (atômico: temporário + fsync + rename); o watchdog
+            # ignora o eco desta escrita
+            self_writes.expect(file_path, content)
+            vault_writer.write_sync(file_path, content)
+            try:
+                self.index.update_file(self.vault_path, file_path, content)
+            except Exception as e:
+                logger.warning(f"Nota salva, mas não indexada ({file_path}): {e}")
             
             return {
                 "success": True,
@@ -86,22 +124,22 @@ tags: [ai-processed, {category}]
         Lista as notas mais recentes
         """
         try:
-            notes = []
-            for folder in self.folders.values():
-                folder_path = self.vault_path / folder
-                if folder_path.exists():
-                    for file in folder_path.glob("*.md"):
-                        notes.append({
-                            "name": file.stem,
-                            "path": str(file),
-                            "folder": folder,
-                            "modified": file.stat().st_mtime
-                        })
-            
-            # Ordena por data de modificação
-            notes.sort(key=lambda x: x["modified"], reverse=True)
+            # Sem OBSIDIAN_VAULT_PATH o caminho seria o diretório atual
+            if self.vault_path == Path("") or not self.vault_path.is_dir():
+                return []
+            self._ensure_index()
             
-            return notes[:limit]
+            # Já ordenadas por data de modificação no índice
+            notes = self.index.recent_notes(self.vault_path, self.folders.values(), limit)
+            return [
+                {
+                    "name": note["name"],
+                    "path": note["path"],
+                    "folder": note["folder"],
+                    "modified": note["mtime"]
+                }
+                for note in notes
+            ]
             
-        except Exception as e:
+        except Exception:
             return []
\ No newline at end of file
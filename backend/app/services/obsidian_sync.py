@@ -1,48 +1,106 @@
+import asyncio
 import os
 import shutil
-import yaml
 import logging
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, Optional, Tuple
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
 from ..core.config import settings
+from ..core import metrics
+from ..utils.frontmatter import dump_frontmatter
+from ..utils.timing import StageTimer
+from .vault_index import VaultIndex, vault_index
+from .vault_scanner import vault_scanner
+from .vault_events import (
+    CREATED, DELETED, MODIFIED, MOVED, Handler, VaultEvent, VaultEventPipeline, self_writes
+)
+from .vault_io import vault_io
+from .vault_writer import VaultWriter, vault_writer
 
 logger = logging.getLogger(__name__)
 
 
 class ObsidianVaultMonitor(FileSystemEventHandler):
-    """Monitor de eventos do vault do Obsidian"""
+    """
+    Monitor de eventos do vault do Obsidian: repassa os eventos do watchdog ao
+    pipeline (debounce e agrupamento por caminho) e mantém o índice de
+    metadados atualizado com cada alteração real
+    """
     
-    def __init__(self, sync_service):
+    def __init__(self, sync_service, index: VaultIndex = vault_index, pipeline: VaultEventPipeline = None):
         self.sync_service = sync_service
-        self.processing_files = set()
+        self.index = index
+        # Raiz fixada na criação
+        self.vault_path = sync_service.vault_path
+        self.pipeline = pipeline or VaultEventPipeline()
+        self.pipeline.subscribe(self._apply)
+    
+    def start(self, loop: asyncio.AbstractEventLoop = None):
+        self.pipeline.start(loop)
+    
+    def stop(self):
+        self.pipeline.stop()
     
     def on_created(self, event):
-        if event.is_directory:
-            return
-        
-        if event.src_path.endswith('.md'):
-            logger.info(f"Arquivo criado no vault: {event.src_path}")
+        if not event.is_directory and event.src_path.endswith('.md'):
+            self.pipeline.push(CREATED, event.src_path)
     
     def on_modified(self, event):
-        if event.is_directory or not event.src_path.endswith('.md'):
+        if not event.is_directory and event.src_path.endswith('.md'):
+            self.pipeline.push(MODIFIED, event.src_path)
+    
+    def on_deleted(self, event):
+        if event.is_directory or event.src_path.endswith('.md'):
+            self.pipeline.push(DELETED, event.src_path, is_directory=event.is_directory)
+    
+    def on_moved(self, event):
+        if event.is_directory:
+            self.pipeline.push(MOVED, event.dest_path, event.src_path, is_directory=True)
             return
-        
-        # Evita loops de sincronização
-        if event.src_path not in self.processing_files:
-            logger.info(f"Arquivo modificado no vault: {event.src_path}")
+        source_is_note = event.src_path.endswith('.md')
+        if event.dest_path.endswith('.md'):
+            if source_is_note:
+                self.pipeline.push(MOVED, event.dest_path, event.src_path)
+            else:
+                # Gravação atômica (temporário renomeado sobre a nota)
+                self.pipeline.push(MODIFIED, event.dest_path)
+        elif source_is_note:
+            self.pipeline.push(DELETED, event.src_path)
+    
+    async def _apply(self, event: VaultEvent):
+        await vault_io.run(self._update_index, event, operation="index")
+    
+    def _update_index(self, event: VaultEvent):
+        if event.kind == DELETED:
+            self.index.remove_path(self.vault_path, event.path)
+        elif event.kind == MOVED:
+            self.index.remove_path(self.vault_path, event.src_path)
+            if event.is_directory:
+                # Pastas renomeadas: reindexa o vault
+                self.index.refresh(self.vault_path)
+            else:
+                self.index.update_file(self.vault_path, event.path)
+        elif not event.is_directory:
+            self.index.update_file(self.vault_path, event.path)
 
 
 class ObsidianSync:
     """Serviço de sincronização com vault do Obsidian"""
     
-    def __init__(self, vault_path: str = None):
+    def __init__(self, vault_path: str = None, index: VaultIndex = vault_index, writer: VaultWriter = vault_writer):
         self.vault_path = Path(vault_path) if vault_path else Path(settings.DEFAULT_VAULT_PATH)
+        self.index = index
+        self.writer = writer
         self.observer = None
         self.monitor = None
+        self._refresh_task = None
+        # Pastas que já existem (evita um mkdir por nota) e ordem de envio das
+        # escritas deste vault ao escritor
+        self._known_dirs = set()
+        self._write_lock = asyncio.Lock()
         
         # Estrutura de pastas padrão
         self.folder_mapping = {
@@ -63,6 +121,7 @@ class ObsidianSync:
             for folder_name in self.folder_mapping.values():
                 folder_path = self.vault_path / folder_name
                 folder_path.mkdir(exist_ok=True)
+                self._known_dirs.add(folder_path)
                 logger.info(f"Diretório verificado/criado: {folder_path}")
         except Exception as e:
             logger.error(f"Erro ao criar diretórios: {e}")
@@ -72,30 +131,74 @@ class ObsidianSync:
         self, 
         processed_data: Dict[str, Any], 
         category: str = "inbox",
-        user_id: str = None
+        user_id: str = None,
+        timer: Optional[StageTimer] = None
     ) -> str:
         """
         Cria arquivo de nota no vault
         """
+        timer = timer or StageTimer()
+        with timer.stage("frontmatter_render"):
+            relative_path, content = await vault_io.run(
+                self.render_note, processed_data, category, user_id, operation="render"
+            )
+        
+        return await self.write_note(relative_path, content, timer)
+    
+    def render_note(
+        self,
+        processed_data: Dict[str, Any],
+        category: str = "inbox",
+        user_id: str = None
+    ) -> Tuple[str, str]:
+        """
+        Gera caminho relativo ao vault e conteúdo final da nota
+        """
+        # Determina pasta de destino
+        folder_name = self.folder_mapping.get(category, "📥 Inbox")
+        
+        # Gera nome de arquivo único
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        safe_title = self._sanitize_filename(processed_data["title"])
+        filename = f"{timestamp}_{safe_title}.md"
+        
+        # Constrói conteúdo final
+        content = self._build_note_content(processed_data, user_id)
+        
+        return str(Path(folder_name) / filename), content
+    
+    async def write_note(
+        self,
+        relative_path: str,
+        content: str,
+        timer: Optional[StageTimer] = None
+    ) -> str:
+        """
+        Escreve nota já renderizada no vault
+        """
+        timer = timer or StageTimer()
         try:
-            # Determina pasta de destino
-            target_folder = self.vault_path / self.folder_mapping.get(category, "📥 Inbox")
+            vault_path = self.vault_path
+            file_path = vault_path / relative_path
             
-            # Garante que a pasta existe
-            target_folder.mkdir(exist_ok=True)
+            # O watchdog ignora o eco desta escrita (mesmo conteúdo em disco)
+            self_writes.expect(file_path, content)
             
-            # Gera nome de arquivo único
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            safe_title = self._sanitize_filename(processed_data["title"])
-            filename = f"{timestamp}_{safe_title}.md"
-            file_path = target_folder / filename
-            
-            # Constrói conteúdo final
-            content = self._build_note_content(processed_data, user_id)
+            # Escreve arquivo fora do event loop, no próximo lote do escritor
+            # (temporário + fsync + rename): sem arquivos parciais após quedas
+            with timer.stage("vault_write"), metrics.VAULT_WRITE_LATENCY.time():
+                try:
+                    await (await self._submit(file_path, content))
+                except FileNotFoundError:
+                    # Pasta removida fora do serviço: esquece o cache e tenta de novo
+                    self._known_dirs.discard(file_path.parent)
+                    await (await self._submit(file_path, content))
             
-            # Escreve arquivo
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            # O índice é atualizado mesmo sem o monitoramento ativo
+            try:
+                await vault_io.run(self.index.update_file, vault_path, file_path, content, operation="index")
+            except Exception as e:
+                logger.warning(f"Nota criada, mas não indexada ({file_path}): {e}")
             
             logger.info(f"Nota criada com sucesso: {file_path}")
             return str(file_path)
@@ -104,6 +207,18 @@ class ObsidianSync:
             logger.error(f"Erro ao criar nota: {e}")
             raise
     
+    async def _submit(self, file_path: Path, content: str) -> asyncio.Future:
+        """
+        Envia a escrita ao escritor na ordem de chegada do vault, criando a pasta
+        só na primeira vez; a espera pelo lote fica fora do lock
+        """
+        async with self._write_lock:
+            folder = file_path.parent
+            if folder not in self._known_dirs:
+                await vault_io.run(folder.mkdir, parents=True, exist_ok=True, operation="mkdir")
+                self._known_dirs.add(folder)
+            return asyncio.wrap_future(self.writer.submit(file_path, content, make_dirs=False))
+    
     def _build_note_content(self, data: Dict[str, Any], user_id: str = None) -> str:
         """
         Constrói conteúdo completo da nota com frontmatter
@@ -122,12 +237,16 @@ class ObsidianSync:
         if "metadata" in data:
             frontmatter.update(data["metadata"])
         
+        # Identifica o job da nota (reconciliação de edições e movimentações)
+        if data.get("job_id"):
+            frontmatter["job_id"] = data["job_id"]
+        
         # Adiciona metadados de processamento se existirem
         if "processing_metadata" in data:
             frontmatter["processing"] = data["processing_metadata"]
         
-        # Gera YAML
-        yaml_header = yaml.dump(frontmatter, default_flow_style=False, allow_unicode=True)
+        # Gera YAML (mesmo texto de yaml.dump, sem o emissor em Python puro)
+        yaml_header = dump_frontmatter(frontmatter)
         
         # Constrói conteúdo final
         content = f"---\n{yaml_header}---\n\n{data['content']}"
@@ -152,30 +271,50 @@ class ObsidianSync:
         
         return title
     
-    async def start_monitoring(self):
-        """Inicia monitoramento do vault"""
-        if not self.vault_path.exists():
+    async def start_monitoring(self, subscribers: Iterable[Handler] = ()):
+        """Inicia monitoramento do vault (subscribers recebem as alterações após o índice)"""
+        if not await vault_io.run(self.vault_path.exists, operation="stat"):
             logger.warning(f"Vault não existe: {self.vault_path}")
             return
         
         try:
-            self.monitor = ObsidianVaultMonitor(self)
+            # Caminhos dos eventos na mesma forma das escritas registradas
+            watch_root = await vault_io.run(os.path.realpath, self.vault_path, operation="stat")
+            self.monitor = ObsidianVaultMonitor(self, self.index)
+            for handler in subscribers:
+                self.monitor.pipeline.subscribe(handler)
+            self.monitor.start(asyncio.get_running_loop())
             self.observer = Observer()
             self.observer.schedule(
                 self.monitor, 
-                str(self.vault_path), 
+                watch_root, 
                 recursive=True
             )
-            self.observer.start()
+            # O agendamento percorre a árvore de pastas (lento em vaults remotos)
+            await vault_io.run(self.observer.start, operation="watch")
+            await vault_io.run(self.index.watch, self.vault_path, operation="stat")
             logger.info(f"Monitoramento iniciado para: {self.vault_path}")
         except Exception as e:
             logger.error(f"Erro ao iniciar monitoramento: {e}")
+            return
+        
+        # Com o monitor ativo, recupera em background o que mudou enquanto o
+        # serviço estava parado (na primeira vez, constrói o índice)
+        self._refresh_task = asyncio.create_task(self._refresh_index(self.vault_path))
+    
+    async def _refresh_index(self, vault_path: Path):
+        try:
+            await vault_io.run(self.index.refresh, vault_path, operation="index")
+        except Exception as e:
+            logger.error(f"Erro ao atualizar índice do vault: {e}")
     
     async def stop_monitoring(self):
         """Para monitoramento do vault"""
         if self.observer:
             self.observer.stop()
-            self.observer.join()
+            await vault_io.run(self.observer.join, operation="watch")
+            self.monitor.stop()
+            await vault_io.run(self.index.unwatch, self.vault_path, operation="stat")
             logger.info("Monitoramento parado")
     
     def get_vault_info(self) -> Dict[str, Any]:
@@ -188,18 +327,13 @@ class ObsidianSync:
             }
         
         try:
-            # Conta arquivos por categoria
-            file_counts = {}
-            total_files = 0
-            
-            for category, folder_name in self.folder_mapping.items():
-                folder_path = self.vault_path / folder_name
-                if folder_path.exists():
-                    count = len(list(folder_path.glob("*.md")))
-                    file_counts[category] = count
-                    total_files += count
-                else:
-                    file_counts[category] = 0
+            # Conta arquivos por categoria (consulta ao índice, sem varrer as pastas)
+            counts = self.index.folder_counts(self.vault_path, self.folder_mapping.values())
+            file_counts = {
+                category: counts.get(folder_name, 0)
+                for category, folder_name in self.folder_mapping.items()
+            }
+            total_files = sum(file_counts.values())
             
             return {
                 "exists": True,
@@ -218,8 +352,11 @@ class ObsidianSync:
                 "error": str(e)
             }
     
-    def validate_vault_path(self, path: str) -> Dict[str, Any]:
-        """Valida se um caminho é um vault válido do Obsidian"""
+    def validate_vault_path(self, path: str, count_limit: int = 10000) -> Dict[str, Any]:
+        """
+        Valida se um caminho é um vault válido do Obsidian (a contagem de notas
+        para em count_limit: vaults grandes em rede não travam a validação)
+        """
         vault_path = Path(path)
         
         if not vault_path.exists():
@@ -243,8 +380,8 @@ class ObsidianSync:
             }
         
         # Verifica se tem pelo menos alguns arquivos .md
-        md_files = list(vault_path.glob("**/*.md"))
-        if len(md_files) == 0:
+        md_files_count = vault_scanner.count_notes(str(vault_path), limit=count_limit)
+        if md_files_count == 0:
             return {
                 "valid": True,
                 "warning": "Vault está vazio (nenhum arquivo .md encontrado)"
@@ -252,7 +389,9 @@ class ObsidianSync:
         
         return {
             "valid": True,
-            "md_files_count": len(md_files),
+            "md_files_count": md_files_count,
+            # True quando o vault tem count_limit notas ou mais
+            "md_files_count_capped": md_files_count >= count_limit,
             "message": "Vault válido do Obsidian"
         }
     
@@ -265,8 +404,8 @@ class ObsidianSync:
         backup_path = Path(backup_path)
         
         try:
-            if self.vault_path.exists():
-                shutil.copytree(self.vault_path, backup_path)
+            if await vault_io.run(self.vault_path.exists, operation="stat"):
+                await vault_io.run(shutil.copytree, self.vault_path, backup_path, operation="backup")
                 logger.info(f"Backup criado: {backup_path}")
                 return str(backup_path)
             else:
@@ -282,24 +421,18 @@ class ObsidianSync:
             return []
         
         try:
-            all_files = []
-            for folder_name in self.folder_mapping.values():
-                folder_path = self.vault_path / folder_name
-                if folder_path.exists():
-                    for md_file in folder_path.glob("*.md"):
-                        stat = md_file.stat()
-                        all_files.append({
-                            "path": str(md_file),
-                            "name": md_file.name,
-                            "folder": folder_name,
-                            "modified": datetime.fromtimestamp(stat.st_mtime),
-                            "size": stat.st_size
-                        })
-            
-            # Ordena por data de modificação (mais recente primeiro)
-            all_files.sort(key=lambda x: x["modified"], reverse=True)
-            
-            return all_files[:limit]
+            # Ordenadas por data de modificação no próprio índice
+            notes = self.index.recent_notes(self.vault_path, self.folder_mapping.values(), limit)
+            return [
+                {
+                    "path": note["path"],
+                    "name": Path(note["path"]).name,
+                    "folder": note["folder"],
+                    "modified": datetime.fromtimestamp(note["mtime"]),
+                    "size": note["size"]
+                }
+                for note in notes
+            ]
             
         except Exception as e:
             logger.error(f"Erro ao obter notas recentes: {e}")
@@ -0,0 +1,79 @@
+"""
+Política de reprocessamento: classificação de erros e backoff
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Optional
+
+from ..core.config import settings
+from ..models.text_processing import TextProcessingJob
+from ..utils.deadline import DeadlineExceeded
+from .ai_processor import AIResponseParseError, TRANSIENT_PROVIDER_ERRORS
+
+logger = logging.getLogger(__name__)
+
+ERROR_TRANSIENT = "transient"
+ERROR_PARSE = "parse"
+ERROR_PERMANENT = "permanent"
+
+TRANSIENT_MARKERS = (
+    "rate_limit", "rate limit", "overloaded", "timeout", "timed out",
+    "connection", "temporarily", "unavailable", "502", "503", "504", "529"
+)
+
+PERMANENT_OS_ERRORS = (FileNotFoundError, PermissionError, IsADirectoryError, NotADirectoryError)
+
+
+def classify_error(error: BaseException) -> str:
+    """Classifica a falha para decidir a estratégia de reprocessamento"""
+    if isinstance(error, AIResponseParseError):
+        return ERROR_PARSE
+    if isinstance(error, TRANSIENT_PROVIDER_ERRORS):
+        return ERROR_TRANSIENT
+    # Cada tentativa recebe um prazo novo; JOB_MAX_ATTEMPTS limita as repetições
+    if isinstance(error, DeadlineExceeded):
+        return ERROR_TRANSIENT
+    # Arquivo de origem removido ou sem permissão: repetir não resolve
+    if isinstance(error, PERMANENT_OS_ERRORS):
+        return ERROR_PERMANENT
+    # Demais falhas de I/O (vault em rede, disco) costumam ser passageiras
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError, OSError)):
+        return ERROR_TRANSIENT
+
+    message = str(error).lower()
+    if any(marker in message for marker in TRANSIENT_MARKERS):
+        return ERROR_TRANSIENT
+    return ERROR_PERMANENT
+
+
+def compute_backoff(attempt: int, base_delay: float = None, max_delay: float = None) -> float:
+    """Backoff exponencial com jitter (metade fixa, metade aleatória)"""
+    base_delay = settings.RETRY_BASE_DELAY_SECONDS if base_delay is None else base_delay
+    max_delay = settings.RETRY_MAX_DELAY_SECONDS if max_delay is None else max_delay
+    ceiling = min(max_delay, base_delay * (2 ** max(attempt - 1, 0)))
+    # O componente aleatório espalha jobs que falharam juntos (ex.: queda do provedor)
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+def record_failure(job: TextProcessingJob, error: BaseException, message: Optional[str] = None):
+    """Marca o job como falho e agenda a próxima tentativa ou envia à dead-letter"""
+    error_kind = classify_error(error)
+    message = message or str(error)
+    attempts = (job.retry_count or 0) + 1
+
+    if error_kind == ERROR_PERMANENT or attempts >= settings.JOB_MAX_ATTEMPTS:
+        job.mark_failed(message, error_kind)
+        job.mark_dead_letter()
+        logger.warning(f"Job {job.job_id} movido para dead-letter ({error_kind}, tentativa {attempts})")
+        return
+
+    if error_kind == ERROR_PARSE:
+        # Resposta já paga: o reparo não chama a IA, então pode ser imediato
+        next_attempt_at = datetime.utcnow()
+    else:
+        next_attempt_at = datetime.utcnow() + timedelta(seconds=compute_backoff(attempts))
+
+    job.mark_failed(message, error_kind, next_attempt_at)
+    logger.info(f"Job {job.job_id} reagendado para {next_attempt_at.isoformat()} ({error_kind})")
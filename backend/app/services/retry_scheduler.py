@@ -0,0 +1,127 @@
+"""
+Reprocessamento automático de jobs com backoff exponencial e dead-letter
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.status_cache import status_cache
+from ..models.change_sequence import next_change_seq
+from ..models.job_counter import apply_counter_deltas, transition_deltas
+from ..models.text_processing import TextProcessingJob, ProcessingStatus
+from .job_pipeline import resume_job, status_for_stage
+
+logger = logging.getLogger(__name__)
+
+
+class RetryScheduler:
+    """Reenfileira jobs FAILED cujo horário de nova tentativa chegou"""
+
+    def __init__(self, batch_size: int = None, interval_seconds: int = None):
+        self.batch_size = batch_size or settings.RETRY_BATCH_SIZE
+        self.interval = interval_seconds or settings.RETRY_SCHEDULER_INTERVAL_SECONDS
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def dispatch_due_jobs(self) -> List[str]:
+        """Reenfileira até batch_size jobs vencidos (limite por ciclo evita rajadas)"""
+        now = datetime.utcnow()
+        dispatched = []
+
+        db = SessionLocal()
+        try:
+            due_jobs = db.query(TextProcessingJob).filter(
+                TextProcessingJob.status == ProcessingStatus.FAILED,
+                TextProcessingJob.next_attempt_at.isnot(None),
+                TextProcessingJob.next_attempt_at <= now
+            ).order_by(TextProcessingJob.next_attempt_at).limit(self.batch_size).all()
+
+            for job in due_jobs:
+                stage = job.resume_stage()
+                new_status = status_for_stage(stage)
+
+                # Compare-and-set: apenas um worker assume cada job
+                claimed = db.query(TextProcessingJob).filter(
+                    TextProcessingJob.id == job.id,
+                    TextProcessingJob.status == ProcessingStatus.FAILED,
+                    TextProcessingJob.next_attempt_at == job.next_attempt_at
+                ).update(
+                    {
+                        TextProcessingJob.status: new_status,
+                        TextProcessingJob.next_attempt_at: None,
+                        TextProcessingJob.heartbeat_at: now,
+                        TextProcessingJob.updated_at: now,
+                        TextProcessingJob.status_version: TextProcessingJob.status_version + 1,
+                        TextProcessingJob.change_seq: next_change_seq(db.connection())
+                    },
+                    synchronize_session=False
+                )
+                # UPDATE em massa não passa pelos eventos do ORM
+                if claimed:
+                    apply_counter_deltas(db.connection(), transition_deltas(
+                        job.user_id, job.category, ProcessingStatus.FAILED.value, new_status.value
+                    ))
+                db.commit()
+                if not claimed:
+                    continue
+                status_cache.invalidate(job.job_id)
+
+                resume_job(job.job_id, job.user_id, stage)
+                dispatched.append(job.job_id)
+
+            return dispatched
+        finally:
+            db.close()
+
+    def requeue_dead_letters(self, user_id: str, job_ids: Optional[List[str]] = None, limit: int = 500) -> List[str]:
+        """Devolve jobs da dead-letter ao agendador, espalhados no tempo"""
+        db = SessionLocal()
+        try:
+            query = db.query(TextProcessingJob).filter(
+                TextProcessingJob.user_id == user_id,
+                TextProcessingJob.status == ProcessingStatus.DEAD_LETTER
+            )
+            if job_ids:
+                query = query.filter(TextProcessingJob.job_id.in_(job_ids))
+            jobs = query.order_by(TextProcessingJob.created_at).limit(limit).all()
+
+            # Distribui as tentativas para que um requeue em massa não vire rajada
+            now = datetime.utcnow()
+            spacing = self.interval / max(self.batch_size, 1)
+            for index, job in enumerate(jobs):
+                offset = index * spacing + random.uniform(0, spacing)
+                job.requeue_from_dead_letter(now + timedelta(seconds=offset))
+            db.commit()
+
+            return [job.job_id for job in jobs]
+        finally:
+            db.close()
+
+    async def _run(self):
+        while True:
+            try:
+                dispatched = self.dispatch_due_jobs()
+                if dispatched:
+                    logger.info(f"{len(dispatched)} jobs reenfileirados pelo agendador")
+            except Exception as e:
+                logger.error(f"Erro no agendador de reprocessamento: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Inicia o ciclo periódico do agendador"""
+        if not self._loop_task:
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Interrompe o agendador"""
+        if self._loop_task:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+
+
+# Instância global do agendador
+retry_scheduler = RetryScheduler()
@@ -0,0 +1,266 @@
+"""
+Pipeline de eventos do vault: debounce por caminho, agrupamento e supressão das escritas próprias
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..core import metrics
+from ..core.config import settings
+from .vault_io import vault_io
+
+logger = logging.getLogger(__name__)
+
+CREATED = "created"
+MODIFIED = "modified"
+DELETED = "deleted"
+MOVED = "moved"
+
+
+@dataclass
+class VaultEvent:
+    """Alteração de um caminho do vault, já agrupada"""
+    kind: str
+    path: str
+    src_path: Optional[str] = None
+    is_directory: bool = False
+
+
+class SelfWriteFilter:
+    """
+    Hash do conteúdo das notas gravadas pelo próprio serviço: o eco dessas
+    escritas no watchdog é descartado enquanto o arquivo tiver esse conteúdo
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0):
+        self.ttl_seconds = ttl_seconds
+        # Ordem de inserção = ordem de expiração
+        self._expected: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path) -> str:
+        return os.path.abspath(os.fspath(path))
+
+    def expect(self, path, content: str):
+        """Registra uma escrita própria (antes de enviá-la ao disco)"""
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        key = self._key(path)
+        with self._lock:
+            self._expected.pop(key, None)
+            self._expected[key] = (digest, time.monotonic())
+
+    def is_expected(self, path) -> bool:
+        with self._lock:
+            self._prune()
+            return self._key(path) in self._expected
+
+    def matches(self, path) -> bool:
+        """
+        Consome a expectativa se o arquivo em disco tiver o conteúdo gravado
+        pelo serviço (lê o arquivo: executar fora do event loop)
+        """
+        key = self._key(path)
+        with self._lock:
+            entry = self._expected.get(key)
+        if entry is None:
+            return False
+        try:
+            with open(key, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return False
+        if digest != entry[0]:
+            return False
+        with self._lock:
+            if self._expected.get(key) == entry:
+                del self._expected[key]
+        return True
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._expected:
+            key, (_, registered_at) = next(iter(self._expected.items()))
+            if registered_at >= cutoff:
+                break
+            del self._expected[key]
+
+
+# Escritas próprias de todas as instâncias de sincronização (o watchdog de um
+# vault vê as notas gravadas por qualquer contexto)
+self_writes = SelfWriteFilter()
+
+
+def coalesce(previous: VaultEvent, event: VaultEvent) -> Optional[VaultEvent]:
+    """Combina dois eventos do mesmo caminho; None quando se anulam"""
+    if previous.is_directory or event.is_directory or event.kind == MOVED:
+        return event
+    if previous.kind == CREATED:
+        # Criado e removido na mesma janela: nada mudou
+        return None if event.kind == DELETED else previous
+    if previous.kind == MOVED:
+        if event.kind == DELETED:
+            return VaultEvent(DELETED, previous.src_path)
+        return previous
+    if previous.kind == DELETED:
+        # Removido e recriado (salvamento por substituição): alteração
+        return VaultEvent(MODIFIED, event.path) if event.kind != DELETED else previous
+    return event if event.kind == DELETED else previous
+
+
+@dataclass
+class _Pending:
+    event: VaultEvent
+    first_seen: float
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+Handler = Callable[[VaultEvent], Awaitable[None]]
+
+
+class VaultEventPipeline:
+    """
+    Recebe os eventos brutos do watchdog (de qualquer thread) numa fila asyncio,
+    agrupa os de cada caminho até um intervalo sem novos eventos e entrega aos
+    consumidores, em ordem, um evento por alteração real. Escritas do próprio
+    serviço (ver SelfWriteFilter) não são entregues
+    """
+
+    def __init__(
+        self,
+        write_filter: SelfWriteFilter = self_writes,
+        debounce_seconds: float = None,
+        max_delay_seconds: float = None
+    ):
+        self.write_filter = write_filter
+        self.debounce_seconds = settings.VAULT_EVENT_DEBOUNCE_SECONDS if debounce_seconds is None else debounce_seconds
+        self.max_delay_seconds = settings.VAULT_EVENT_MAX_DELAY_SECONDS if max_delay_seconds is None else max_delay_seconds
+        self._handlers: List[Handler] = []
+        self._pending: Dict[str, _Pending] = {}
+        self._inbox: "asyncio.Queue[VaultEvent]" = asyncio.Queue()
+        self._ready: "asyncio.Queue[VaultEvent]" = asyncio.Queue()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._own_loop = False
+        self._tasks: List[asyncio.Task] = []
+
+    def subscribe(self, handler: Handler):
+        """Adiciona um consumidor (corrotina que recebe cada VaultEvent)"""
+        self._handlers.append(handler)
+
+    def start(self, loop: asyncio.AbstractEventLoop = None):
+        """Inicia no loop informado ou, para chamadores síncronos, num loop em thread própria"""
+        if self._loop is not None:
+            return
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="vault-events", daemon=True).start()
+            self._own_loop = True
+        self._loop = loop
+        loop.call_soon_threadsafe(self._spawn)
+
+    def _spawn(self):
+        self._tasks = [
+            asyncio.ensure_future(self._collect()),
+            asyncio.ensure_future(self._dispatch())
+        ]
+
+    def push(self, kind: str, path: str, src_path: str = None, is_directory: bool = False):
+        """Enfileira um evento bruto (chamado pela thread do watchdog)"""
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._inbox.put_nowait, VaultEvent(kind, path, src_path, is_directory))
+        except RuntimeError:
+            # Loop encerrado: o refresh do índice na próxima partida cobre o evento
+            pass
+
+    async def _collect(self):
+        while True:
+            self._merge(await self._inbox.get())
+
+    def _merge(self, event: VaultEvent):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        first_seen = now
+
+        if event.kind == MOVED and not event.is_directory:
+            # A origem ainda pendente segue a nota para o destino
+            source = self._pending.pop(event.src_path, None)
+            if source:
+                source.timer.cancel()
+                metrics.VAULT_EVENTS.labels(outcome="coalesced").inc()
+                first_seen = source.first_seen
+                if source.event.kind == CREATED:
+                    event = VaultEvent(CREATED, event.path)
+                elif source.event.kind == MOVED:
+                    event = VaultEvent(MOVED, event.path, source.event.src_path)
+
+        previous = self._pending.pop(event.path, None)
+        if previous:
+            previous.timer.cancel()
+            metrics.VAULT_EVENTS.labels(outcome="coalesced").inc()
+            first_seen = min(first_seen, previous.first_seen)
+            event = coalesce(previous.event, event)
+            if event is None:
+                return
+
+        # Debounce com atraso máximo: caminhos alterados sem parar também são emitidos
+        delay = min(self.debounce_seconds, max(0.0, first_seen + self.max_delay_seconds - now))
+        pending = _Pending(event, first_seen)
+        pending.timer = loop.call_later(delay, self._flush, event.path, pending)
+        self._pending[event.path] = pending
+
+    def _flush(self, path: str, pending: _Pending):
+        if self._pending.get(path) is pending:
+            del self._pending[path]
+            self._ready.put_nowait(pending.event)
+
+    async def _dispatch(self):
+        while True:
+            event = await self._ready.get()
+            try:
+                if await self._is_self_write(event):
+                    metrics.VAULT_EVENTS.labels(outcome="suppressed").inc()
+                    continue
+                metrics.VAULT_EVENTS.labels(outcome="emitted").inc()
+                logger.info(f"Alteração no vault ({event.kind}): {event.path}")
+                for handler in self._handlers:
+                    try:
+                        await handler(event)
+                    except Exception as e:
+                        logger.error(f"Erro ao tratar evento do vault {event.path}: {e}")
+            except Exception as e:
+                logger.error(f"Erro no pipeline de eventos do vault: {e}")
+
+    async def _is_self_write(self, event: VaultEvent) -> bool:
+        if event.is_directory or event.kind not in (CREATED, MODIFIED):
+            return False
+        if not self.write_filter.is_expected(event.path):
+            return False
+        return await vault_io.run(self.write_filter.matches, event.path, operation="hash")
+
+    def stop(self):
+        """Descarta os eventos pendentes e encerra as tarefas (o refresh do índice cobre o restante)"""
+        loop, self._loop = self._loop, None
+        if loop is None:
+            return
+
+        def cancel():
+            for task in self._tasks:
+                task.cancel()
+            for pending in self._pending.values():
+                pending.timer.cancel()
+            self._pending.clear()
+            if self._own_loop:
+                loop.stop()
+
+        try:
+            loop.call_soon_threadsafe(cancel)
+        except RuntimeError:
+            pass
@@ -0,0 +1,548 @@
+"""
+Índice persistente de metadados do vault (SQLite), atualizado incrementalmente,
+com busca textual (FTS5) sobre título, corpo e tags das notas
+"""
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import yaml
+
+from ..core.config import settings
+from .vault_scanner import VaultScanner, vault_scanner
+
+logger = logging.getLogger(__name__)
+
+# Parser em C (libyaml) quando disponível: domina o custo da construção do índice
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def parse_frontmatter(content: str) -> Tuple[Dict[str, Any], str]:
+    """Separa o frontmatter YAML do corpo da nota"""
+    if not content.startswith("---"):
+        return {}, content
+    end = content.find("\n---", 3)
+    if end == -1:
+        return {}, content
+    try:
+        data = yaml.load(content[3:end], Loader=YAML_LOADER) or {}
+    except yaml.YAMLError:
+        return {}, content
+    if not isinstance(data, dict):
+        return {}, content
+    body = content[end + 4:]
+    return data, body.lstrip("\n")
+
+
+def content_hash(raw: bytes) -> str:
+    """Hash do conteúdo de uma nota (o mesmo guardado no índice)"""
+    return hashlib.sha1(raw).hexdigest()
+
+
+# Pesos do BM25 por coluna da busca: título, corpo, tags
+SEARCH_WEIGHTS = (10.0, 1.0, 5.0)
+SEARCH_TOKEN = re.compile(r"(tag:)?([\w][\w-]*)", re.UNICODE)
+
+
+def build_match_query(query: str) -> str:
+    """
+    Converte a consulta do usuário numa expressão FTS5 segura: cada termo vira
+    uma frase entre aspas (sem operadores injetados), `tag:x` restringe à coluna
+    de tags e o último termo casa por prefixo (busca enquanto digita)
+    """
+    terms = []
+    for is_tag, token in SEARCH_TOKEN.findall(query):
+        phrase = '"' + token.replace('"', '""') + '"'
+        terms.append(f"tags : {phrase}" if is_tag else phrase)
+    if terms and not terms[-1].startswith("tags") and len(token) >= 2:
+        terms[-1] += " *"
+    return " ".join(terms)
+
+
+def normalize_tags(value: Any) -> List[str]:
+    """Tags do frontmatter como lista (aceita lista ou texto separado por vírgulas/espaços)"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.replace(",", " ").split()
+    tags = []
+    for tag in value:
+        tag = str(tag).strip().strip("'\"").lstrip("#")
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+class VaultIndex:
+    """
+    Índice de metadados das notas (caminho, mtime, tamanho, hash, frontmatter,
+    tags e categoria) por vault. É construído uma vez e depois mantido pelos
+    eventos do watchdog e pelas escritas do próprio serviço; vaults sem
+    monitoramento são reverificados por mtime nas consultas
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        batch_size: int = 500,
+        max_ranked: int = 10000,
+        refresh_seconds: float = None,
+        scanner: VaultScanner = vault_scanner
+    ):
+        self.path = path or settings.VAULT_INDEX_PATH
+        self.scanner = scanner
+        self.batch_size = batch_size
+        # Acima disso a consulta não é seletiva: ordena por recência, sem BM25
+        self.max_ranked = max_ranked
+        self.refresh_seconds = settings.VAULT_INDEX_REFRESH_SECONDS if refresh_seconds is None else refresh_seconds
+        self._watched: Set[str] = set()
+        self._thread_state = threading.local()
+        self._build_locks: Dict[str, threading.RLock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão SQLite por thread (o watchdog chama de sua própria thread)"""
+        conn = getattr(self._thread_state, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._create_schema(conn)
+            self._thread_state.conn = conn
+        return conn
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS vault_notes ("
+            " vault TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " folder TEXT NOT NULL,"
+            " name TEXT NOT NULL,"
+            " mtime REAL NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " content_hash TEXT NOT NULL,"
+            " title TEXT,"
+            " category TEXT,"
+            " tags TEXT NOT NULL DEFAULT '[]',"
+            " frontmatter TEXT NOT NULL DEFAULT '{}',"
+            " indexed_at REAL NOT NULL,"
+            " PRIMARY KEY (vault, path))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_vault_notes_mtime ON vault_notes (vault, mtime)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_vault_notes_folder ON vault_notes (vault, folder)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS vault_index_state ("
+            " vault TEXT PRIMARY KEY,"
+            " built_at REAL NOT NULL,"
+            " refreshed_at REAL NOT NULL)"
+        )
+
+        has_search = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'vault_notes_fts'"
+        ).fetchone()
+        if not has_search:
+            # O rowid da busca é o mesmo da nota; o corpo fica apenas aqui
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS vault_notes_fts USING fts5("
+                " title, body, tags,"
+                " tokenize = 'unicode61 remove_diacritics 2',"
+                " prefix = '2 3')"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS vault_notes_fts_delete AFTER DELETE ON vault_notes"
+                " BEGIN DELETE FROM vault_notes_fts WHERE rowid = old.rowid; END"
+            )
+            # Índices anteriores à busca não têm o corpo: força a reconstrução
+            conn.execute("DELETE FROM vault_notes")
+            conn.execute("DELETE FROM vault_index_state")
+
+    @staticmethod
+    def vault_key(vault_path) -> str:
+        """Identificador do vault no índice (caminho absoluto)"""
+        return str(Path(vault_path).expanduser().resolve())
+
+    def _relative(self, vault: str, file_path) -> Optional[str]:
+        """Caminho da nota relativo ao vault (None se for fora dele ou ignorado)"""
+        try:
+            relative = Path(file_path).resolve().relative_to(vault).as_posix()
+        except ValueError:
+            return None
+        if self.scanner.is_ignored(vault, relative):
+            return None
+        return relative
+
+    def _read_entry(self, vault: str, relative: str, content: str = None) -> Optional[tuple]:
+        """Lê a nota do disco e monta a linha do índice (o corpo, ao final, vai só para a busca)"""
+        file_path = Path(vault) / relative
+        try:
+            stat = file_path.stat()
+            raw = file_path.read_bytes() if content is None else content.encode("utf-8")
+        except FileNotFoundError:
+            return None
+
+        text = raw.decode("utf-8", errors="replace")
+        frontmatter, body = parse_frontmatter(text)
+        parent = Path(relative).parent.as_posix()
+        return (
+            vault,
+            relative,
+            "" if parent == "." else parent,
+            file_path.stem,
+            stat.st_mtime,
+            stat.st_size,
+            content_hash(raw),
+            str(frontmatter.get("title") or file_path.stem),
+            frontmatter.get("category"),
+            json.dumps(normalize_tags(frontmatter.get("tags")), ensure_ascii=False),
+            json.dumps(frontmatter, ensure_ascii=False, default=str),
+            time.time(),
+            body
+        )
+
+    @contextmanager
+    def _transaction(self, conn: sqlite3.Connection):
+        """Transação explícita (reaproveita a corrente, se houver)"""
+        if conn.in_transaction:
+            yield
+            return
+        conn.execute("BEGIN")
+        try:
+            yield
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _upsert(self, conn: sqlite3.Connection, rows: List[tuple]):
+        with self._transaction(conn):
+            for row in rows:
+                conn.execute(
+                    "INSERT INTO vault_notes (vault, path, folder, name, mtime, size, content_hash,"
+                    " title, category, tags, frontmatter, indexed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT(vault, path) DO UPDATE SET"
+                    " folder = excluded.folder, name = excluded.name, mtime = excluded.mtime,"
+                    " size = excluded.size, content_hash = excluded.content_hash, title = excluded.title,"
+                    " category = excluded.category, tags = excluded.tags,"
+                    " frontmatter = excluded.frontmatter, indexed_at = excluded.indexed_at",
+                    row[:12]
+                )
+                rowid = conn.execute(
+                    "SELECT rowid FROM vault_notes WHERE vault = ? AND path = ?", row[:2]
+                ).fetchone()[0]
+                conn.execute("DELETE FROM vault_notes_fts WHERE rowid = ?", (rowid,))
+                conn.execute(
+                    "INSERT INTO vault_notes_fts (rowid, title, body, tags) VALUES (?, ?, ?, ?)",
+                    (rowid, row[7], row[12], " ".join(json.loads(row[9])))
+                )
+
+    def _delete(self, conn: sqlite3.Connection, vault: str, paths: Iterable[str]):
+        conn.executemany(
+            "DELETE FROM vault_notes WHERE vault = ? AND path = ?",
+            [(vault, path) for path in paths]
+        )
+
+    def _build_lock(self, vault: str) -> threading.RLock:
+        with self._locks_guard:
+            return self._build_locks.setdefault(vault, threading.RLock())
+
+    # Construção e atualização
+
+    def is_built(self, vault_path) -> bool:
+        """Indica se o vault já possui índice"""
+        row = self._connection().execute(
+            "SELECT 1 FROM vault_index_state WHERE vault = ?", (self.vault_key(vault_path),)
+        ).fetchone()
+        return row is not None
+
+    def ensure_built(self, vault_path) -> str:
+        """Constrói o índice do vault na primeira utilização; retorna a chave do vault"""
+        vault = self.vault_key(vault_path)
+        if not self.is_built(vault):
+            with self._build_lock(vault):
+                if not self.is_built(vault):
+                    self.refresh(vault)
+        return vault
+
+    def watch(self, vault_path):
+        """Marca o vault como monitorado pelo watchdog (dispensa a reverificação nas consultas)"""
+        self._watched.add(self.vault_key(vault_path))
+
+    def unwatch(self, vault_path):
+        """O vault deixou de ser monitorado"""
+        self._watched.discard(self.vault_key(vault_path))
+
+    def ensure_fresh(self, vault_path) -> str:
+        """
+        ensure_built e, para vaults sem watchdog, um refresh incremental quando
+        o último tiver mais de refresh_seconds. Se outra thread já estiver
+        atualizando o vault, a consulta usa o índice atual em vez de esperar
+        """
+        vault = self.ensure_built(vault_path)
+        if vault in self._watched:
+            return vault
+        row = self._connection().execute(
+            "SELECT refreshed_at FROM vault_index_state WHERE vault = ?", (vault,)
+        ).fetchone()
+        if row and time.time() - row[0] < self.refresh_seconds:
+            return vault
+        lock = self._build_lock(vault)
+        if lock.acquire(blocking=False):
+            try:
+                self._refresh(vault)
+            finally:
+                lock.release()
+        return vault
+
+    def _scan(self, vault: str) -> Dict[str, Tuple[float, int]]:
+        """Percorre o vault (em paralelo, respeitando as regras de exclusão) e retorna mtime/tamanho de cada nota"""
+        return {relative: (mtime, size) for relative, mtime, size in self.scanner.iter_notes(vault)}
+
+    def refresh(self, vault_path) -> Dict[str, int]:
+        """
+        Sincroniza o índice com o disco: relê apenas as notas cujo mtime ou
+        tamanho mudou e remove as que deixaram de existir (usado na construção
+        inicial e para cobrir alterações feitas enquanto o serviço estava parado)
+        """
+        vault = self.vault_key(vault_path)
+        # Refreshes simultâneos do mesmo vault (monitor e reconciliação) não repetem o trabalho
+        with self._build_lock(vault):
+            return self._refresh(vault)
+
+    def _refresh(self, vault: str) -> Dict[str, int]:
+        started = time.perf_counter()
+        conn = self._connection()
+
+        on_disk = self._scan(vault)
+        indexed = {
+            path: (mtime, size)
+            for path, mtime, size in conn.execute(
+                "SELECT path, mtime, size FROM vault_notes WHERE vault = ?", (vault,)
+            )
+        }
+
+        changed = [path for path, signature in on_disk.items() if indexed.get(path) != signature]
+        removed = [path for path in indexed if path not in on_disk]
+
+        for start in range(0, len(changed), self.batch_size):
+            rows = [
+                entry for entry in (
+                    self._read_entry(vault, path) for path in changed[start:start + self.batch_size]
+                ) if entry
+            ]
+            self._upsert(conn, rows)
+
+        now = time.time()
+        with self._transaction(conn):
+            self._delete(conn, vault, removed)
+            conn.execute(
+                "INSERT INTO vault_index_state (vault, built_at, refreshed_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(vault) DO UPDATE SET refreshed_at = excluded.refreshed_at",
+                (vault, now, now)
+            )
+
+        stats = {"scanned": len(on_disk), "updated": len(changed), "removed": len(removed)}
+        logger.info(
+            f"Índice do vault {vault} atualizado em {time.perf_counter() - started:.2f}s: {stats}"
+        )
+        return stats
+
+    def update_file(self, vault_path, file_path, content: str = None) -> bool:
+        """Indexa (ou reindexa) uma nota; o conteúdo pode ser informado para evitar a releitura"""
+        vault = self.vault_key(vault_path)
+        relative = self._relative(vault, file_path)
+        if relative is None or not relative.endswith(".md"):
+            return False
+
+        entry = self._read_entry(vault, relative, content)
+        conn = self._connection()
+        if entry is None:
+            self._delete(conn, vault, [relative])
+            return False
+
+        existing = conn.execute(
+            "SELECT content_hash, mtime FROM vault_notes WHERE vault = ? AND path = ?",
+            (vault, relative)
+        ).fetchone()
+        # Eventos repetidos do watchdog (ex.: modified após created) não reescrevem a linha
+        if existing and existing[0] == entry[6] and existing[1] == entry[4]:
+            return False
+        self._upsert(conn, [entry])
+        return True
+
+    def remove_path(self, vault_path, path):
+        """Remove uma nota, ou todas as notas sob uma pasta removida"""
+        vault = self.vault_key(vault_path)
+        relative = self._relative(vault, path)
+        if relative is None:
+            return
+        self._connection().execute(
+            "DELETE FROM vault_notes WHERE vault = ? AND (path = ? OR path LIKE ? ESCAPE '\\')",
+            (vault, relative, self._escape_like(relative) + "/%")
+        )
+
+    @staticmethod
+    def _escape_like(value: str) -> str:
+        return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    # Consultas
+
+    def linked_note(self, vault_path, file_path) -> Optional[Tuple[str, Optional[str], str]]:
+        """Caminho absoluto, job_id do frontmatter (ou None) e hash de uma nota indexada"""
+        vault = self.vault_key(vault_path)
+        relative = self._relative(vault, file_path)
+        if relative is None:
+            return None
+        row = self._connection().execute(
+            "SELECT path, json_extract(frontmatter, '$.job_id'), content_hash FROM vault_notes"
+            " WHERE vault = ? AND path = ?",
+            (vault, relative)
+        ).fetchone()
+        if row is None:
+            return None
+        path, job_id, digest = row
+        return str(Path(vault) / path), str(job_id) if job_id else None, digest
+
+    def linked_notes(self, vault_path) -> List[Tuple[str, Optional[str], str]]:
+        """linked_note de todas as notas do vault (sem reler os arquivos)"""
+        vault = self.vault_key(vault_path)
+        rows = self._connection().execute(
+            "SELECT path, json_extract(frontmatter, '$.job_id'), content_hash FROM vault_notes"
+            " WHERE vault = ?",
+            (vault,)
+        )
+        return [
+            (str(Path(vault) / path), str(job_id) if job_id else None, digest)
+            for path, job_id, digest in rows
+        ]
+
+    def folder_counts(self, vault_path, folders: Iterable[str]) -> Dict[str, int]:
+        """Quantidade de notas diretamente em cada pasta"""
+        vault = self.ensure_fresh(vault_path)
+        folders = list(folders)
+        counts = {folder: 0 for folder in folders}
+        if not folders:
+            return counts
+        placeholders = ", ".join("?" for _ in folders)
+        rows = self._connection().execute(
+            f"SELECT folder, COUNT(*) FROM vault_notes WHERE vault = ? AND folder IN ({placeholders})"
+            " GROUP BY folder",
+            (vault, *folders)
+        )
+        for folder, count in rows:
+            counts[folder] = count
+        return counts
+
+    def recent_notes(self, vault_path, folders: Iterable[str], limit: int = 10) -> List[Dict[str, Any]]:
+        """Notas mais recentes (por mtime) das pastas informadas"""
+        vault = self.ensure_fresh(vault_path)
+        folders = list(folders)
+        if not folders:
+            return []
+        placeholders = ", ".join("?" for _ in folders)
+        rows = self._connection().execute(
+            "SELECT path, folder, name, mtime, size, title, category, tags FROM vault_notes"
+            f" WHERE vault = ? AND folder IN ({placeholders})"
+            " ORDER BY mtime DESC LIMIT ?",
+            (vault, *folders, limit)
+        )
+        return [
+            {
+                "path": str(Path(vault) / path),
+                "folder": folder,
+                "name": name,
+                "mtime": mtime,
+                "size": size,
+                "title": title,
+                "category": category,
+                "tags": json.loads(tags)
+            }
+            for path, folder, name, mtime, size, title, category, tags in rows
+        ]
+
+    def search(self, vault_path, query: str, limit: int = 20) -> Dict[str, Any]:
+        """Busca textual com ranking BM25 e trecho destacado de cada nota"""
+        match = build_match_query(query)
+        if not match:
+            return {"ranking": "bm25", "results": []}
+        vault = self.ensure_fresh(vault_path)
+        conn = self._connection()
+
+        # Contagem limitada às notas deste vault (o índice de busca é compartilhado
+        # entre os vaults): percorre no máximo max_ranked + 1 entradas
+        candidates = conn.execute(
+            "SELECT COUNT(*) FROM (SELECT vault_notes_fts.rowid FROM vault_notes_fts"
+            " JOIN vault_notes n ON n.rowid = vault_notes_fts.rowid"
+            " WHERE vault_notes_fts MATCH ? AND n.vault = ? LIMIT ?)",
+            (match, vault, self.max_ranked + 1)
+        ).fetchone()[0]
+
+        if candidates <= self.max_ranked:
+            ranking = "bm25"
+            rows = conn.execute(
+                "SELECT n.path, n.folder, n.title, n.tags, n.mtime,"
+                " bm25(vault_notes_fts, ?, ?, ?) AS score,"
+                " snippet(vault_notes_fts, 1, '**', '**', '…', 16)"
+                " FROM vault_notes_fts JOIN vault_notes n ON n.rowid = vault_notes_fts.rowid"
+                " WHERE vault_notes_fts MATCH ? AND n.vault = ?"
+                " ORDER BY score LIMIT ?",
+                (*SEARCH_WEIGHTS, match, vault, limit)
+            ).fetchall()
+        else:
+            # Termos presentes em quase todas as notas não discriminam (IDF ~ 0) e
+            # calcular o BM25 de todas elas custaria centenas de ms: nesse caso as
+            # notas mais recentes do vault vêm primeiro, percorridas pelo índice
+            # (vault, mtime) até completar o limite
+            ranking = "recent"
+            rows = self._recent_matches(conn, vault, match, limit)
+
+        results = [
+            {
+                "path": str(Path(vault) / path),
+                "folder": folder,
+                "title": title,
+                "tags": json.loads(tags),
+                "mtime": mtime,
+                # BM25 do SQLite é negativo (menor = mais relevante)
+                "score": round(-score, 4),
+                "snippet": snippet
+            }
+            for path, folder, title, tags, mtime, score, snippet in rows
+        ]
+        return {"ranking": ranking, "results": results}
+
+    def _recent_matches(self, conn: sqlite3.Connection, vault: str, match: str, limit: int) -> List[tuple]:
+        """Notas do vault que casam com a busca, da mais recente (mtime) para a mais antiga"""
+        notes = conn.execute(
+            "SELECT rowid, path, folder, title, tags, mtime FROM vault_notes"
+            " WHERE vault = ? AND rowid IN (SELECT rowid FROM vault_notes_fts WHERE vault_notes_fts MATCH ?)"
+            " ORDER BY mtime DESC LIMIT ?",
+            (vault, match, limit)
+        ).fetchall()
+        if not notes:
+            return []
+
+        # Pontuação e trecho apenas das notas selecionadas
+        placeholders = ", ".join("?" for _ in notes)
+        details = {
+            rowid: (score, snippet)
+            for rowid, score, snippet in conn.execute(
+                "SELECT rowid, bm25(vault_notes_fts, ?, ?, ?),"
+                " snippet(vault_notes_fts, 1, '**', '**', '…', 16)"
+                " FROM vault_notes_fts WHERE vault_notes_fts MATCH ?"
+                f" AND rowid IN ({placeholders})",
+                (*SEARCH_WEIGHTS, match, *(note[0] for note in notes))
+            )
+        }
+        return [(*note[1:], *details[note[0]]) for note in notes]
+
+
+# Instância global do índice do vault
+vault_index = VaultIndex()
@@ -0,0 +1,71 @@
+"""
+Executor de I/O do vault: operações de arquivo fora do event loop
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from ..core import metrics
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class VaultIOExecutor:
+    """
+    Pool limitado de threads exclusivo do vault: um vault lento (SMB, iCloud,
+    Dropbox) ocupa no máximo estas threads e não esgota o executor padrão do
+    asyncio, usado pelo restante da aplicação
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or settings.VAULT_IO_MAX_WORKERS
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="vault-io"
+                    )
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any, operation: str = "other", **kwargs: Any) -> T:
+        """Executa func no pool e aguarda o resultado (mede a espera na fila)"""
+        submitted = time.perf_counter()
+
+        def call():
+            started = time.perf_counter()
+            metrics.VAULT_IO_QUEUE_TIME.labels(operation=operation).observe(started - submitted)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.VAULT_IO_DURATION.labels(operation=operation).observe(time.perf_counter() - started)
+                metrics.VAULT_IO_PENDING.dec()
+
+        metrics.VAULT_IO_PENDING.inc()
+        try:
+            future = self._pool().submit(call)
+        except Exception:
+            metrics.VAULT_IO_PENDING.dec()
+            raise
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self, wait: bool = True):
+        """Encerra o pool (as operações em andamento terminam)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait)
+
+
+# Instância global do executor de I/O do vault
+vault_io = VaultIOExecutor()
@@ -0,0 +1,186 @@
+"""
+Reconciliação do vault com os jobs: notas editadas, movidas ou removidas no Obsidian
+"""
+import asyncio
+import functools
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import or_
+
+from ..core.database import SessionLocal
+from ..models.text_processing import TextProcessingJob, ProcessingStatus
+from .vault_events import DELETED, MOVED, VaultEvent
+from .vault_index import VaultIndex, vault_index
+from .vault_io import vault_io
+
+logger = logging.getLogger(__name__)
+
+
+class VaultReconciler:
+    """
+    Mantém obsidian_file_path e o hash da nota dos jobs sincronizados de acordo
+    com o vault. A nota é associada ao job pelo job_id do frontmatter (notas
+    antigas, sem job_id, pelo caminho gravado). Funciona sobre o índice do
+    vault: os eventos chegam já agrupados e a varredura completa relê apenas
+    as notas com mtime ou tamanho alterados
+    """
+
+    def __init__(self, index: VaultIndex = vault_index, batch_size: int = 500):
+        self.index = index
+        self.batch_size = batch_size
+        self._rescan_task: Optional[asyncio.Task] = None
+
+    def start(self, vault_path):
+        """Varredura completa em background (alterações feitas com o serviço parado)"""
+        self._rescan_task = asyncio.create_task(self._safe_rescan(vault_path))
+
+    async def _safe_rescan(self, vault_path):
+        try:
+            await self.rescan(vault_path)
+        except Exception as e:
+            logger.error(f"Erro na reconciliação do vault {vault_path}: {e}")
+
+    def subscriber(self, vault_path):
+        """Consumidor dos eventos do vault (ver VaultEventPipeline.subscribe)"""
+        return functools.partial(self.handle_event, vault_path)
+
+    async def handle_event(self, vault_path, event: VaultEvent):
+        # O índice já foi atualizado pelo monitor (primeiro consumidor)
+        changes = await asyncio.to_thread(self._reconcile_event, vault_path, event)
+        for job_id, applied in changes:
+            logger.info(f"Job {job_id} reconciliado com o vault: {', '.join(applied)}")
+
+    def _reconcile_event(self, vault_path, event: VaultEvent) -> List[Tuple[str, List[str]]]:
+        db = SessionLocal()
+        try:
+            synced = db.query(TextProcessingJob).filter(
+                TextProcessingJob.status == ProcessingStatus.SYNCED
+            )
+            if event.kind == DELETED:
+                removed = self.index.vault_key(event.path)
+                if event.is_directory:
+                    jobs = synced.filter(or_(
+                        TextProcessingJob.obsidian_file_path == removed,
+                        TextProcessingJob.obsidian_file_path.startswith(removed + "/", autoescape=True)
+                    )).all()
+                else:
+                    jobs = synced.filter(TextProcessingJob.obsidian_file_path == removed).all()
+                targets = [(job, None, None) for job in jobs]
+            elif event.is_directory:
+                # Pastas movidas: o watchdog emite também o evento de cada nota
+                return []
+            else:
+                note = self.index.linked_note(vault_path, event.path)
+                if note is None:
+                    return []
+                path, job_id, digest = note
+                job = None
+                if job_id:
+                    job = synced.filter(TextProcessingJob.job_id == job_id).first()
+                if job is None:
+                    previous = [path]
+                    if event.kind == MOVED and event.src_path:
+                        previous.append(self.index.vault_key(event.src_path))
+                    job = synced.filter(TextProcessingJob.obsidian_file_path.in_(previous)).first()
+                targets = [(job, path, digest)] if job else []
+
+            changes = []
+            for job, path, digest in targets:
+                applied = job.reconcile_note(path, digest)
+                if applied:
+                    changes.append((job.job_id, applied))
+            db.commit()
+            return changes
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def rescan(self, vault_path) -> Dict[str, int]:
+        """
+        Varredura completa: atualiza o índice (stat de cada nota; hash só das
+        alteradas) e reconcilia todos os jobs sincronizados do vault
+        """
+        if not await vault_io.run(os.path.isdir, vault_path, operation="stat"):
+            logger.warning(f"Vault não existe, reconciliação ignorada: {vault_path}")
+            return {}
+        started = time.perf_counter()
+        # Jobs sincronizados depois deste instante podem ter notas que a
+        # varredura não viu: ficam com os eventos do watchdog
+        snapshot_at = datetime.utcnow()
+        await vault_io.run(self.index.refresh, vault_path, operation="index")
+        notes = await vault_io.run(self.index.linked_notes, vault_path, operation="index")
+        stats = await asyncio.to_thread(self._reconcile_all, vault_path, notes, snapshot_at)
+        logger.info(
+            f"Vault {vault_path} reconciliado em {time.perf_counter() - started:.2f}s: {stats}"
+        )
+        return stats
+
+    def _reconcile_all(
+        self,
+        vault_path,
+        notes: List[Tuple[str, Optional[str], str]],
+        snapshot_at: datetime
+    ) -> Dict[str, int]:
+        vault = self.index.vault_key(vault_path)
+        by_job: Dict[str, Tuple[str, str]] = {}
+        by_path: Dict[str, Tuple[Optional[str], str]] = {}
+        for path, job_id, digest in notes:
+            by_path[path] = (job_id, digest)
+            if job_id:
+                by_job.setdefault(job_id, (path, digest))
+
+        stats = {"notes": len(notes), "jobs": 0, "moved": 0, "edited": 0, "missing": 0, "skipped": 0}
+        db = SessionLocal()
+        try:
+            # Jobs cujas notas estão no vault (pelo id) ou deveriam estar (pelo caminho)
+            jobs: Dict[str, TextProcessingJob] = {}
+            job_ids = list(by_job)
+            synced = db.query(TextProcessingJob).filter(
+                TextProcessingJob.status == ProcessingStatus.SYNCED
+            )
+            for start in range(0, len(job_ids), self.batch_size):
+                for job in synced.filter(TextProcessingJob.job_id.in_(job_ids[start:start + self.batch_size])):
+                    jobs[job.job_id] = job
+            for job in synced.filter(TextProcessingJob.obsidian_file_path.startswith(vault + "/", autoescape=True)):
+                jobs.setdefault(job.job_id, job)
+
+            if not notes and jobs:
+                # Vault vazio com notas esperadas: provavelmente desmontado
+                logger.warning(f"Nenhuma nota em {vault}; jobs não foram alterados")
+                return stats
+
+            for job in jobs.values():
+                if job.synced_at and job.synced_at >= snapshot_at:
+                    stats["skipped"] += 1
+                    continue
+                target = by_job.get(job.job_id)
+                if target is None and job.obsidian_file_path in by_path:
+                    # Notas antigas, sem job_id: a nota no caminho gravado é a do job
+                    linked_id, digest = by_path[job.obsidian_file_path]
+                    if linked_id is None:
+                        target = (job.obsidian_file_path, digest)
+                if target is None and job.obsidian_file_path and os.path.exists(job.obsidian_file_path):
+                    # Nota gravada (ou regravada) depois do snapshot: não está ausente
+                    stats["skipped"] += 1
+                    continue
+                path, digest = target or (None, None)
+                for change in job.reconcile_note(path, digest):
+                    stats[change] += 1
+                stats["jobs"] += 1
+            db.commit()
+            return stats
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+# Instância global do reconciliador
+vault_reconciler = VaultReconciler()
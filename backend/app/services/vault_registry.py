@@ -0,0 +1,68 @@
+"""
+Registro de contextos de sincronização por vault
+"""
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Dict
+
+from .obsidian_sync import ObsidianSync
+from .vault_index import VaultIndex, vault_index
+from .vault_io import vault_io
+from .vault_writer import VaultWriter
+
+logger = logging.getLogger(__name__)
+
+
+class VaultSyncRegistry:
+    """
+    Um ObsidianSync por vault, criado no primeiro uso: cada contexto guarda as
+    pastas já existentes e tem o próprio VaultWriter, então vaults diferentes
+    gravam em paralelo (um vault lento não atrasa os lotes dos outros).
+    Nenhum job troca o vault de uma instância compartilhada
+    """
+
+    def __init__(self, index: VaultIndex = vault_index, writer_factory: Callable[[], VaultWriter] = VaultWriter):
+        self.index = index
+        self.writer_factory = writer_factory
+        # Indexado pelo caminho resolvido e pelo caminho como configurado
+        self._contexts: Dict[str, ObsidianSync] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, vault_path: str) -> ObsidianSync:
+        """Contexto do vault (a criação verifica as pastas fora do event loop)"""
+        context = self._contexts.get(vault_path)
+        if context is None:
+            context = await vault_io.run(self._create, vault_path, operation="mkdir")
+        return context
+
+    def _create(self, vault_path: str) -> ObsidianSync:
+        key = str(Path(vault_path).expanduser().resolve())
+        with self._lock:
+            context = self._contexts.get(key)
+        if context is None:
+            context = ObsidianSync(key, self.index, self.writer_factory())
+        with self._lock:
+            context = self._contexts.setdefault(key, context)
+            self._contexts[vault_path] = context
+        logger.info(f"Contexto de sincronização criado para o vault: {key}")
+        return context
+
+    def stop(self):
+        """Grava as notas pendentes e encerra o escritor de cada vault"""
+        with self._lock:
+            contexts = {id(context): context for context in self._contexts.values()}
+        # Encerrados em paralelo: cada escritor esvazia a própria fila na sua
+        # thread e a espera total é a do mais lento, não a soma
+        stops = [
+            threading.Thread(target=context.writer.stop, name="vault-writer-stop")
+            for context in contexts.values()
+        ]
+        for thread in stops:
+            thread.start()
+        for thread in stops:
+            thread.join()
+
+
+# Instância global do registro de vaults
+vault_syncs = VaultSyncRegistry()
@@ -0,0 +1,200 @@
+"""
+Escrita de notas no vault com group commit e renomeação atômica
+"""
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple
+
+from ..core import metrics
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PendingWrite:
+    """Nota aguardando o próximo lote"""
+    path: Path
+    content: str
+    future: Future = field(default_factory=Future)
+    make_dirs: bool = True
+    temp_path: Optional[Path] = None
+    fd: Optional[int] = None
+
+
+def _fsync_directory(directory: Path):
+    """Persiste as entradas da pasta (as renomeações); sem efeito no Windows"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class VaultWriter:
+    """
+    Grava notas em lotes numa thread dedicada: cada nota vai para um arquivo
+    temporário na mesma pasta, os temporários recebem fsync em grupo e são
+    renomeados atomicamente sobre o destino; cada pasta recebe um único fsync
+    por lote. Leitores nunca veem arquivos parciais e, após uma queda, resta
+    a versão anterior ou a nova por inteiro
+
+    Enquanto um lote é gravado, as próximas notas se acumulam e formam o lote
+    seguinte (group commit), sem espera artificial
+    """
+
+    def __init__(self, batch_size: int = None, fsync: bool = None):
+        self.batch_size = batch_size or settings.VAULT_WRITER_BATCH_SIZE
+        self.fsync = settings.VAULT_WRITER_FSYNC if fsync is None else fsync
+        self._queue: "queue.Queue[Optional[PendingWrite]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="vault-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, path, content: str, make_dirs: bool = True) -> Future:
+        """
+        Enfileira a escrita; o Future resolve com o caminho após o rename.
+        Com make_dirs=False a pasta precisa existir (o chamador a mantém em cache)
+        """
+        self._ensure_started()
+        pending = PendingWrite(Path(path), content, make_dirs=make_dirs)
+        self._queue.put(pending)
+        return pending.future
+
+    async def write(self, path, content: str, make_dirs: bool = True) -> str:
+        """Fachada assíncrona de submit"""
+        return await asyncio.wrap_future(self.submit(path, content, make_dirs))
+
+    def write_sync(self, path, content: str, timeout: float = None) -> str:
+        """Escrita bloqueante (chamadores síncronos)"""
+        return self.submit(path, content).result(timeout)
+
+    async def write_many(self, items: Iterable[Tuple[str, str]]) -> List[str]:
+        """Enfileira várias notas de uma vez (importações); falhas são propagadas"""
+        futures = [asyncio.wrap_future(self.submit(path, content)) for path, content in items]
+        return list(await asyncio.gather(*futures))
+
+    def _run(self):
+        while True:
+            pending = self._queue.get()
+            if pending is None:
+                return
+            batch = [pending]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    pending = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stop = True
+                    break
+                batch.append(pending)
+
+            # Escritas canceladas antes de o lote começar são descartadas
+            batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+            if batch:
+                self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch: List[PendingWrite]):
+        """Grava um lote: temporários, fsync em grupo, renames e fsync das pastas"""
+        started = time.perf_counter()
+        directories: Set[Path] = set()
+
+        for item in batch:
+            try:
+                if item.make_dirs:
+                    item.path.parent.mkdir(parents=True, exist_ok=True)
+                item.temp_path = item.path.with_name(f".{item.path.name}.{uuid.uuid4().hex[:8]}.tmp")
+                item.fd = os.open(item.temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+                data = item.content.encode("utf-8")
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(item.fd, view):]
+            except Exception as e:
+                self._fail(item, e)
+
+        # fsync em grupo: o sistema pode agregar o writeback dos arquivos do lote
+        for item in batch:
+            if item.fd is None:
+                continue
+            try:
+                if self.fsync:
+                    os.fsync(item.fd)
+            except Exception as e:
+                self._fail(item, e)
+            finally:
+                if item.fd is not None:
+                    os.close(item.fd)
+                    item.fd = None
+
+        # Renomeações na ordem de chegada: a última escrita de um caminho prevalece
+        for item in batch:
+            if item.future.done() or item.temp_path is None:
+                continue
+            try:
+                os.replace(item.temp_path, item.path)
+                directories.add(item.path.parent)
+            except Exception as e:
+                self._fail(item, e)
+
+        if self.fsync:
+            for directory in directories:
+                try:
+                    _fsync_directory(directory)
+                except OSError as e:
+                    logger.warning(f"Falha no fsync da pasta {directory}: {e}")
+
+        for item in batch:
+            if not item.future.done():
+                item.future.set_result(str(item.path))
+
+        metrics.VAULT_WRITE_BATCH_SIZE.observe(len(batch))
+        logger.debug(f"Lote de {len(batch)} notas gravado em {time.perf_counter() - started:.3f}s")
+
+    def _fail(self, item: PendingWrite, error: Exception):
+        """Falha apenas da nota: as demais do lote seguem"""
+        logger.error(f"Erro ao gravar {item.path}: {error}")
+        if item.fd is not None:
+            os.close(item.fd)
+            item.fd = None
+        if item.temp_path is not None:
+            try:
+                os.unlink(item.temp_path)
+            except FileNotFoundError:
+                pass
+        if not item.future.done():
+            item.future.set_exception(error)
+
+    def stop(self, timeout: float = 10.0):
+        """Grava o que estiver na fila e encerra a thread"""
+        thread = self._thread
+        if not thread or not thread.is_alive():
+            return
+        self._queue.put(None)
+        thread.join(timeout)
+        self._thread = None
+
+
+# Instância global do escritor do vault
+vault_writer = VaultWriter()
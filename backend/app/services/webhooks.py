@@ -0,0 +1,304 @@
+"""
+Entrega de webhooks de conclusão de jobs (alternativa ao polling de status)
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from ..core import metrics
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.text_processing import on_status_transition
+from ..models.webhook import WebhookSubscription
+from ..utils.validators import is_public_url
+from .retry_policy import compute_backoff
+
+logger = logging.getLogger(__name__)
+
+# Status final -> evento publicado
+EVENT_BY_STATUS = {
+    "synced": "job.synced",
+    "failed": "job.failed",
+    "dead_letter": "job.failed"
+}
+
+SIGNATURE_HEADER = "X-ObsidianAI-Signature"
+TIMESTAMP_HEADER = "X-ObsidianAI-Timestamp"
+DELIVERY_HEADER = "X-ObsidianAI-Delivery"
+
+
+def event_for_snapshot(snapshot: Dict[str, Any]) -> Optional[str]:
+    """Evento de uma transição; falhas com nova tentativa agendada não são finais"""
+    if snapshot["status"] == "failed" and snapshot.get("next_attempt_at"):
+        return None
+    return EVENT_BY_STATUS.get(snapshot["status"])
+
+
+def sign_payload(secret: str, timestamp: str, body: bytes) -> str:
+    """Assinatura HMAC-SHA256 de "<timestamp>.<corpo>" (o timestamp evita replay)"""
+    digest = hmac.new(secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256)
+    return f"sha256={digest.hexdigest()}"
+
+
+@dataclass(frozen=True)
+class WebhookTarget:
+    """Dados da assinatura necessários para a entrega"""
+    subscription_id: int
+    url: str
+    secret: str
+
+
+class WebhookDispatcher:
+    """
+    Dispatcher assíncrono limitado: eventos entram numa fila de tamanho fixo,
+    são agrupados por assinatura dentro de uma janela curta e enviados por um
+    cliente HTTP com pool de conexões, com no máximo N requisições simultâneas
+    """
+
+    def __init__(
+        self,
+        queue_size: int = None,
+        max_concurrency: int = None,
+        batch_size: int = None,
+        batch_window_seconds: float = None,
+        max_attempts: int = None,
+        retry_base_delay: float = None,
+        retry_max_delay: float = None
+    ):
+        self.queue_size = queue_size or settings.WEBHOOK_QUEUE_SIZE
+        self.max_concurrency = max_concurrency or settings.WEBHOOK_MAX_CONCURRENCY
+        self.batch_size = batch_size or settings.WEBHOOK_BATCH_SIZE
+        self.batch_window = settings.WEBHOOK_BATCH_WINDOW_SECONDS if batch_window_seconds is None else batch_window_seconds
+        self.max_attempts = max_attempts or settings.WEBHOOK_MAX_ATTEMPTS
+        self.retry_base_delay = settings.WEBHOOK_RETRY_BASE_DELAY_SECONDS if retry_base_delay is None else retry_base_delay
+        self.retry_max_delay = settings.WEBHOOK_RETRY_MAX_DELAY_SECONDS if retry_max_delay is None else retry_max_delay
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._deliveries: Set[asyncio.Task] = set()
+
+    def publish_transitions(self, snapshots: List[Dict[str, Any]]):
+        """Callback das transições de status: publica os eventos assináveis"""
+        for snapshot in snapshots:
+            event_type = event_for_snapshot(snapshot)
+            if event_type:
+                self.notify(snapshot["user_id"], event_type, snapshot)
+
+    def notify(self, user_id: str, event_type: str, data: Dict[str, Any]):
+        """Enfileira um evento (seguro para chamadas de outras threads)"""
+        if self._loop is None:
+            return
+
+        event = {
+            "id": uuid.uuid4().hex,
+            "type": event_type,
+            "created_at": datetime.utcnow().isoformat(),
+            "data": {key: value for key, value in data.items() if key != "user_id"}
+        }
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self._loop:
+            self._enqueue(user_id, event)
+        else:
+            self._loop.call_soon_threadsafe(self._enqueue, user_id, event)
+
+    def _enqueue(self, user_id: str, event: Dict[str, Any]):
+        try:
+            self._queue.put_nowait((user_id, event))
+        except asyncio.QueueFull:
+            # Fila cheia: descarta em vez de acumular memória sem limite
+            metrics.WEBHOOK_DELIVERIES.labels(result="dropped").inc()
+            logger.warning(f"Fila de webhooks cheia; evento {event['type']} descartado")
+
+    async def _collect(self):
+        """Agrupa os eventos de uma janela e dispara as entregas (None na fila encerra a coleta)"""
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                return
+            items = [first]
+            stopping = False
+            deadline = self._loop.time() + self.batch_window
+            while len(items) < self.queue_size:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    # Encerramento durante a janela: o lote parcial é entregue
+                    stopping = True
+                    break
+                items.append(item)
+
+            await self._dispatch(items)
+            if stopping:
+                return
+
+    async def _dispatch(self, items: List[Tuple[str, Dict[str, Any]]]):
+        """Cria as tarefas de entrega dos eventos coletados"""
+        try:
+            batches = await asyncio.to_thread(self._group_by_subscription, items)
+        except Exception as e:
+            logger.error(f"Erro ao carregar assinaturas de webhook: {e}")
+            return
+
+        for target, events in batches:
+            for start in range(0, len(events), self.batch_size):
+                task = asyncio.create_task(self._deliver(target, events[start:start + self.batch_size]))
+                self._deliveries.add(task)
+                task.add_done_callback(self._deliveries.discard)
+
+    def _group_by_subscription(self, items: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[WebhookTarget, List[Dict[str, Any]]]]:
+        """Distribui os eventos entre as assinaturas ativas dos usuários"""
+        db = SessionLocal()
+        try:
+            subscriptions = db.query(WebhookSubscription).filter(
+                WebhookSubscription.user_id.in_({user_id for user_id, _ in items}),
+                WebhookSubscription.active == True
+            ).all()
+        finally:
+            db.close()
+
+        batches: Dict[int, Tuple[WebhookTarget, List[Dict[str, Any]]]] = {}
+        for user_id, event in items:
+            for subscription in subscriptions:
+                if subscription.user_id != user_id or not subscription.wants(event["type"]):
+                    continue
+                if subscription.id not in batches:
+                    target = WebhookTarget(subscription.id, subscription.url, subscription.secret)
+                    batches[subscription.id] = (target, [])
+                batches[subscription.id][1].append(event)
+        return list(batches.values())
+
+    async def _deliver(self, target: WebhookTarget, events: List[Dict[str, Any]]) -> bool:
+        """Entrega um lote com retentativas; o mesmo delivery_id é usado em todas"""
+        delivery_id = uuid.uuid4().hex
+        body = json.dumps(
+            {"delivery_id": delivery_id, "events": events},
+            separators=(",", ":"),
+            ensure_ascii=False
+        ).encode()
+
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            # O endereço é verificado de novo a cada envio: o DNS pode ter
+            # passado a apontar para a rede interna depois da assinatura
+            if not settings.WEBHOOK_ALLOW_PRIVATE_URLS and not await asyncio.to_thread(is_public_url, target.url):
+                error = "URL resolve para um endereço não público"
+                break
+
+            timestamp = str(int(time.time()))
+            headers = {
+                "Content-Type": "application/json",
+                DELIVERY_HEADER: delivery_id,
+                TIMESTAMP_HEADER: timestamp,
+                SIGNATURE_HEADER: sign_payload(target.secret, timestamp, body)
+            }
+            try:
+                async with self._slots:
+                    response = await self._client.post(target.url, content=body, headers=headers)
+                if response.status_code < 300:
+                    metrics.WEBHOOK_DELIVERIES.labels(result="delivered").inc()
+                    await asyncio.to_thread(self._record_result, target.subscription_id, None)
+                    return True
+                error = f"HTTP {response.status_code}"
+                # Erros do cliente (exceto timeout/limite de taxa) não melhoram com nova tentativa
+                if response.status_code < 500 and response.status_code not in (408, 429):
+                    break
+            except httpx.HTTPError as e:
+                error = f"{type(e).__name__}: {e}"
+
+            if attempt < self.max_attempts:
+                await asyncio.sleep(compute_backoff(attempt, self.retry_base_delay, self.retry_max_delay))
+
+        metrics.WEBHOOK_DELIVERIES.labels(result="failed").inc()
+        logger.warning(f"Falha na entrega do webhook {target.subscription_id}: {error}")
+        await asyncio.to_thread(self._record_result, target.subscription_id, error)
+        return False
+
+    def _record_result(self, subscription_id: int, error: Optional[str]):
+        """Registra o resultado da última entrega na assinatura"""
+        db = SessionLocal()
+        try:
+            subscription = db.query(WebhookSubscription).filter(
+                WebhookSubscription.id == subscription_id
+            ).first()
+            if not subscription:
+                return
+            subscription.last_delivery_at = datetime.utcnow()
+            subscription.last_error = error
+            subscription.consecutive_failures = (subscription.consecutive_failures or 0) + 1 if error else 0
+            db.commit()
+        except Exception as e:
+            logger.error(f"Erro ao registrar entrega de webhook: {e}")
+        finally:
+            db.close()
+
+    def start(self):
+        """Inicia o dispatcher no event loop corrente"""
+        if self._collector:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._client = httpx.AsyncClient(
+            timeout=settings.WEBHOOK_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency
+            )
+        )
+        self._collector = asyncio.create_task(self._collect())
+
+    async def stop(self, timeout: float = None):
+        """Encerra a coleta (o lote em formação é entregue), envia o que restou na fila e aguarda (com limite) as entregas"""
+        if not self._collector:
+            return
+        # Sinal na fila em vez de cancel(): a coleta entrega o lote parcial antes de sair
+        await self._queue.put(None)
+        await asyncio.gather(self._collector, return_exceptions=True)
+
+        remaining = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                remaining.append(item)
+        if remaining:
+            await self._dispatch(remaining)
+
+        if self._deliveries:
+            pending = list(self._deliveries)
+            _, still_running = await asyncio.wait(
+                pending, timeout=settings.WEBHOOK_TIMEOUT_SECONDS if timeout is None else timeout
+            )
+            for task in still_running:
+                task.cancel()
+            await asyncio.gather(*still_running, return_exceptions=True)
+
+        await self._client.aclose()
+        self._collector = None
+        self._client = None
+        self._loop = None
+
+
+# Instância global do dispatcher
+webhook_dispatcher = WebhookDispatcher()
+on_status_transition(webhook_dispatcher.publish_transitions)
@@ -1,5 +1,9 @@
 from .validators import (
     TextInputValidator,
+    JobIdsValidator,
+    JobStatusBatchValidator,
+    WebhookSubscriptionValidator,
+    BulkImportValidator,
     ConfigurationValidator,
     AIPreferencesValidator,
     sanitize_filename,
@@ -9,9 +13,16 @@ from .validators import (
     extract_emails_from_text,
     detect_content_type
 )
+from .timing import StageTimer
+from .deadline import Deadline, DeadlineExceeded
+from .frontmatter import dump_frontmatter
 
 __all__ = [
     "TextInputValidator",
+    "JobIdsValidator",
+    "JobStatusBatchValidator",
+    "WebhookSubscriptionValidator",
+    "BulkImportValidator",
     "ConfigurationValidator", 
     "AIPreferencesValidator",
     "sanitize_filename",
@@ -19,5 +30,9 @@ __all__ = [
     "validate_email",
     "extract_urls_from_text",
     "extract_emails_from_text",
-    "detect_content_type"
+    "detect_content_type",
+    "StageTimer",
+    "Deadline",
+    "DeadlineExceeded",
+    "dump_frontmatter"
 ] 
\ No newline at end of file
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Awaitable, Optional, TypeVar
+
+from ..core.config import settings
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """Prazo do job esgotado (ou insuficiente) para executar a etapa"""
+
+    def __init__(self, stage: str, remaining: float):
+        super().__init__(
+            f"Prazo do job esgotado na etapa '{stage}' "
+            f"(restavam {max(remaining, 0.0):.1f}s)"
+        )
+        self.stage = stage
+        self.remaining = remaining
+
+
+class Deadline:
+    """Prazo absoluto de uma tentativa do job, repartido entre as etapas"""
+
+    def __init__(self, expires_at: datetime):
+        self.expires_at = expires_at
+
+    def remaining(self) -> float:
+        """Segundos restantes até o prazo (negativo se já expirou)"""
+        return (self.expires_at - datetime.utcnow()).total_seconds()
+
+    def extend(self, seconds: float):
+        """Adia o prazo pelo tempo que não deve contar para a tentativa (ex.: fila de slots)"""
+        if seconds > 0:
+            self.expires_at += timedelta(seconds=seconds)
+
+    def require(self, stage: str, minimum: Optional[float] = None) -> float:
+        """
+        Garante o tempo mínimo da etapa antes de começá-la (falha rápida em vez
+        de iniciar um trabalho que não terminaria a tempo); retorna o restante
+        """
+        if minimum is None:
+            minimum = settings.JOB_STAGE_MIN_SECONDS.get(stage, 0)
+        remaining = self.remaining()
+        if remaining <= 0 or remaining < minimum:
+            raise DeadlineExceeded(stage, remaining)
+        return remaining
+
+    async def run(self, stage: str, awaitable: Awaitable[T]) -> T:
+        """Executa a etapa limitada ao tempo restante"""
+        try:
+            timeout = self.require(stage)
+        except DeadlineExceeded:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            # Inclui timeouts internos calibrados pelo mesmo prazo (cliente HTTP, OCR)
+            raise DeadlineExceeded(stage, self.remaining())
@@ -0,0 +1,185 @@
+"""
+Serialização do frontmatter YAML das notas
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+import yaml
+from yaml.resolver import Resolver
+
+# Emissor em C (libyaml) para o que o caminho rápido não cobre
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# Largura a partir da qual o PyYAML quebra escalares longos nos espaços
+BEST_WIDTH = 80
+
+STR_TAG = "tag:yaml.org,2002:str"
+
+# Caracteres imprimíveis para o emissor do PyYAML com allow_unicode (sem quebras de linha)
+_PRINTABLE = re.compile("[\x20-\x7e\xa0-\ud7ff\ue000-\ufefe\uff00-\ufffd\U00010000-\U0010fffe]*\\Z")
+_LEADING_INDICATORS = set("#,[]{}&*!|>'\"%@`")
+
+_resolver = Resolver()
+# Primeiros caracteres com resolvedores implícitos (números, datas, booleanos, nulo)
+_IMPLICIT_FIRST = frozenset(ch for ch in Resolver.yaml_implicit_resolvers if ch)
+
+
+def _scalar_style(text: str) -> Optional[str]:
+    """
+    Estilo que o PyYAML escolheria em contexto de bloco: "" (plain), "'" (aspas
+    simples) ou None quando o caminho rápido não cobre o texto
+    """
+    if not text:
+        return "'"
+    if not _PRINTABLE.match(text) or text[0] == " " or text[-1] == " ":
+        return None
+
+    plain = not (text.startswith("---") or text.startswith("..."))
+    first = text[0]
+    if first in _LEADING_INDICATORS:
+        plain = False
+    elif first in "-?:" and (len(text) == 1 or text[1] == " "):
+        plain = False
+    elif ": " in text or " #" in text or text.endswith(":"):
+        plain = False
+    if plain and first in _IMPLICIT_FIRST and _resolver.resolve(yaml.ScalarNode, text, (True, False)) != STR_TAG:
+        # Texto que seria lido como número, data, booleano ou nulo
+        plain = False
+    return "" if plain else "'"
+
+
+def _write_scalar(text: str, column: int, indent: int, quoted: bool) -> str:
+    """
+    Reproduz Emitter.write_plain / write_single_quoted: quebra a linha num
+    espaço simples quando a coluna já passou de BEST_WIDTH
+    """
+    if quoted and "'" not in text and column + len(text) + 3 <= BEST_WIDTH:
+        return f" '{text}'"
+    if not quoted and column + len(text) + 1 <= BEST_WIDTH:
+        return " " + text
+
+    parts = [" '" if quoted else " "]
+    column += len(parts[0])
+    start = 0
+    spaces = False
+    length = len(text)
+    for end in range(length + 1):
+        ch = text[end] if end < length else None
+        if spaces:
+            if ch != " ":
+                if start + 1 == end and column > BEST_WIDTH:
+                    parts.append("\n" + " " * indent)
+                    column = indent
+                else:
+                    parts.append(text[start:end])
+                    column += end - start
+                start = end
+        elif ch is None or ch == " " or (quoted and ch == "'"):
+            if start < end:
+                parts.append(text[start:end])
+                column += end - start
+                start = end
+        if quoted and ch == "'":
+            parts.append("''")
+            column += 2
+            start = end + 1
+        spaces = ch == " "
+    if quoted:
+        parts.append("'")
+    return "".join(parts)
+
+
+def _represent_float(value: float) -> str:
+    """Mesmo texto de SafeRepresenter.represent_float"""
+    if value != value:
+        return ".nan"
+    if value == float("inf"):
+        return ".inf"
+    if value == float("-inf"):
+        return "-.inf"
+    text = repr(value).lower()
+    if "." not in text and "e" in text:
+        text = text.replace("e", ".0e", 1)
+    return text
+
+
+def _emit_scalar(value: Any, column: int, indent: int) -> Optional[str]:
+    """Escalar após o indicador (":" ou "-"), com o espaço inicial"""
+    kind = type(value)
+    if value is None:
+        return " null"
+    if kind is bool:
+        return " true" if value else " false"
+    if kind is int:
+        return f" {value}"
+    if kind is float:
+        return " " + _represent_float(value)
+    if kind is str:
+        style = _scalar_style(value)
+        if style is None:
+            return None
+        return _write_scalar(value, column, indent, quoted=style == "'")
+    return None
+
+
+def _emit_mapping(data: Dict[str, Any], indent: int, lines: List[str]) -> bool:
+    """Mapeamento em bloco com chaves ordenadas; False se algo sair do caminho rápido"""
+    prefix = " " * indent
+    for key in sorted(data):
+        if type(key) is not str or _scalar_style(key) != "" or len(key) >= 128:
+            return False
+        value = data[key]
+        head = f"{prefix}{key}:"
+        kind = type(value)
+
+        if kind is dict:
+            if not value:
+                lines.append(head + " {}\n")
+                continue
+            lines.append(head + "\n")
+            if not _emit_mapping(value, indent + 2, lines):
+                return False
+        elif kind is list:
+            if not value:
+                lines.append(head + " []\n")
+                continue
+            lines.append(head + "\n")
+            # Sequências dentro de mapeamentos não recebem indentação extra
+            for item in value:
+                scalar = _emit_scalar(item, indent + 1, indent + 2)
+                if scalar is None:
+                    return False
+                lines.append(f"{prefix}-{scalar}\n")
+        else:
+            scalar = _emit_scalar(value, len(head), indent + 2)
+            if scalar is None:
+                return False
+            lines.append(head + scalar + "\n")
+    return True
+
+
+def dump_frontmatter(data: Dict[str, Any]) -> str:
+    """
+    Mesmo resultado de yaml.dump(data, default_flow_style=False,
+    allow_unicode=True) para o formato das notas (textos, números, booleanos,
+    listas de escalares e mapeamentos aninhados). Entradas fora desse formato
+    são emitidas pelo libyaml (CSafeDumper); textos com caracteres que o
+    libyaml não emite diretamente (emojis) saem escapados entre aspas duplas
+    """
+    if not data:
+        return yaml.dump(data, Dumper=YAML_DUMPER, default_flow_style=False, allow_unicode=True)
+    try:
+        keys = sorted(data)
+    except TypeError:
+        return yaml.dump(data, Dumper=YAML_DUMPER, default_flow_style=False, allow_unicode=True)
+
+    output = []
+    for key in keys:
+        lines: List[str] = []
+        if _emit_mapping({key: data[key]}, 0, lines):
+            output.extend(lines)
+        else:
+            output.append(yaml.dump(
+                {key: data[key]}, Dumper=YAML_DUMPER, default_flow_style=False, allow_unicode=True
+            ))
+    return "".join(output)
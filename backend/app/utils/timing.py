@@ -0,0 +1,23 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class StageTimer:
+    """Mede a duração das etapas do pipeline de um job"""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Cronometra o bloco e acumula a duração na etapa informada"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        """Acumula duração (em segundos) para uma etapa"""
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
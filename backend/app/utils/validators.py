@@ -1,6 +1,9 @@
+import ipaddress
 import re
+import socket
 import bleach
-from typing import List, Optional
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
 from pydantic import BaseModel, validator, Field
 
 from ..core.config import settings
@@ -61,6 +64,73 @@ class TextInputValidator(BaseModel):
         return clean_tags[:10]  # Garante máximo de 10
 
 
+class JobIdsValidator(BaseModel):
+    """Validador para operações em lote sobre jobs"""
+    job_ids: List[str] = Field(default=[], description="IDs dos jobs (vazio = todos elegíveis)")
+    
+    @validator('job_ids')
+    def validate_job_ids(cls, v):
+        if len(v) > 500:
+            raise ValueError('Máximo 500 jobs por operação')
+        return v
+
+
+class JobStatusBatchValidator(BaseModel):
+    """Validador para consulta de status em lote"""
+    job_ids: List[str] = Field(..., description="IDs dos jobs acompanhados")
+    versions: Dict[str, int] = Field(default={}, description="Última versão conhecida pelo cliente, por job")
+    
+    @validator('job_ids')
+    def validate_job_ids(cls, v):
+        if not v:
+            raise ValueError('Informe ao menos um job')
+        if len(v) > 500:
+            raise ValueError('Máximo 500 jobs por consulta')
+        # Remove duplicados preservando a ordem
+        return list(dict.fromkeys(v))
+
+
+class BulkImportValidator(BaseModel):
+    """Validador para importação em lote"""
+    source_path: str = Field(..., description="Pasta ou ZIP relativo a IMPORT_ROOT")
+    category: str = Field(default="inbox", description="Categoria das notas importadas")
+    
+    @validator('source_path')
+    def validate_source_path(cls, v):
+        if not v or not v.strip():
+            raise ValueError('Informe a pasta ou o arquivo ZIP')
+        return v.strip()
+    
+    @validator('category')
+    def validate_category(cls, v):
+        allowed_categories = ['inbox', 'ideas', 'tasks', 'articles', 'meetings', 'references']
+        if v not in allowed_categories:
+            raise ValueError(f'Categoria deve ser uma das: {", ".join(allowed_categories)}')
+        return v
+
+
+class WebhookSubscriptionValidator(BaseModel):
+    """Validador para assinaturas de webhook"""
+    url: str = Field(..., description="URL que recebe as entregas (POST)")
+    events: List[str] = Field(default=["job.synced", "job.failed"], description="Eventos assinados")
+    
+    @validator('url')
+    def validate_webhook_url(cls, v):
+        if not validate_url(v) or len(v) > 500:
+            raise ValueError('URL inválida')
+        return v
+    
+    @validator('events')
+    def validate_events(cls, v):
+        allowed_events = ['job.synced', 'job.failed']
+        if not v:
+            raise ValueError('Informe ao menos um evento')
+        for event in v:
+            if event not in allowed_events:
+                raise ValueError(f'Eventos devem ser: {", ".join(allowed_events)}')
+        return list(dict.fromkeys(v))
+
+
 class ConfigurationValidator(BaseModel):
     """Validador para configurações do usuário"""
     obsidian_vault_path: Optional[str] = Field(None, description="Caminho do vault do Obsidian")
@@ -162,6 +232,27 @@ def validate_url(url: str) -> bool:
     return bool(re.match(url_pattern, url))
 
 
+def is_public_url(url: str) -> bool:
+    """
+    Verifica se o host da URL resolve apenas para endereços públicos (sem
+    loopback, link-local, redes privadas ou reservadas). Bloqueante: resolve DNS
+    """
+    host = urlparse(url).hostname
+    if not host:
+        return False
+    try:
+        infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError):
+        return False
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global:
+            return False
+    return bool(infos)
+
+
 def validate_email(email: str) -> bool:
     """Valida se um email é válido"""
     email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
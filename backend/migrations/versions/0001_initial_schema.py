@@ -0,0 +1,96 @@
+"""schema inicial (jobs e configurações de usuário)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 12:00:00
+
+Bancos criados antes das migrações (create_all) têm este schema e são
+marcados com esta revisão por init_database antes do upgrade.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+PROCESSING_STATUS = sa.Enum(
+    "QUEUED", "PROCESSING", "PROCESSED", "SYNCING", "SYNCED", "FAILED", "CANCELLED",
+    name="processingstatus"
+)
+
+
+def upgrade():
+    op.create_table(
+        "text_processing_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.String(length=50), nullable=False),
+        sa.Column("job_id", sa.String(length=100), nullable=False),
+        sa.Column("original_text", sa.Text(), nullable=False),
+        sa.Column("category", sa.String(length=50), nullable=True),
+        sa.Column("priority", sa.String(length=20), nullable=True),
+        sa.Column("tags", sa.Text(), nullable=True),
+        sa.Column("processed_markdown", sa.Text(), nullable=True),
+        sa.Column("ai_response", sa.Text(), nullable=True),
+        sa.Column("extracted_metadata", sa.Text(), nullable=True),
+        sa.Column("status", PROCESSING_STATUS, nullable=True),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("retry_count", sa.Integer(), nullable=True),
+        sa.Column("obsidian_file_path", sa.String(length=500), nullable=True),
+        sa.Column("temp_file_path", sa.String(length=500), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("processed_at", sa.DateTime(), nullable=True),
+        sa.Column("synced_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("ai_model_used", sa.String(length=100), nullable=True),
+        sa.Column("processing_time_seconds", sa.Integer(), nullable=True),
+        sa.Column("word_count", sa.Integer(), nullable=True),
+        sa.Column("char_count", sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint("id")
+    )
+    op.create_index("ix_text_processing_jobs_id", "text_processing_jobs", ["id"])
+    op.create_index("ix_text_processing_jobs_user_id", "text_processing_jobs", ["user_id"])
+    op.create_index("ix_text_processing_jobs_job_id", "text_processing_jobs", ["job_id"], unique=True)
+    op.create_index("ix_text_processing_jobs_category", "text_processing_jobs", ["category"])
+    op.create_index("ix_text_processing_jobs_status", "text_processing_jobs", ["status"])
+    op.create_index("ix_text_processing_jobs_created_at", "text_processing_jobs", ["created_at"])
+
+    op.create_table(
+        "user_configurations",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.String(length=50), nullable=False),
+        sa.Column("obsidian_vault_path", sa.String(length=500), nullable=True),
+        sa.Column("sync_method", sa.String(length=50), nullable=True),
+        sa.Column("auto_sync_enabled", sa.Boolean(), nullable=True),
+        sa.Column("backup_before_sync", sa.Boolean(), nullable=True),
+        sa.Column("default_category", sa.String(length=50), nullable=True),
+        sa.Column("categories_config", sa.Text(), nullable=True),
+        sa.Column("default_template_style", sa.String(length=50), nullable=True),
+        sa.Column("templates_config", sa.Text(), nullable=True),
+        sa.Column("ai_preferences", sa.Text(), nullable=True),
+        sa.Column("ai_creativity_level", sa.String(length=20), nullable=True),
+        sa.Column("ai_verbosity", sa.String(length=20), nullable=True),
+        sa.Column("ai_language_tone", sa.String(length=20), nullable=True),
+        sa.Column("auto_tag_enabled", sa.Boolean(), nullable=True),
+        sa.Column("default_tags", sa.Text(), nullable=True),
+        sa.Column("preferred_tags", sa.Text(), nullable=True),
+        sa.Column("auto_categorization", sa.Boolean(), nullable=True),
+        sa.Column("folder_structure_style", sa.String(length=20), nullable=True),
+        sa.Column("enable_task_tracking", sa.Boolean(), nullable=True),
+        sa.Column("enable_idea_tracking", sa.Boolean(), nullable=True),
+        sa.Column("enable_article_tracking", sa.Boolean(), nullable=True),
+        sa.Column("default_project", sa.String(length=100), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id")
+    )
+    op.create_index("ix_user_configurations_id", "user_configurations", ["id"])
+    op.create_index("ix_user_configurations_user_id", "user_configurations", ["user_id"], unique=True)
+
+
+def downgrade():
+    op.drop_table("user_configurations")
+    op.drop_table("text_processing_jobs")
+    PROCESSING_STATUS.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,38 @@
+"""tempos por etapa e processing_time_seconds fracionário
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("text_processing_jobs") as batch:
+        batch.alter_column(
+            "processing_time_seconds",
+            existing_type=sa.Integer(),
+            type_=sa.Float(),
+            existing_nullable=True
+        )
+        batch.add_column(sa.Column("stage_timings", sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("text_processing_jobs") as batch:
+        batch.drop_column("stage_timings")
+        batch.alter_column(
+            "processing_time_seconds",
+            existing_type=sa.Float(),
+            type_=sa.Integer(),
+            existing_nullable=True,
+            postgresql_using="round(processing_time_seconds)::integer"
+        )
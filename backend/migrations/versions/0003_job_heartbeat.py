@@ -0,0 +1,28 @@
+"""lease dos workers para recuperar jobs órfãos
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("text_processing_jobs", sa.Column("heartbeat_at", sa.DateTime(), nullable=True))
+    op.create_index("ix_text_processing_jobs_heartbeat_at", "text_processing_jobs", ["heartbeat_at"])
+    # Jobs existentes: a última atualização vale como último sinal do worker
+    op.execute("UPDATE text_processing_jobs SET heartbeat_at = updated_at WHERE heartbeat_at IS NULL")
+
+
+def downgrade():
+    op.drop_index("ix_text_processing_jobs_heartbeat_at", table_name="text_processing_jobs")
+    with op.batch_alter_table("text_processing_jobs") as batch:
+        batch.drop_column("heartbeat_at")
@@ -0,0 +1,22 @@
+"""índice em processed_at para a estimativa de vazão da admissão
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_text_processing_jobs_processed_at", "text_processing_jobs", ["processed_at"])
+
+
+def downgrade():
+    op.drop_index("ix_text_processing_jobs_processed_at", table_name="text_processing_jobs")
@@ -0,0 +1,46 @@
+"""reprocessamento automático e status dead_letter
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+STATUSES = ["QUEUED", "PROCESSING", "PROCESSED", "SYNCING", "SYNCED", "FAILED", "CANCELLED"]
+
+
+def upgrade():
+    op.add_column("text_processing_jobs", sa.Column("error_kind", sa.String(length=20), nullable=True))
+    op.add_column("text_processing_jobs", sa.Column("next_attempt_at", sa.DateTime(), nullable=True))
+    op.create_index("ix_text_processing_jobs_next_attempt_at", "text_processing_jobs", ["next_attempt_at"])
+
+    # Novo valor do enum processingstatus (tipo nativo no PostgreSQL; nos
+    # demais bancos, VARCHAR/ENUM com o tamanho do maior valor)
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE processingstatus ADD VALUE IF NOT EXISTS 'DEAD_LETTER'")
+    else:
+        with op.batch_alter_table("text_processing_jobs") as batch:
+            batch.alter_column(
+                "status",
+                existing_type=sa.Enum(*STATUSES, name="processingstatus"),
+                type_=sa.Enum(*STATUSES, "DEAD_LETTER", name="processingstatus"),
+                existing_nullable=True
+            )
+
+
+def downgrade():
+    # O PostgreSQL não remove valores de um enum: DEAD_LETTER permanece no tipo
+    op.execute("UPDATE text_processing_jobs SET status = 'FAILED' WHERE status = 'DEAD_LETTER'")
+    op.drop_index("ix_text_processing_jobs_next_attempt_at", table_name="text_processing_jobs")
+    with op.batch_alter_table("text_processing_jobs") as batch:
+        batch.drop_column("next_attempt_at")
+        batch.drop_column("error_kind")
@@ -0,0 +1,24 @@
+"""checkpoints das etapas do pipeline
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("text_processing_jobs", sa.Column("checkpoints", sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("text_processing_jobs") as batch:
+        batch.drop_column("checkpoints")
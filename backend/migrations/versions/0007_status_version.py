@@ -0,0 +1,28 @@
+"""versão do status para o ETag do cache de status
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # server_default preenche os jobs existentes (a coluna é NOT NULL)
+    op.add_column(
+        "text_processing_jobs",
+        sa.Column("status_version", sa.Integer(), nullable=False, server_default="0")
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("text_processing_jobs") as batch:
+        batch.drop_column("status_version")
@@ -0,0 +1,42 @@
+"""feed incremental de alterações dos jobs
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "change_sequences",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("value", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("name")
+    )
+    op.add_column("text_processing_jobs", sa.Column("change_seq", sa.Integer(), nullable=True))
+    op.create_index(
+        "ix_text_processing_jobs_user_change_seq", "text_processing_jobs", ["user_id", "change_seq"]
+    )
+
+    # Jobs existentes entram no feed na ordem de criação; a sequência continua a partir deles
+    op.execute("UPDATE text_processing_jobs SET change_seq = id")
+    op.execute(
+        "INSERT INTO change_sequences (name, value) "
+        "SELECT 'jobs', COALESCE(MAX(id), 0) FROM text_processing_jobs"
+    )
+
+
+def downgrade():
+    op.drop_index("ix_text_processing_jobs_user_change_seq", table_name="text_processing_jobs")
+    with op.batch_alter_table("text_processing_jobs") as batch:
+        batch.drop_column("change_seq")
+    op.drop_table("change_sequences")
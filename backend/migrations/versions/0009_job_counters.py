@@ -0,0 +1,43 @@
+"""contadores de jobs por usuário, categoria e status
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 12:00:00
+
+Os contadores começam com a contagem dos jobs existentes; a reconciliação
+periódica (JobCounterReconciler) corrige divergências posteriores.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "job_counters",
+        sa.Column("user_id", sa.String(length=50), nullable=False),
+        sa.Column("category", sa.String(length=50), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "category", "status")
+    )
+
+    # Os jobs gravam o status pelo nome do Enum (QUEUED, DEAD_LETTER); os
+    # contadores, pelo valor (queued, dead_letter), que é o nome em minúsculas.
+    # O CAST cobre o tipo enum nativo do PostgreSQL
+    op.execute(
+        "INSERT INTO job_counters (user_id, category, status, count) "
+        "SELECT user_id, category, LOWER(CAST(status AS VARCHAR(20))), COUNT(*) "
+        "FROM text_processing_jobs "
+        "WHERE category IS NOT NULL AND status IS NOT NULL "
+        "GROUP BY user_id, category, status"
+    )
+
+
+def downgrade():
+    op.drop_table("job_counters")
@@ -0,0 +1,24 @@
+"""prazo da tentativa em andamento
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("text_processing_jobs", sa.Column("deadline_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("text_processing_jobs") as batch:
+        batch.drop_column("deadline_at")
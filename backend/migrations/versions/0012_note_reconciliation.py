@@ -0,0 +1,26 @@
+"""hash e data de edição da nota para a reconciliação com o vault
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("text_processing_jobs", sa.Column("note_content_hash", sa.String(length=64), nullable=True))
+    op.add_column("text_processing_jobs", sa.Column("note_edited_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("text_processing_jobs") as batch:
+        batch.drop_column("note_edited_at")
+        batch.drop_column("note_content_hash")
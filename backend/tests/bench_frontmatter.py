@@ -0,0 +1,55 @@
+"""
+Benchmark da serialização do frontmatter (caminho de escrita das notas)
+
+Uso:
+    python -m tests.bench_frontmatter [--notes 5000]
+"""
+import argparse
+import copy
+import time
+
+import yaml
+
+from app.utils.frontmatter import YAML_DUMPER, dump_frontmatter
+from tests.test_frontmatter import NOTE
+
+
+def _notes(count: int):
+    notes = []
+    for i in range(count):
+        note = copy.deepcopy(NOTE)
+        note["title"] = f"{NOTE['title']} {i}"
+        note["job_id"] = f"job_20261019104720_{i:016x}"
+        notes.append(note)
+    return notes
+
+
+def _measure(label: str, dump, notes) -> float:
+    started = time.perf_counter()
+    for note in notes:
+        dump(note)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed * 1e6 / len(notes):8.1f} µs/nota  {len(notes) / elapsed:10.0f} notas/s")
+    return elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--notes", type=int, default=5000)
+    args = parser.parse_args(argv)
+    notes = _notes(args.notes)
+
+    baseline = _measure(
+        "yaml.dump (Python)", lambda n: yaml.dump(n, default_flow_style=False, allow_unicode=True), notes
+    )
+    _measure(
+        "yaml.dump (CSafeDumper)",
+        lambda n: yaml.dump(n, Dumper=YAML_DUMPER, default_flow_style=False, allow_unicode=True),
+        notes
+    )
+    fast = _measure("dump_frontmatter", dump_frontmatter, notes)
+    print(f"Ganho sobre yaml.dump: {baseline / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import threading
+from collections import OrderedDict
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app.core.database import SessionLocal, engine as app_engine, upgrade_schema
+from app.core.security import create_tokens
+from app.core.status_cache import status_cache
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Banco SQLite temporário com o schema migrado; SessionLocal e o cache de status passam a usá-lo"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'obsidian_ai.db'}",
+        connect_args={"check_same_thread": False}
+    )
+    upgrade_schema(engine)
+    SessionLocal.configure(bind=engine)
+    monkeypatch.setattr(status_cache, "path", str(tmp_path / "status_cache.db"))
+    monkeypatch.setattr(status_cache, "_thread_state", threading.local())
+    monkeypatch.setattr(status_cache, "_local", OrderedDict())
+    yield engine
+    SessionLocal.configure(bind=app_engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def api(database):
+    """Cliente da API sobre o banco temporário (sem os eventos de inicialização)"""
+    from app.main import app
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth():
+    """Cabeçalhos de autenticação de um usuário"""
+    def headers(user_id: str):
+        return {"Authorization": f"Bearer {create_tokens(user_id)['access_token']}"}
+    return headers
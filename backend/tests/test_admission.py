@@ -0,0 +1,65 @@
+import pytest
+
+from app.core.database import SessionLocal
+from app.models.text_processing import TextProcessingJob
+from app.routers import processing
+from app.services.admission import admission_controller
+
+from .test_job_status import create_job, update_job
+
+
+@pytest.fixture
+def backlog(database, monkeypatch):
+    """3 jobs na fila e 2 concluídos numa janela de 10s (escoamento de 0,2 job/s)"""
+    monkeypatch.setattr(admission_controller, "limits", {"low": 2, "normal": 3, "high": 5})
+    monkeypatch.setattr(admission_controller, "drain_window", 10)
+    monkeypatch.setattr(admission_controller, "snapshot_ttl", 0)
+    monkeypatch.setattr(admission_controller, "_snapshot", None)
+    submitted = []
+
+    async def pipeline(job_id, user_id):
+        submitted.append(job_id)
+
+    monkeypatch.setattr(processing, "process_text_background", pipeline)
+
+    for _ in range(3):
+        create_job()
+    for _ in range(2):
+        update_job(create_job(), lambda job: job.mark_processing_completed("# nota", "{}", {}))
+    return submitted
+
+
+def jobs_count():
+    db = SessionLocal()
+    try:
+        return db.query(TextProcessingJob).count()
+    finally:
+        db.close()
+
+
+def test_full_backlog_is_rejected_with_retry_after(backlog, api, auth):
+    """Fila no limite da prioridade: 429 com Retry-After estimado pela vazão, sem criar o job"""
+    response = api.post("/api/processing/text", json={"text": "uma nota"}, headers=auth("u1"))
+    assert response.status_code == 429
+    # Um job acima do limite a 0,2 job/s
+    assert response.headers["Retry-After"] == "5"
+    assert jobs_count() == 5
+    assert backlog == []
+
+
+def test_limits_are_per_priority(backlog, api, auth):
+    """Prioridades mais altas aceitam um backlog maior; as mais baixas esperam mais"""
+    headers = auth("u1")
+
+    low = api.post("/api/processing/text", json={"text": "uma nota", "priority": "low"}, headers=headers)
+    assert low.status_code == 429
+    assert low.headers["Retry-After"] == "10"
+
+    high = api.post("/api/processing/text", json={"text": "uma nota", "priority": "high"}, headers=headers)
+    assert high.status_code == 200
+    assert backlog == [high.json()["job_id"]]
+
+    # O job admitido conta no backlog: o próximo de prioridade normal espera mais
+    normal = api.post("/api/processing/text", json={"text": "uma nota"}, headers=headers)
+    assert normal.status_code == 429
+    assert normal.headers["Retry-After"] == "10"
@@ -0,0 +1,179 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from anthropic import APIConnectionError, AsyncAnthropic
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.text_processing import ProcessingStatus, TextProcessingJob
+from app.services import job_pipeline
+from app.services.ai_processor import AIProcessor
+from app.services.job_registry import JobTaskRegistry, job_registry
+from app.utils.deadline import Deadline
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    """AIProcessor cuja chamada ao provedor fica pendente e conta as tentativas"""
+    processor = AIProcessor()
+    processor.calls = 0
+    processor.started = None
+
+    async def stream_completion(client, messages, timer=None):
+        processor.calls += 1
+        processor.started.set()
+        await asyncio.sleep(30)
+        return "{}"
+
+    monkeypatch.setattr(processor, "_stream_completion", stream_completion)
+    return processor
+
+
+MESSAGES = [{"role": "user", "content": "texto"}]
+
+
+def sdk_client(handler):
+    """Cliente real do SDK com o transporte HTTP substituído pelo handler do teste"""
+    return AsyncAnthropic(api_key="test", http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+def sse(*events):
+    return "".join(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n" for event in events).encode()
+
+
+STREAM_EVENTS = sse(
+    {"type": "message_start", "message": {
+        "id": "msg_1", "type": "message", "role": "assistant", "content": [], "model": "m",
+        "stop_reason": None, "stop_sequence": None, "usage": {"input_tokens": 5, "output_tokens": 0}
+    }},
+    {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+    {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "Olá, "}},
+    {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "mundo"}},
+    {"type": "content_block_stop", "index": 0},
+    {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": 2}},
+    {"type": "message_stop"},
+)
+
+
+@pytest.mark.parametrize("interrupt", ["cancel", "drain"])
+def test_cancelled_job_does_not_call_provider_again(processor, interrupt):
+    """Cancelamento (ou drenagem) durante a chamada encerra o job sem nova tentativa"""
+    registry = JobTaskRegistry()
+
+    async def scenario():
+        processor.started = asyncio.Event()
+        task = registry.submit("job-1", processor._call_claude_api(MESSAGES))
+        await asyncio.wait_for(processor.started.wait(), timeout=5)
+        if interrupt == "cancel":
+            assert registry.cancel("job-1")
+        else:
+            assert registry.interrupt_all() == ["job-1"]
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(task, timeout=5)
+        # Tempo para uma eventual retentativa começar
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert processor.calls == 1
+
+
+def test_transient_provider_error_is_retried(processor, monkeypatch):
+    """Falhas de conexão continuam com retentativa local"""
+    async def failing_then_ok(client, messages, timer=None):
+        processor.calls += 1
+        if processor.calls == 1:
+            raise APIConnectionError(request=httpx.Request("POST", "https://api.anthropic.com"))
+        return "ok"
+
+    monkeypatch.setattr(processor, "_stream_completion", failing_then_ok)
+    # Sem espera entre as tentativas
+    monkeypatch.setattr(processor._call_claude_api.retry, "wait", lambda retry_state: 0)
+
+    assert asyncio.run(processor._call_claude_api(MESSAGES)) == "ok"
+    assert processor.calls == 2
+
+
+def test_waiting_for_an_ai_slot_does_not_consume_the_deadline(processor, monkeypatch):
+    """Com mais jobs que slots, a espera na fila não esgota o prazo da etapa de IA"""
+    monkeypatch.setattr(job_registry, "_max_ai_calls", 1)
+    monkeypatch.setattr(job_registry, "_ai_slots", None)
+    monkeypatch.setattr(settings, "JOB_STAGE_MIN_SECONDS", {})
+    monkeypatch.setattr(processor.client, "with_options", lambda **options: processor.client)
+    running = []
+
+    async def stream_completion(client, messages, timer=None):
+        running.append(job_registry.ai_slots.locked())
+        await asyncio.sleep(0.2)
+        return "ok"
+
+    monkeypatch.setattr(processor, "_stream_completion", stream_completion)
+
+    async def scenario():
+        # Cada chamada cabe no prazo; as três em sequência, não
+        deadlines = [Deadline(datetime.utcnow() + timedelta(seconds=0.5)) for _ in range(3)]
+        return await asyncio.gather(*(
+            processor._call_claude_api(MESSAGES, deadline=deadline) for deadline in deadlines
+        )), deadlines
+
+    results, deadlines = asyncio.run(scenario())
+    assert results == ["ok", "ok", "ok"]
+    assert running == [True, True, True]
+    assert deadlines[2].expires_at > deadlines[0].expires_at + timedelta(seconds=0.3)
+
+
+def test_streaming_call_through_the_sdk(monkeypatch):
+    """A chamada usa messages.stream do SDK fixado, com o prompt de sistema fora das mensagens"""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, content=STREAM_EVENTS, headers={"content-type": "text/event-stream"})
+
+    processor = AIProcessor()
+    monkeypatch.setattr(processor, "client", sdk_client(handler))
+    messages = [{"role": "system", "content": "regras"}, *MESSAGES]
+    deadline = Deadline(datetime.utcnow() + timedelta(seconds=60))
+
+    assert asyncio.run(processor._call_claude_api(messages, deadline=deadline)) == "Olá, mundo"
+    body = json.loads(requests[0].content)
+    assert requests[0].url.path == "/v1/messages"
+    assert body["stream"] is True
+    assert body["system"] == "regras"
+    assert body["messages"] == MESSAGES
+
+
+def test_cancel_during_ai_call_releases_slot_and_cancels_job(database, monkeypatch):
+    """Cancelar o job durante o stream libera o slot de IA e deixa o job CANCELLED"""
+    from .test_job_status import create_job
+
+    monkeypatch.setattr(job_registry, "_ai_slots", None)
+    started = []
+
+    async def hanging(request):
+        started.append(request)
+        await asyncio.sleep(30)
+
+    monkeypatch.setattr(job_pipeline.ai_processor, "client", sdk_client(hanging))
+    job_id = create_job()
+
+    async def scenario():
+        task = job_registry.submit(job_id, job_pipeline.process_text_background(job_id, "u1"))
+        deadline = asyncio.get_running_loop().time() + 5
+        while not started:
+            assert asyncio.get_running_loop().time() < deadline
+            await asyncio.sleep(0.01)
+        assert job_registry.ai_slots._value == job_registry._max_ai_calls - 1
+
+        assert job_registry.cancel(job_id)
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(task, timeout=5)
+        return job_registry.ai_slots._value
+
+    assert asyncio.run(scenario()) == job_registry._max_ai_calls
+    assert len(started) == 1
+    db = SessionLocal()
+    assert db.query(TextProcessingJob).filter_by(job_id=job_id).one().status == ProcessingStatus.CANCELLED
+    db.close()
@@ -42,6 +42,18 @@ def test_categories_endpoint():
         assert "icon" in category
 
 
+def test_metrics_endpoint():
+    """Testa a exposição de métricas Prometheus"""
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert "obsidian_ai_http_request_duration_seconds" in body
+    assert 'route="/health"' in body
+    assert "obsidian_ai_jobs" in body
+
+
 def test_process_text_endpoint():
     """Testa o endpoint de processamento de texto"""
     test_data = {
@@ -0,0 +1,124 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.text_processing import TextProcessingJob
+from app.services import bulk_import as bulk_import_module
+from app.services import job_recovery as job_recovery_module
+from app.services.bulk_import import BulkImport, bulk_imports
+from app.services.job_recovery import JobRecoveryService
+from app.services.job_registry import job_registry
+
+
+class FakePipeline:
+    """Substitui o pipeline: registra os jobs executados e o pico de concorrência"""
+
+    def __init__(self):
+        self.processed = []
+        self.running = 0
+        self.peak = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, job_id, user_id):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await self.release.wait()
+            self.processed.append(job_id)
+        finally:
+            self.running -= 1
+
+
+async def read_text(self, item):
+    """Extração direta dos .txt (a extração de PDF/DOCX não é o objeto destes testes)"""
+    relative_path, _, opener = item
+    with opener() as local_path:
+        with open(local_path, encoding="utf-8") as text_file:
+            return text_file.read(), None
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch, database):
+    """Pasta com 5 arquivos e manifestos no diretório temporário"""
+    monkeypatch.setattr(BulkImport, "_extract", read_text)
+    folder = tmp_path / "fonte"
+    folder.mkdir()
+    for index in range(5):
+        (folder / f"nota-{index}.txt").write_text(f"Conteúdo da nota {index}", encoding="utf-8")
+    monkeypatch.setattr(settings, "IMPORT_MANIFEST_DIR", str(tmp_path / "manifests"))
+    monkeypatch.setattr(settings, "IMPORT_MAX_IN_FLIGHT", 2)
+    return folder
+
+
+async def _wait_until(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_import_respects_max_in_flight(source, monkeypatch):
+    """No máximo IMPORT_MAX_IN_FLIGHT jobs da importação ficam no pipeline ao mesmo tempo"""
+    pipeline = FakePipeline()
+    monkeypatch.setattr(bulk_import_module, "process_text_background", pipeline)
+
+    async def scenario():
+        importer = BulkImport(str(source), "u1", batch_size=10)
+        run = asyncio.create_task(importer.run())
+        await _wait_until(lambda: pipeline.running == 2)
+        await asyncio.sleep(0.05)
+        assert pipeline.running == 2
+        pipeline.release.set()
+        return await run
+
+    progress = asyncio.run(scenario())
+    assert progress["status"] == "completed"
+    assert progress["queued"] == 5
+    assert len(pipeline.processed) == 5
+    assert pipeline.peak == 2
+
+
+def test_interrupted_import_resumes_through_its_own_limit(source, monkeypatch):
+    """Jobs liberados por uma importação interrompida voltam pela importação, não pela recuperação genérica"""
+    pipeline = FakePipeline()
+    monkeypatch.setattr(bulk_import_module, "process_text_background", pipeline)
+    monkeypatch.setattr(settings, "IMPORT_MAX_IN_FLIGHT", 1)
+    monkeypatch.setattr(bulk_imports, "_imports", {})
+    monkeypatch.setattr(bulk_imports, "_tasks", {})
+    direct = []
+    monkeypatch.setattr(job_recovery_module, "resume_job", lambda *args: direct.append(args))
+
+    async def scenario():
+        importer = BulkImport(str(source), "u1", batch_size=10)
+        run = asyncio.create_task(importer.run())
+        await _wait_until(lambda: pipeline.running == 1)
+
+        # Interrupção (drenagem): a importação libera os jobs não enviados e o
+        # job em andamento volta à fila com o lease liberado
+        run.cancel()
+        await asyncio.gather(run, return_exceptions=True)
+        assert importer.status == "interrupted"
+        interrupted = job_registry.active_tasks()
+        job_registry.interrupt_all()
+        await asyncio.gather(*interrupted, return_exceptions=True)
+        db = SessionLocal()
+        db.query(TextProcessingJob).update({TextProcessingJob.heartbeat_at: datetime(1970, 1, 1)})
+        db.commit()
+        db.close()
+
+        assert JobRecoveryService().recover_orphaned_jobs() == []
+        resumed = bulk_imports._tasks[importer.import_id]
+        await _wait_until(lambda: pipeline.running == 1)
+        pipeline.release.set()
+        return await resumed
+
+    progress = asyncio.run(scenario())
+    assert direct == []
+    assert progress["status"] == "completed"
+    assert progress["resumed"] == 5
+    importer = BulkImport(str(source), "u1")
+    assert sorted(pipeline.processed) == sorted(importer.job_id_for(f"nota-{i}.txt") for i in range(5))
+    assert pipeline.peak == 1
@@ -0,0 +1,31 @@
+from app.core.database import SessionLocal
+from app.models.text_processing import TextProcessingJob
+from app.services.drain import drain_controller
+
+from .test_job_status import create_job
+
+
+def test_draining_rejects_new_work_with_retry_after(api, auth, monkeypatch):
+    """Em drenagem, submissões e reprocessamentos recebem 503 com Retry-After e o /health informa"""
+    job_id = create_job()
+    monkeypatch.setattr(drain_controller, "draining", True)
+    headers = auth("u1")
+
+    submitted = api.post("/api/processing/text", json={"text": "uma nota"}, headers=headers)
+    assert submitted.status_code == 503
+    assert submitted.headers["Retry-After"] == "5"
+
+    retried = api.post(f"/api/processing/jobs/{job_id}/retry", headers=headers)
+    assert retried.status_code == 503
+    assert retried.headers["Retry-After"] == "5"
+
+    health = api.get("/health")
+    assert health.status_code == 503
+    assert health.json() == {"status": "draining"}
+
+    db = SessionLocal()
+    assert db.query(TextProcessingJob).count() == 1
+    db.close()
+
+    # Leituras continuam atendidas durante a drenagem
+    assert api.get(f"/api/processing/status/{job_id}", headers=headers).status_code == 200
@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import pytest
+import yaml
+
+from app.utils.frontmatter import dump_frontmatter
+
+GOLDEN_DIR = Path(__file__).parent / "golden"
+
+# Frontmatter de uma nota gerada: campos fixos, metadados da IA e processamento
+NOTE = {
+    "title": "Reunião de planejamento: próximos passos do projeto",
+    "created": "2026-10-19T10:47:20.915289",
+    "tags": ["reunião", "planejamento", "q4", "2026"],
+    "category": "meetings",
+    "processed_by": "ObsidianAI Sync",
+    "user_id": None,
+    "job_id": "job_20261019104720_0123456789abcdef",
+    "summary": (
+        "Discussão sobre as metas do trimestre, os responsáveis por cada entrega, os riscos "
+        "identificados pela equipe de produto e o que ficou pendente para a próxima reunião."
+    ),
+    "language": "pt",
+    "sentiment": "neutral",
+    "confidence": 0.92,
+    "word_count": 1250,
+    "has_action_items": True,
+    "key_points": ["Definir metas do Q4", "Revisar orçamento: marketing", "It's #1", "📥 Inbox zero"],
+    "processing": {
+        "ai_model_used": "claude-sonnet-4-20250514",
+        "processing_time_seconds": 2.5,
+        "stage_timings": {"ai": 2.1, "extract": 0.0},
+    },
+    "aliases": [],
+    "extra": {},
+}
+
+# Entradas fora do caminho rápido (texto com quebras de linha, tabulação e lista de mapeamentos)
+NOTE_WITH_FALLBACK = {
+    "title": "Notas\tsoltas",
+    "summary": "Primeira linha\nSegunda linha",
+    "attendees": [{"name": "Ana", "role": "PM"}, {"name": "Rui", "role": "Dev"}],
+    "category": "inbox",
+}
+
+
+@pytest.mark.parametrize("name, data", [
+    ("note", NOTE),
+    ("note_with_fallback", NOTE_WITH_FALLBACK),
+])
+def test_frontmatter_matches_golden_file(name, data):
+    expected = (GOLDEN_DIR / f"frontmatter_{name}.yaml").read_bytes()
+    assert dump_frontmatter(data).encode("utf-8") == expected
+    assert yaml.safe_load(expected) == data
+
+
+def test_frontmatter_matches_yaml_dump():
+    """O caminho rápido produz exatamente o texto de yaml.dump"""
+    assert dump_frontmatter(NOTE) == yaml.dump(NOTE, default_flow_style=False, allow_unicode=True)
+
+
+@pytest.mark.parametrize("value", [
+    "", "yes", "No", "null", "~", "1.5", "1e3", "0x1A", "2026-10-19", "12:30:00",
+    "- item", "-item", "#tag", "a #b", "a: b", "fim:", "...", "---x", "'aspas'", '"duplas"',
+    "it's", "<<", "=", "@user", "%", "`code`", "a" * 200, "palavra " * 30 + "fim",
+    "x" * 90 + " y", "it's " * 25 + "end",
+])
+def test_frontmatter_scalar_quoting(value):
+    data = {"title": value, "tags": [value], "nested": {"value": value}}
+    assert dump_frontmatter(data) == yaml.dump(data, default_flow_style=False, allow_unicode=True)
@@ -0,0 +1,214 @@
+import asyncio
+import subprocess
+
+import pytest
+
+from app.services.git_sync import GitSyncRegistry, GitSyncTransport, repo_lock
+
+
+def git(cwd, *args):
+    return subprocess.run(
+        ["git", "-C", str(cwd), *args], capture_output=True, text=True, check=True
+    ).stdout
+
+
+@pytest.fixture
+def vault(tmp_path):
+    """Vault clonado de um repositório bare local (o remoto do push)"""
+    remote = tmp_path / "remote.git"
+    git(tmp_path, "init", "--quiet", "--bare", str(remote))
+    git(tmp_path, "clone", "--quiet", str(remote), str(tmp_path / "vault"))
+    vault = tmp_path / "vault"
+    (vault / "📥 Inbox").mkdir()
+    return vault
+
+
+def write_notes(vault, count, prefix="nota"):
+    paths = []
+    for i in range(count):
+        path = vault / "📥 Inbox" / f"{prefix} {i}.md"
+        path.write_text(f"# {prefix} {i}\n", encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def commits(repo):
+    return git(repo, "log", "--format=%s", "--all").splitlines()
+
+
+async def _sync(transport, paths, wait_seconds=0.0):
+    for path in paths:
+        transport.add(path)
+    await asyncio.sleep(wait_seconds)
+    await transport.stop()
+
+
+def test_notes_are_committed_in_batches_and_pushed(vault):
+    """Lotes por tamanho; o restante sai no stop, com um único push para o remoto"""
+    transport = GitSyncTransport(str(vault.resolve()), batch_size=10, batch_seconds=60, push_interval_seconds=60)
+    asyncio.run(_sync(transport, write_notes(vault, 25), wait_seconds=0.5))
+
+    assert commits(vault) == [
+        "ObsidianAI: 5 notas sincronizadas",
+        "ObsidianAI: 10 notas sincronizadas",
+        "ObsidianAI: 10 notas sincronizadas",
+    ]
+    assert commits(vault.parent / "remote.git") == commits(vault)
+    assert git(vault, "status", "--porcelain") == ""
+    assert "📥 Inbox/nota 0.md" in git(vault, "-c", "core.quotePath=false", "ls-files")
+
+
+def test_batch_window_commits_partial_batch(vault):
+    """Menos notas que o lote: commit após batch_seconds, sem esperar o stop"""
+    transport = GitSyncTransport(str(vault.resolve()), batch_size=100, batch_seconds=0.1, push_interval_seconds=60)
+
+    async def scenario():
+        for path in write_notes(vault, 3):
+            transport.add(path)
+        await asyncio.sleep(1.0)
+        committed = commits(vault)
+        await transport.stop()
+        return committed
+
+    assert asyncio.run(scenario()) == ["ObsidianAI: 3 notas sincronizadas"]
+
+
+def test_user_staged_changes_are_not_committed(vault):
+    """Só as notas do lote entram no commit; notas sem alteração não geram commit vazio"""
+    (vault / "pessoal.md").write_text("rascunho", encoding="utf-8")
+    git(vault, "add", "pessoal.md")
+    transport = GitSyncTransport(str(vault.resolve()), batch_size=100, batch_seconds=60, remote="")
+    notes = write_notes(vault, 2)
+    asyncio.run(_sync(transport, notes))
+    asyncio.run(_sync(transport, notes))
+
+    assert commits(vault) == ["ObsidianAI: 2 notas sincronizadas"]
+    assert git(vault, "status", "--porcelain").splitlines() == ["A  pessoal.md"]
+
+
+def test_registry_shares_transport_and_lock_per_repo(vault):
+    (vault / "subpasta").mkdir()
+    registry = GitSyncRegistry()
+
+    async def scenario():
+        return await registry.get(str(vault)), await registry.get(str(vault / "subpasta"))
+
+    first, second = asyncio.run(scenario())
+    assert first is second
+    assert first.lock is repo_lock(str(vault.resolve()))
+
+
+def other_clone(vault, name="outro"):
+    """Segundo clone do remoto (outro dispositivo sincronizando o mesmo vault)"""
+    clone = vault.parent / name
+    git(vault.parent, "clone", "--quiet", str(vault.parent / "remote.git"), str(clone))
+    return clone
+
+
+def commit_all(repo, message):
+    git(repo, "add", "-A")
+    git(repo, "-c", "user.name=Outro", "-c", "user.email=outro@example.com", "commit", "--quiet", "-m", message)
+
+
+def test_uncommitted_notes_are_recovered_on_first_use(vault):
+    """Notas gravadas antes de um encerramento (lote em memória perdido) entram no primeiro lote"""
+    git(vault, "-c", "user.name=T", "-c", "user.email=t@example.com",
+        "commit", "--quiet", "--allow-empty", "-m", "inicial")
+    existing = vault / "📥 Inbox" / "existente.md"
+    existing.write_text("v1", encoding="utf-8")
+    commit_all(vault, "nota existente")
+    existing.write_text("v2", encoding="utf-8")
+    write_notes(vault, 2, prefix="perdida")
+    (vault / "anexo.png").write_bytes(b"png")
+    (vault / "pessoal.md").write_text("rascunho", encoding="utf-8")
+    git(vault, "add", "pessoal.md")
+
+    registry = GitSyncRegistry()
+
+    async def scenario():
+        transport = await registry.get(str(vault))
+        pending = set(transport._pending)
+        await registry.stop()
+        return pending
+
+    assert asyncio.run(scenario()) == {
+        "📥 Inbox/existente.md", "📥 Inbox/perdida 0.md", "📥 Inbox/perdida 1.md"
+    }
+    assert commits(vault)[0] == "ObsidianAI: 3 notas sincronizadas"
+    assert git(vault, "status", "--porcelain").splitlines() == ["A  pessoal.md", "?? anexo.png"]
+
+
+def test_push_rebases_onto_commits_from_other_devices(vault):
+    """Commits novos no remoto não impedem o push: os do serviço são reaplicados por cima"""
+    transport = GitSyncTransport(str(vault.resolve()), batch_size=100, batch_seconds=60, push_interval_seconds=60)
+    asyncio.run(_sync(transport, write_notes(vault, 1)))
+
+    clone = other_clone(vault)
+    (clone / "celular.md").write_text("do celular", encoding="utf-8")
+    commit_all(clone, "nota do celular")
+    git(clone, "push", "--quiet", "origin", "HEAD")
+
+    asyncio.run(_sync(transport, write_notes(vault, 2, prefix="nova")))
+
+    assert transport.last_push_error is None
+    assert commits(vault.parent / "remote.git")[:3] == [
+        "ObsidianAI: 2 notas sincronizadas",
+        "nota do celular",
+        "ObsidianAI: 1 notas sincronizadas",
+    ]
+    assert (vault / "celular.md").read_text(encoding="utf-8") == "do celular"
+
+
+def test_conflicting_push_is_reported_and_repository_left_clean(vault):
+    """Conflito no rebase: o repositório volta ao estado anterior e a falha aparece no registro"""
+    registry = GitSyncRegistry()
+    note = write_notes(vault, 1)[0]
+
+    async def first_sync():
+        transport = await registry.get(str(vault))
+        transport.add(note)
+        await transport.stop()
+        return transport
+
+    transport = asyncio.run(first_sync())
+
+    clone = other_clone(vault)
+    (clone / "📥 Inbox" / "nota 0.md").write_text("editada no celular\n", encoding="utf-8")
+    commit_all(clone, "edição do celular")
+    git(clone, "push", "--quiet", "origin", "HEAD")
+
+    note.write_text("editada pelo serviço\n", encoding="utf-8")
+    head = git(vault, "rev-parse", "HEAD")
+    asyncio.run(_sync(transport, [note]))
+
+    assert "rebase" in transport.last_push_error
+    assert registry.failing() == {str(vault.resolve()): transport.last_push_error}
+    assert git(vault, "rev-parse", "HEAD") != head
+    assert not (vault / ".git" / "rebase-merge").exists()
+    assert not (vault / ".git" / "rebase-apply").exists()
+    assert git(vault, "status", "--porcelain") == ""
+
+
+def test_autostash_conflict_restores_uncommitted_changes(vault):
+    """Rebase concluído com conflito ao reaplicar o autostash: falha reportada e alterações locais preservadas"""
+    transport = GitSyncTransport(str(vault.resolve()), batch_size=100, batch_seconds=60, push_interval_seconds=60)
+    draft = write_notes(vault, 2)[1]
+    asyncio.run(_sync(transport, [vault / "📥 Inbox" / "nota 0.md", draft]))
+
+    clone = other_clone(vault)
+    (clone / "📥 Inbox" / "nota 1.md").write_text("editada no celular\n", encoding="utf-8")
+    commit_all(clone, "edição do celular")
+    git(clone, "push", "--quiet", "origin", "HEAD")
+
+    # Nota regravada e ainda fora de um lote, enquanto outra nota é enviada
+    draft.write_text("regravada pelo serviço\n", encoding="utf-8")
+    head = git(vault, "rev-parse", "HEAD")
+    asyncio.run(_sync(transport, write_notes(vault, 1, prefix="nova")))
+
+    assert "após o rebase" in transport.last_push_error
+    assert git(vault, "rev-parse", "HEAD") != head
+    assert git(vault, "log", "-1", "--format=%s") == "ObsidianAI: 1 notas sincronizadas\n"
+    assert git(vault, "stash", "list") == ""
+    assert draft.read_text(encoding="utf-8") == "regravada pelo serviço\n"
+    assert git(vault, "-c", "core.quotePath=false", "diff", "--name-only") == "📥 Inbox/nota 1.md\n"
+    assert git(vault, "diff", "--name-only", "--diff-filter=U") == ""
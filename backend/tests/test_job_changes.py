@@ -0,0 +1,47 @@
+from app.core.database import SessionLocal
+from app.models.change_sequence import ChangeSequence
+from app.models.text_processing import TextProcessingJob
+
+from .test_job_status import create_job, update_job
+
+
+def changes(api, headers, since, limit=100):
+    response = api.get("/api/processing/changes", params={"since": since, "limit": limit}, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_changes_feed_cursor_follows_write_order(api, auth):
+    """Cada escrita move o job para o fim do feed; o cursor pagina sem repetir nem perder alterações"""
+    first, second, third = create_job(), create_job(), create_job()
+    create_job(user_id="u2")
+    update_job(first, lambda job: job.mark_processing_started())
+    headers = auth("u1")
+
+    page = changes(api, headers, since=0, limit=2)
+    assert [job["job_id"] for job in page["changes"]] == [second, third]
+    assert page["has_more"] is True
+
+    page = changes(api, headers, since=page["next_since"], limit=2)
+    assert [(job["job_id"], job["status"]) for job in page["changes"]] == [(first, "processing")]
+    assert page["has_more"] is False
+    cursor = page["next_since"]
+
+    # Sem alterações novas: lista vazia e o mesmo cursor
+    assert changes(api, headers, since=cursor) == {"changes": [], "next_since": cursor, "has_more": False}
+
+    update_job(third, lambda job: job.mark_cancelled())
+    page = changes(api, headers, since=cursor)
+    assert [(job["job_id"], job["status"]) for job in page["changes"]] == [(third, "cancelled")]
+    assert page["next_since"] > cursor
+
+
+def test_change_sequence_is_strictly_increasing(database):
+    job_ids = [create_job() for _ in range(5)]
+    db = SessionLocal()
+    try:
+        seqs = [db.query(TextProcessingJob).filter_by(job_id=job_id).one().change_seq for job_id in job_ids]
+        assert seqs == sorted(seqs) and len(set(seqs)) == len(seqs)
+        assert db.get(ChangeSequence, "jobs").value == seqs[-1]
+    finally:
+        db.close()
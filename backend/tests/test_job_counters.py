@@ -0,0 +1,53 @@
+from app.core.database import SessionLocal
+from app.models.job_counter import JobCounter
+from app.services.job_counters import JobCounterReconciler
+
+from .test_job_status import create_job, update_job
+
+
+def counters(user_id="u1"):
+    db = SessionLocal()
+    try:
+        return {
+            (row.category, row.status): row.count
+            for row in db.query(JobCounter).filter_by(user_id=user_id) if row.count
+        }
+    finally:
+        db.close()
+
+
+def test_counters_follow_status_transitions(database):
+    """Cada transição move uma unidade do status antigo para o novo, na mesma transação"""
+    first = create_job()
+    create_job(category="ideas")
+    assert counters() == {("inbox", "queued"): 1, ("ideas", "queued"): 1}
+
+    update_job(first, lambda job: job.mark_processing_started())
+    assert counters() == {("inbox", "processing"): 1, ("ideas", "queued"): 1}
+
+    # Escrita sem mudança de status não altera os contadores
+    update_job(first, lambda job: setattr(job, "word_count", 3))
+    assert counters() == {("inbox", "processing"): 1, ("ideas", "queued"): 1}
+
+
+def test_reconcile_corrects_drift_without_touching_consistent_counters(database, api, auth):
+    """A reconciliação aplica só a diferença e o /stats passa a refletir a contagem real"""
+    job_id = create_job()
+    create_job()
+    update_job(job_id, lambda job: job.mark_processing_started())
+
+    db = SessionLocal()
+    db.query(JobCounter).filter_by(user_id="u1", status="queued").update({"count": 5})
+    db.add(JobCounter(user_id="u1", category="inbox", status="synced", count=2))
+    db.commit()
+    db.close()
+
+    reconciler = JobCounterReconciler(interval_seconds=60)
+    assert reconciler.reconcile() == 6
+    assert counters() == {("inbox", "queued"): 1, ("inbox", "processing"): 1}
+    assert reconciler.reconcile() == 0
+
+    stats = api.get("/api/processing/stats", headers=auth("u1")).json()
+    assert stats["total"] == 2
+    assert stats["by_status"]["queued"] == stats["by_status"]["processing"] == 1
+    assert stats["by_category"] == {"inbox": 2}
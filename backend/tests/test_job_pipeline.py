@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from app.core.database import SessionLocal
+from app.models.text_processing import ProcessingStatus, TextProcessingJob
+from app.services import job_pipeline
+from app.utils.timing import StageTimer
+
+from .test_job_status import create_job, update_job
+
+
+class FakeAIProcessor:
+    """Substitui o AIProcessor do pipeline e registra as chamadas"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def process_text(self, text, category="inbox", user_preferences=None, deadline=None):
+        self.calls.append(text)
+        return {
+            "content": "# Nota gerada",
+            "title": "Nota",
+            "tags": [],
+            "category": category,
+            "processing_metadata": {
+                "ai_model_used": "modelo-teste",
+                "stage_timings": {"provider_latency": 1.234567, "parse": 0.01}
+            }
+        }
+
+
+@pytest.fixture
+def ai_processor(database, monkeypatch):
+    fake = FakeAIProcessor()
+    monkeypatch.setattr(job_pipeline, "ai_processor", fake)
+    return fake
+
+
+def load(job_id):
+    db = SessionLocal()
+    try:
+        return db.query(TextProcessingJob).filter_by(job_id=job_id).one()
+    finally:
+        db.close()
+
+
+def test_new_job_calls_the_ai(ai_processor):
+    job_id = create_job()
+    asyncio.run(job_pipeline.process_text_background(job_id, "u1"))
+
+    assert ai_processor.calls == ["texto"]
+    job = load(job_id)
+    assert job.status == ProcessingStatus.PROCESSED
+    assert job.get_checkpoint("ai") == {"title": "Nota", "tags": [], "category": "inbox"}
+
+
+def test_retry_with_ai_checkpoint_skips_the_ai_call(ai_processor):
+    """Nova tentativa de um job que falhou depois da IA reaproveita a saída já paga"""
+    job_id = create_job()
+
+    def failed_after_ai(job):
+        job.mark_processing_started()
+        job.mark_processing_completed("# Nota anterior", "{}", {})
+        job.save_checkpoint("ai", {"title": "Nota anterior", "tags": [], "category": "inbox"})
+        job.mark_failed("vault indisponível", "transient")
+
+    update_job(job_id, failed_after_ai)
+    asyncio.run(job_pipeline.process_text_background(job_id, "u1"))
+
+    assert ai_processor.calls == []
+    job = load(job_id)
+    assert job.status == ProcessingStatus.PROCESSED
+    assert job.processed_markdown == "# Nota anterior"
+
+
+def test_stage_timer_accumulates_repeated_stages():
+    timer = StageTimer()
+    with timer.stage("write"):
+        pass
+    timer.record("write", 0.5)
+    timer.record("queue_wait", 2.0)
+    assert timer.timings["write"] >= 0.5
+    assert timer.timings["queue_wait"] == 2.0
+
+
+def test_stage_timings_are_persisted_and_served_with_the_status(ai_processor, api, auth):
+    """Tempos do pipeline e da IA ficam no job (arredondados) e aparecem no endpoint de status"""
+    job_id = create_job()
+    asyncio.run(job_pipeline.process_text_background(job_id, "u1"))
+
+    timings = load(job_id).get_stage_timings()
+    assert {"queue_wait", "config_load", "db_commit", "provider_latency", "parse"} <= set(timings)
+    assert timings["provider_latency"] == 1.2346
+    assert load(job_id).ai_model_used == "modelo-teste"
+
+    status = api.get(f"/api/processing/status/{job_id}", headers=auth("u1")).json()
+    assert status["stage_timings"] == timings
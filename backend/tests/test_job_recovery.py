@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.database import SessionLocal
+from app.models.text_processing import TextProcessingJob
+from app.services import job_recovery as job_recovery_module
+from app.services.job_recovery import JobRecoveryService
+from app.services.job_registry import JobTaskRegistry
+
+from .test_job_status import create_job, update_job
+
+
+@pytest.fixture
+def resumed(database, monkeypatch):
+    """Jobs retomados pela recuperação (o pipeline não é executado)"""
+    calls = []
+    monkeypatch.setattr(job_recovery_module, "resume_job", lambda *args: calls.append(args))
+    return calls
+
+
+def start_processing(job_id, heartbeat_at):
+    def change(job):
+        job.mark_processing_started()
+        job.heartbeat_at = heartbeat_at
+    update_job(job_id, change)
+
+
+def test_expired_lease_is_claimed_once_by_competing_recoverers(resumed, monkeypatch):
+    """Dois workers varrem ao mesmo tempo: só um assume o job órfão"""
+    job_id = create_job()
+    start_processing(job_id, datetime.utcnow() - timedelta(hours=1))
+    first, second = JobRecoveryService(JobTaskRegistry()), JobRecoveryService(JobTaskRegistry())
+    claimed_by_second = []
+    claim = first._claim
+
+    def racing_claim(db, job, stage):
+        # O outro worker assume o job entre a varredura e o claim deste
+        claimed_by_second.extend(second.recover_orphaned_jobs())
+        return claim(db, job, stage)
+
+    monkeypatch.setattr(first, "_claim", racing_claim)
+
+    assert first.recover_orphaned_jobs() == []
+    assert claimed_by_second == [job_id]
+    assert [args[0] for args in resumed] == [job_id]
+
+    db = SessionLocal()
+    job = db.query(TextProcessingJob).filter_by(job_id=job_id).one()
+    assert job.heartbeat_at > datetime.utcnow() - timedelta(minutes=1)
+    db.close()
+
+
+def test_live_lease_is_left_alone(resumed):
+    """Job com heartbeat recente (outro worker ativo) não é retomado"""
+    live = create_job()
+    start_processing(live, datetime.utcnow())
+    expired = create_job()
+    start_processing(expired, datetime.utcnow() - timedelta(hours=1))
+
+    recovery = JobRecoveryService(JobTaskRegistry())
+    assert recovery.recover_orphaned_jobs() == [expired]
+    assert recovery.recover_orphaned_jobs() == []
+    assert [args[0] for args in resumed] == [expired]
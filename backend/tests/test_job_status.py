@@ -0,0 +1,98 @@
+from app.core.database import SessionLocal
+from app.core.status_cache import status_cache
+from app.models.text_processing import TextProcessingJob
+
+
+def create_job(user_id="u1", category="inbox"):
+    db = SessionLocal()
+    job = TextProcessingJob(user_id=user_id, original_text="texto", category=category)
+    db.add(job)
+    db.commit()
+    job_id = job.job_id
+    db.close()
+    return job_id
+
+
+def update_job(job_id, change):
+    db = SessionLocal()
+    job = db.query(TextProcessingJob).filter_by(job_id=job_id).one()
+    change(job)
+    db.commit()
+    db.close()
+
+
+def test_status_etag_and_not_modified(api, auth):
+    """Mesmo ETag enquanto o job não muda (304); nova versão após cada escrita"""
+    job_id = create_job()
+    headers = auth("u1")
+
+    first = api.get(f"/api/processing/status/{job_id}", headers=headers)
+    assert first.status_code == 200
+    assert first.json()["status"] == "queued"
+    etag = first.headers["ETag"]
+
+    cached = api.get(f"/api/processing/status/{job_id}", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+
+    update_job(job_id, lambda job: job.mark_processing_started())
+
+    changed = api.get(f"/api/processing/status/{job_id}", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["status"] == "processing"
+    assert changed.headers["ETag"] != etag
+
+
+def test_status_is_served_from_cache_after_commit(api, auth):
+    """O snapshot é publicado no cache no commit e só é servido ao dono do job"""
+    job_id = create_job()
+    assert status_cache.get(job_id)["status"] == "queued"
+
+    update_job(job_id, lambda job: job.mark_processing_started())
+    assert status_cache.get(job_id)["status"] == "processing"
+
+    assert api.get(f"/api/processing/status/{job_id}", headers=auth("u2")).status_code == 404
+
+
+def test_batch_status_returns_only_changed_jobs(api, auth):
+    """Status em lote: só jobs com versão nova; desconhecidos e de outros usuários em not_found"""
+    first, second = create_job(), create_job()
+    other_user = create_job(user_id="u2")
+    headers = auth("u1")
+    job_ids = [first, second, other_user, "job-inexistente"]
+
+    response = api.post("/api/processing/status:batch", json={"job_ids": job_ids}, headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert [job["job_id"] for job in data["jobs"]] == [first, second]
+    assert all("user_id" not in job for job in data["jobs"])
+    assert data["not_found"] == [other_user, "job-inexistente"]
+    versions = {job["job_id"]: job["version"] for job in data["jobs"]}
+
+    update_job(second, lambda job: job.mark_processing_started())
+
+    response = api.post(
+        "/api/processing/status:batch",
+        json={"job_ids": job_ids, "versions": versions},
+        headers=headers
+    )
+    data = response.json()
+    assert [(job["job_id"], job["status"]) for job in data["jobs"]] == [(second, "processing")]
+    assert data["unchanged"] == 1
+
+
+def test_batch_status_reads_missing_snapshots_from_database(api, auth):
+    """Jobs fora do cache são carregados do banco e voltam ao cache"""
+    job_id = create_job()
+    status_cache.invalidate(job_id)
+
+    response = api.post("/api/processing/status:batch", json={"job_ids": [job_id]}, headers=auth("u1"))
+    assert [job["job_id"] for job in response.json()["jobs"]] == [job_id]
+    assert status_cache.get(job_id)["job_id"] == job_id
+
+
+def test_batch_status_validates_request(api, auth):
+    assert api.post("/api/processing/status:batch", json={"job_ids": []}, headers=auth("u1")).status_code == 422
+    too_many = {"job_ids": [f"job-{i}" for i in range(501)]}
+    assert api.post("/api/processing/status:batch", json=too_many, headers=auth("u1")).status_code == 422
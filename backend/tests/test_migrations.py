@@ -0,0 +1,103 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import Session
+
+from app.core.database import Base, _alembic_config, upgrade_schema
+from app.models import ChangeSequence, ProcessingStatus, TextProcessingJob
+from app.models.job_counter import JobCounter
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_migrations_match_models(engine):
+    """O schema criado pelas migrações é o dos modelos (nada pendente para autogenerate)"""
+    upgrade_schema(engine)
+    with engine.connect() as connection:
+        diff = compare_metadata(MigrationContext.configure(connection), Base.metadata)
+    assert diff == []
+
+
+def test_database_created_before_migrations_is_upgraded(engine, tmp_path):
+    """Banco com o schema original (create_all, sem alembic_version) recebe as colunas novas"""
+    with engine.connect() as connection:
+        command.upgrade(_alembic_config(connection), "0001")
+        connection.commit()
+    raw = sqlite3.connect(tmp_path / "jobs.db")
+    raw.execute("DROP TABLE alembic_version")
+    raw.execute(
+        "INSERT INTO text_processing_jobs (user_id, job_id, original_text, category, status, "
+        "processing_time_seconds, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        ("u1", "job-antigo", "texto", "inbox", "SYNCED", 3, "2025-01-01 10:00:00", "2025-01-01 10:05:00")
+    )
+    raw.commit()
+    raw.close()
+
+    upgrade_schema(engine)
+
+    columns = {column["name"] for column in inspect(engine).get_columns("text_processing_jobs")}
+    assert {"stage_timings", "checkpoints", "status_version", "change_seq", "deadline_at",
+            "note_content_hash", "note_edited_at"} <= columns
+
+    with Session(engine) as db:
+        old = db.query(TextProcessingJob).filter_by(job_id="job-antigo").one()
+        assert old.status == ProcessingStatus.SYNCED
+        assert old.status_version == 0
+        assert old.change_seq == old.id
+        assert old.heartbeat_at == datetime(2025, 1, 1, 10, 5)
+
+        new = TextProcessingJob(user_id="u1", original_text="novo", category="inbox")
+        db.add(new)
+        db.commit()
+        # A sequência do feed continua depois dos jobs existentes
+        assert new.change_seq > old.change_seq
+        assert db.get(ChangeSequence, "jobs").value == new.change_seq
+
+
+def test_job_counters_are_backfilled_from_existing_jobs(engine, tmp_path):
+    """A migração dos contadores parte da contagem real dos jobs, com o status pelo valor do Enum"""
+    with engine.connect() as connection:
+        command.upgrade(_alembic_config(connection), "0008")
+        connection.commit()
+    raw = sqlite3.connect(tmp_path / "jobs.db")
+    jobs = [
+        ("u1", "inbox", "QUEUED"), ("u1", "inbox", "QUEUED"), ("u1", "inbox", "SYNCED"),
+        ("u1", "ideas", "DEAD_LETTER"), ("u2", "inbox", "QUEUED"),
+    ]
+    for index, (user_id, category, status) in enumerate(jobs):
+        raw.execute(
+            "INSERT INTO text_processing_jobs (user_id, job_id, original_text, category, status, "
+            "created_at, updated_at) VALUES (?, ?, 'texto', ?, ?, '2025-01-01', '2025-01-01')",
+            (user_id, f"job-{index}", category, status)
+        )
+    raw.commit()
+    raw.close()
+
+    upgrade_schema(engine)
+
+    with Session(engine) as db:
+        counters = {(row.user_id, row.category, row.status): row.count for row in db.query(JobCounter)}
+    assert counters == {
+        ("u1", "inbox", "queued"): 2,
+        ("u1", "inbox", "synced"): 1,
+        ("u1", "ideas", "dead_letter"): 1,
+        ("u2", "inbox", "queued"): 1,
+    }
+
+
+def test_database_created_by_current_models_is_stamped(engine):
+    """Banco sem versão já com o schema atual (create_all) não é migrado de novo"""
+    Base.metadata.create_all(engine)
+    upgrade_schema(engine)
+    with engine.connect() as connection:
+        assert MigrationContext.configure(connection).get_current_revision() == "0012"
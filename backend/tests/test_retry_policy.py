@@ -0,0 +1,115 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from anthropic import APIConnectionError
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.text_processing import ProcessingStatus, TextProcessingJob
+from app.services import retry_policy
+from app.services import retry_scheduler as retry_scheduler_module
+from app.services.ai_processor import AIResponseParseError
+from app.services.retry_policy import (
+    ERROR_PARSE,
+    ERROR_PERMANENT,
+    ERROR_TRANSIENT,
+    classify_error,
+    compute_backoff,
+    record_failure,
+)
+from app.services.retry_scheduler import RetryScheduler
+from app.utils.deadline import DeadlineExceeded
+
+from .test_job_status import create_job, update_job
+
+
+@pytest.mark.parametrize("error, kind", [
+    (AIResponseParseError("json inválido"), ERROR_PARSE),
+    (APIConnectionError(request=httpx.Request("POST", "https://api.anthropic.com")), ERROR_TRANSIENT),
+    (DeadlineExceeded("ai", 0), ERROR_TRANSIENT),
+    (asyncio.TimeoutError(), ERROR_TRANSIENT),
+    (ConnectionResetError(), ERROR_TRANSIENT),
+    (OSError("Stale file handle"), ERROR_TRANSIENT),
+    (RuntimeError("503 Service Unavailable"), ERROR_TRANSIENT),
+    (FileNotFoundError("nota.pdf"), ERROR_PERMANENT),
+    (PermissionError("nota.pdf"), ERROR_PERMANENT),
+    (ValueError("Texto muito longo para processamento"), ERROR_PERMANENT),
+])
+def test_classify_error(error, kind):
+    assert classify_error(error) == kind
+
+
+@pytest.mark.parametrize("attempt", range(1, 10))
+def test_backoff_stays_within_jitter_bounds(attempt, monkeypatch):
+    """Atraso entre metade e o teto exponencial (limitado por max_delay)"""
+    ceiling = min(100, 2 * 2 ** (attempt - 1))
+    monkeypatch.setattr(retry_policy.random, "uniform", lambda low, high: low)
+    assert compute_backoff(attempt, base_delay=2, max_delay=100) == ceiling / 2
+    monkeypatch.setattr(retry_policy.random, "uniform", lambda low, high: high)
+    assert compute_backoff(attempt, base_delay=2, max_delay=100) == ceiling
+
+
+def load(job_id):
+    db = SessionLocal()
+    try:
+        return db.query(TextProcessingJob).filter_by(job_id=job_id).one()
+    finally:
+        db.close()
+
+
+def test_transient_failure_is_rescheduled_until_attempts_run_out(database, monkeypatch):
+    """Falhas transitórias voltam com backoff; a última tentativa vai para a dead-letter"""
+    monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 3)
+    job_id = create_job()
+    error = ConnectionResetError("conexão perdida")
+
+    for attempt in range(1, 3):
+        before = datetime.utcnow()
+        update_job(job_id, lambda job: record_failure(job, error))
+        job = load(job_id)
+        assert job.status == ProcessingStatus.FAILED
+        assert job.retry_count == attempt
+        assert job.next_attempt_at > before
+
+    update_job(job_id, lambda job: record_failure(job, error))
+    job = load(job_id)
+    assert job.status == ProcessingStatus.DEAD_LETTER
+    assert job.retry_count == 3
+
+
+def test_permanent_failure_goes_straight_to_dead_letter(database):
+    job_id = create_job()
+    update_job(job_id, lambda job: record_failure(job, FileNotFoundError("origem.pdf")))
+    job = load(job_id)
+    assert job.status == ProcessingStatus.DEAD_LETTER
+    assert job.error_kind == ERROR_PERMANENT
+
+
+def test_requeued_dead_letters_are_dispatched_again(database, monkeypatch):
+    """O requeue zera as tentativas e espalha os jobs; o agendador os retoma quando vencem"""
+    resumed = []
+    monkeypatch.setattr(retry_scheduler_module, "resume_job", lambda *args: resumed.append(args))
+    job_ids = [create_job() for _ in range(3)]
+    for job_id in job_ids:
+        update_job(job_id, lambda job: record_failure(job, ValueError("inválido")))
+    other = create_job(user_id="u2")
+    update_job(other, lambda job: record_failure(job, ValueError("inválido")))
+
+    scheduler = RetryScheduler(batch_size=10, interval_seconds=5)
+    before = datetime.utcnow()
+    assert scheduler.requeue_dead_letters("u1") == job_ids
+
+    jobs = [load(job_id) for job_id in job_ids]
+    assert all(job.status == ProcessingStatus.FAILED and job.retry_count == 0 for job in jobs)
+    # Espalhados em até um intervalo do agendador
+    assert all(before <= job.next_attempt_at <= before + timedelta(seconds=6) for job in jobs)
+    assert load(other).status == ProcessingStatus.DEAD_LETTER
+
+    for job_id in job_ids:
+        update_job(job_id, lambda job: setattr(job, "next_attempt_at", datetime.utcnow() - timedelta(seconds=1)))
+    assert sorted(scheduler.dispatch_due_jobs()) == sorted(job_ids)
+    assert sorted(args[0] for args in resumed) == sorted(job_ids)
+    assert all(load(job_id).status == ProcessingStatus.QUEUED for job_id in job_ids)
+    assert scheduler.dispatch_due_jobs() == []
@@ -0,0 +1,101 @@
+import asyncio
+
+from app.services.vault_events import (
+    CREATED,
+    DELETED,
+    MODIFIED,
+    MOVED,
+    SelfWriteFilter,
+    VaultEvent,
+    VaultEventPipeline,
+)
+
+
+async def _run(pipeline, raw_events, gap=0.0, settle=0.3):
+    """Envia os eventos brutos e devolve os entregues aos consumidores"""
+    delivered = []
+
+    async def handler(event):
+        delivered.append(event)
+
+    pipeline.subscribe(handler)
+    pipeline.start(asyncio.get_running_loop())
+    await asyncio.sleep(0)
+    for event in raw_events:
+        pipeline.push(*event)
+        await asyncio.sleep(gap)
+    await asyncio.sleep(settle)
+    pipeline.stop()
+    return delivered
+
+
+def make_pipeline(**options):
+    return VaultEventPipeline(SelfWriteFilter(), **{"debounce_seconds": 0.05, "max_delay_seconds": 5, **options})
+
+
+def test_burst_of_events_on_one_path_is_debounced():
+    """Salvamentos seguidos da mesma nota viram uma única alteração"""
+    events = [(MODIFIED, "/vault/nota.md")] * 5 + [(MODIFIED, "/vault/outra.md")]
+    delivered = asyncio.run(_run(make_pipeline(), events, gap=0.01))
+    assert delivered == [VaultEvent(MODIFIED, "/vault/nota.md"), VaultEvent(MODIFIED, "/vault/outra.md")]
+
+
+def test_continuous_changes_are_emitted_after_max_delay():
+    """Caminho alterado sem parar não fica retido além do atraso máximo"""
+    events = [(MODIFIED, "/vault/nota.md")] * 20
+    delivered = asyncio.run(_run(make_pipeline(max_delay_seconds=0.1), events, gap=0.02, settle=0.1))
+    assert len(delivered) >= 3
+    assert all(event == VaultEvent(MODIFIED, "/vault/nota.md") for event in delivered)
+
+
+def test_related_events_are_coalesced():
+    """Criação, movimentação e remoção na mesma janela viram o efeito final"""
+    events = [
+        # Criada e editada: criação
+        (CREATED, "/vault/nova.md"), (MODIFIED, "/vault/nova.md"),
+        # Criada e removida: nada
+        (CREATED, "/vault/temp.md"), (DELETED, "/vault/temp.md"),
+        # Movida e editada no destino: movimentação com a origem original
+        (MOVED, "/vault/b.md", "/vault/a.md"), (MODIFIED, "/vault/b.md"),
+        # Editada e movida duas vezes: uma movimentação da primeira origem
+        (MODIFIED, "/vault/x.md"), (MOVED, "/vault/y.md", "/vault/x.md"), (MOVED, "/vault/z.md", "/vault/y.md"),
+        # Removida e recriada (salvamento por substituição): alteração
+        (DELETED, "/vault/salva.md"), (CREATED, "/vault/salva.md"),
+    ]
+    delivered = asyncio.run(_run(make_pipeline(), events))
+    assert sorted(delivered, key=lambda event: event.path) == [
+        VaultEvent(MOVED, "/vault/b.md", "/vault/a.md"),
+        VaultEvent(CREATED, "/vault/nova.md"),
+        VaultEvent(MODIFIED, "/vault/salva.md"),
+        VaultEvent(MOVED, "/vault/z.md", "/vault/x.md"),
+    ]
+
+
+def test_own_writes_are_suppressed_until_the_user_edits(tmp_path):
+    """O eco de uma escrita do serviço é descartado; a edição seguinte do usuário é entregue"""
+    note = tmp_path / "nota.md"
+    events_pipeline = make_pipeline()
+    events_pipeline.write_filter.expect(note, "gravada pelo serviço")
+    note.write_text("gravada pelo serviço", encoding="utf-8")
+
+    async def scenario():
+        delivered = []
+
+        async def handler(event):
+            delivered.append(event)
+
+        events_pipeline.subscribe(handler)
+        events_pipeline.start(asyncio.get_running_loop())
+        await asyncio.sleep(0)
+        events_pipeline.push(CREATED, str(note))
+        events_pipeline.push(MODIFIED, str(note))
+        await asyncio.sleep(0.3)
+        assert delivered == []
+
+        note.write_text("editada no Obsidian", encoding="utf-8")
+        events_pipeline.push(MODIFIED, str(note))
+        await asyncio.sleep(0.3)
+        events_pipeline.stop()
+        return delivered
+
+    assert asyncio.run(scenario()) == [VaultEvent(MODIFIED, str(note))]
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from app.services.vault_index import VaultIndex
+from app.services.vault_scanner import VaultScanner
+
+
+def write_note(folder, name, body, mtime):
+    path = folder / f"{name}.md"
+    path.write_text(f"---\ntitle: {name}\n---\n{body}\n", encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+@pytest.fixture
+def index(tmp_path):
+    return VaultIndex(
+        path=str(tmp_path / "vault_index.db"),
+        max_ranked=3,
+        scanner=VaultScanner(max_workers=2, patterns=[])
+    )
+
+
+@pytest.fixture
+def vaults(tmp_path):
+    small, large = tmp_path / "pequeno", tmp_path / "grande"
+    small.mkdir()
+    large.mkdir()
+    # Indexadas em ordem de nome; o mtime segue a ordem inversa
+    for i in range(5):
+        write_note(large, f"nota{i}", "projeto comum", mtime=1_700_000_000 - i * 60)
+    write_note(small, "unica", "projeto isolado", mtime=1_700_000_000)
+    write_note(small, "outra", "sem relação", mtime=1_700_000_000)
+    return small, large
+
+
+def test_candidate_limit_counts_only_the_queried_vault(index, vaults):
+    """Notas de outros vaults não empurram a busca para o ranking por recência"""
+    small, large = vaults
+    index.ensure_built(large)
+
+    result = index.search(small, "projeto")
+    assert result["ranking"] == "bm25"
+    assert [note["title"] for note in result["results"]] == ["unica"]
+
+
+def test_recent_ranking_orders_by_note_mtime(index, vaults):
+    """Acima de max_ranked as notas vêm por mtime, não pela ordem de indexação"""
+    small, large = vaults
+    index.ensure_built(small)
+    write_note(large, "nota3", "projeto comum editado", mtime=1_700_001_000)
+    index.ensure_built(large)
+
+    result = index.search(large, "projeto", limit=3)
+    assert result["ranking"] == "recent"
+    assert [note["title"] for note in result["results"]] == ["nota3", "nota0", "nota1"]
+    assert all(note["snippet"] and note["score"] >= 0 for note in result["results"])
+    assert all(note["path"].startswith(str(large.resolve())) for note in result["results"])
+
+
+def test_unwatched_vault_is_refreshed_when_queried(index, vaults):
+    """Vaults sem watchdog são reverificados por mtime nas consultas, no máximo a cada refresh_seconds"""
+    small, _ = vaults
+    assert [note["title"] for note in index.search(small, "projeto")["results"]] == ["unica"]
+
+    write_note(small, "nova", "projeto recente", mtime=1_700_000_500)
+    (small / "unica.md").unlink()
+
+    # Dentro do intervalo o índice atual é usado
+    index.refresh_seconds = 60
+    assert [note["title"] for note in index.search(small, "projeto")["results"]] == ["unica"]
+
+    index.refresh_seconds = 0
+    assert [note["title"] for note in index.search(small, "projeto")["results"]] == ["nova"]
+    assert [note["name"] for note in index.recent_notes(small, [""])] == ["nova", "outra"]
+
+
+def test_watched_vault_is_not_rescanned_on_queries(index, vaults):
+    """Com o watchdog ativo o índice é mantido pelos eventos: a consulta não varre o vault"""
+    small, _ = vaults
+    index.refresh_seconds = 0
+    index.watch(small)
+    index.ensure_built(small)
+
+    write_note(small, "nova", "projeto recente", mtime=1_700_000_500)
+    assert [note["title"] for note in index.search(small, "projeto")["results"]] == ["unica"]
+
+    index.unwatch(small)
+    assert {note["title"] for note in index.search(small, "projeto")["results"]} == {"unica", "nova"}
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.services.vault_io import VaultIOExecutor
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_operations_are_bounded_and_measured_per_operation():
+    """No máximo max_workers operações simultâneas; fila e duração medidas por operação"""
+    executor = VaultIOExecutor(max_workers=2)
+    running, peak, threads = [0], [0], set()
+    lock = threading.Lock()
+
+    def slow_stat(value):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            threads.add(threading.current_thread().name)
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return value
+
+    queued_before = sample("obsidian_ai_vault_io_queue_seconds_count", operation="test_stat")
+    waited_before = sample("obsidian_ai_vault_io_queue_seconds_sum", operation="test_stat")
+    duration_before = sample("obsidian_ai_vault_io_duration_seconds_sum", operation="test_stat")
+
+    async def scenario():
+        return await asyncio.gather(*(executor.run(slow_stat, i, operation="test_stat") for i in range(6)))
+
+    try:
+        assert asyncio.run(scenario()) == list(range(6))
+    finally:
+        executor.shutdown()
+
+    assert peak[0] == 2
+    assert all(name.startswith("vault-io") for name in threads)
+    assert sample("obsidian_ai_vault_io_queue_seconds_count", operation="test_stat") - queued_before == 6
+    # 6 operações de 50ms em 2 threads: as últimas esperam na fila
+    assert sample("obsidian_ai_vault_io_queue_seconds_sum", operation="test_stat") - waited_before > 0.1
+    assert sample("obsidian_ai_vault_io_duration_seconds_sum", operation="test_stat") - duration_before >= 0.3
+    assert sample("obsidian_ai_vault_io_pending") == 0
+
+
+def test_errors_propagate_and_release_the_pending_gauge():
+    executor = VaultIOExecutor(max_workers=1)
+
+    def missing():
+        raise FileNotFoundError("nota.md")
+
+    try:
+        with pytest.raises(FileNotFoundError):
+            asyncio.run(executor.run(missing, operation="test_read"))
+    finally:
+        executor.shutdown()
+    assert sample("obsidian_ai_vault_io_duration_seconds_count", operation="test_read") == 1
+    assert sample("obsidian_ai_vault_io_pending") == 0
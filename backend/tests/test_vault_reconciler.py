@@ -0,0 +1,144 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.database import SessionLocal
+from app.models.text_processing import ProcessingStatus, TextProcessingJob
+from app.services.vault_events import DELETED, VaultEvent
+from app.services.vault_index import VaultIndex
+from app.services.vault_reconciler import VaultReconciler
+from app.services.vault_scanner import VaultScanner
+
+
+def write_note(path, body, job_id=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    frontmatter = f"job_id: {job_id}\n" if job_id else ""
+    path.write_text(f"---\ntitle: {path.stem}\n{frontmatter}---\n{body}\n", encoding="utf-8")
+    return path
+
+
+def synced_job(file_path, content_hash=None, synced_at=None):
+    """Job já sincronizado com a nota em file_path"""
+    db = SessionLocal()
+    job = TextProcessingJob(
+        job_id=str(uuid.uuid4()),
+        user_id="u1",
+        original_text="texto",
+        category="inbox",
+        status=ProcessingStatus.SYNCED,
+        obsidian_file_path=str(file_path),
+        note_content_hash=content_hash,
+        synced_at=synced_at or datetime.utcnow() - timedelta(hours=1)
+    )
+    db.add(job)
+    db.commit()
+    job_id = job.job_id
+    db.close()
+    return job_id
+
+
+def load(job_id):
+    db = SessionLocal()
+    try:
+        return db.query(TextProcessingJob).filter_by(job_id=job_id).one()
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def vault(tmp_path):
+    folder = tmp_path / "vault"
+    folder.mkdir()
+    return folder.resolve()
+
+
+@pytest.fixture
+def reconciler(tmp_path, database):
+    index = VaultIndex(path=str(tmp_path / "vault_index.db"), scanner=VaultScanner(max_workers=2, patterns=[]))
+    return VaultReconciler(index)
+
+
+def test_moved_note_is_found_by_job_id(reconciler, vault):
+    """Nota movida no Obsidian: o job passa a apontar para o novo caminho"""
+    job_id = synced_job(vault / "Inbox" / "nota.md")
+    write_note(vault / "Projetos" / "nota.md", "corpo", job_id=job_id)
+
+    stats = asyncio.run(reconciler.rescan(vault))
+    assert stats["moved"] == 1 and stats["missing"] == 0
+    assert load(job_id).obsidian_file_path == str(vault / "Projetos" / "nota.md")
+
+
+def test_edited_note_updates_hash_and_edit_time(reconciler, vault):
+    """Conteúdo alterado fora do serviço: novo hash e note_edited_at preenchido"""
+    path = vault / "Inbox" / "nota.md"
+    job_id = synced_job(path)
+    write_note(path, "corpo", job_id=job_id)
+    asyncio.run(reconciler.rescan(vault))
+    original = load(job_id).note_content_hash
+    assert original and load(job_id).note_edited_at is None
+
+    write_note(path, "corpo editado no Obsidian", job_id=job_id)
+    stats = asyncio.run(reconciler.rescan(vault))
+    assert stats["edited"] == 1
+    job = load(job_id)
+    assert job.note_content_hash != original
+    assert job.note_edited_at is not None
+
+
+def test_legacy_note_without_job_id_is_matched_by_path(reconciler, vault):
+    """Notas antigas, sem job_id no frontmatter, são associadas pelo caminho gravado"""
+    kept = write_note(vault / "Inbox" / "antiga.md", "corpo")
+    legacy = synced_job(kept)
+    removed = synced_job(vault / "Inbox" / "removida.md")
+
+    stats = asyncio.run(reconciler.rescan(vault))
+    assert stats["missing"] == 1
+    assert load(legacy).obsidian_file_path == str(kept)
+    assert load(legacy).note_content_hash
+    assert load(removed).obsidian_file_path is None
+
+
+def test_deleted_folder_marks_its_notes_missing(reconciler, vault):
+    """Pasta removida: todos os jobs com notas dentro dela ficam sem caminho"""
+    inside = [synced_job(vault / "Arquivo" / f"nota{i}.md") for i in range(2)]
+    outside = synced_job(vault / "Arquivo2" / "nota.md")
+
+    event = VaultEvent(kind=DELETED, path=str(vault / "Arquivo"), is_directory=True)
+    asyncio.run(reconciler.handle_event(vault, event))
+    assert [load(job_id).obsidian_file_path for job_id in inside] == [None, None]
+    assert load(outside).obsidian_file_path == str(vault / "Arquivo2" / "nota.md")
+
+
+def test_empty_vault_does_not_touch_jobs(reconciler, vault):
+    """Vault sem nenhuma nota (provavelmente desmontado) não marca os jobs como ausentes"""
+    job_id = synced_job(vault / "Inbox" / "nota.md", content_hash="abc")
+
+    stats = asyncio.run(reconciler.rescan(vault))
+    assert stats["missing"] == 0
+    job = load(job_id)
+    assert job.obsidian_file_path == str(vault / "Inbox" / "nota.md")
+    assert job.note_content_hash == "abc"
+
+
+def test_job_synced_during_the_scan_is_not_marked_missing(reconciler, vault, monkeypatch):
+    """Nota gravada depois do snapshot do índice não é tratada como removida"""
+    write_note(vault / "Inbox" / "outra.md", "corpo")
+    late_path = vault / "Inbox" / "nova.md"
+    late = []
+    linked_notes = reconciler.index.linked_notes
+
+    def linked_notes_then_sync(vault_path):
+        notes = linked_notes(vault_path)
+        # Sincronização concluída entre o snapshot e a reconciliação
+        late.append(synced_job(late_path, content_hash="h", synced_at=datetime.utcnow()))
+        write_note(late_path, "corpo", job_id=late[0])
+        return notes
+
+    monkeypatch.setattr(reconciler.index, "linked_notes", linked_notes_then_sync)
+    stats = asyncio.run(reconciler.rescan(vault))
+    assert stats["missing"] == 0 and stats["skipped"] == 1
+    job = load(late[0])
+    assert job.obsidian_file_path == str(late_path)
+    assert job.note_content_hash == "h"
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+from app.services.vault_index import VaultIndex
+from app.services.vault_registry import VaultSyncRegistry
+from app.services.vault_writer import VaultWriter
+
+
+def test_each_vault_has_its_own_writer_and_stop_flushes_all(tmp_path):
+    """Vaults diferentes gravam por escritores próprios; stop() grava o pendente de todos"""
+    first, second = tmp_path / "a", tmp_path / "b"
+    first.mkdir()
+    second.mkdir()
+    registry = VaultSyncRegistry(VaultIndex(path=str(tmp_path / "index.db")), lambda: VaultWriter(fsync=False))
+
+    async def scenario():
+        contexts = [
+            await registry.get(str(first)),
+            await registry.get(str(second)),
+            await registry.get(str(tmp_path / "a" / ".." / "a"))
+        ]
+        futures = [
+            contexts[0].writer.submit(first / "📥 Inbox" / "um.md", "um"),
+            contexts[1].writer.submit(second / "📥 Inbox" / "dois.md", "dois")
+        ]
+        return contexts, futures
+
+    (context_a, context_b, same_as_a), futures = asyncio.run(scenario())
+    assert context_a is same_as_a
+    assert context_a.writer is not context_b.writer
+
+    registry.stop()
+    assert all(future.done() and future.exception() is None for future in futures)
+    assert (first / "📥 Inbox" / "um.md").read_text() == "um"
+    assert (second / "📥 Inbox" / "dois.md").read_text() == "dois"
+    assert context_a.writer._thread is None and context_b.writer._thread is None
+
+
+class SlowWriter(VaultWriter):
+    """Escritor cujo encerramento demora (vault em rede)"""
+
+    def stop(self, timeout: float = 10.0):
+        time.sleep(0.3)
+        super().stop(timeout)
+
+
+def test_writers_are_stopped_in_parallel(tmp_path):
+    """A espera no encerramento é a do escritor mais lento, não a soma"""
+    registry = VaultSyncRegistry(VaultIndex(path=str(tmp_path / "index.db")), lambda: SlowWriter(fsync=False))
+    vaults = [tmp_path / name for name in ("a", "b", "c")]
+    for vault in vaults:
+        vault.mkdir()
+
+    async def scenario():
+        for vault in vaults:
+            await registry.get(str(vault))
+
+    asyncio.run(scenario())
+    started = time.perf_counter()
+    registry.stop()
+    assert time.perf_counter() - started < 0.6
@@ -0,0 +1,62 @@
+import pytest
+
+from app.services.vault_scanner import IGNORE_FILE, IgnoreRules, VaultScanner
+
+
+@pytest.mark.parametrize("path, is_dir, ignored", [
+    ("rascunho.tmp.md", False, True),
+    ("manter.tmp.md", False, False),
+    ("Raiz.md", False, True),
+    ("pasta/Raiz.md", False, False),
+    ("docs/draft.md", False, True),
+    ("docs/a/b/draft.md", False, True),
+    ("build", True, True),
+    ("build", False, False),
+    ("a/b", True, True),
+    ("z/a/b", True, False),
+])
+def test_ignore_rules(path, is_dir, ignored):
+    rules = IgnoreRules([
+        "# comentário",
+        "*.tmp.md",
+        "!manter.tmp.md",
+        "/Raiz.md",
+        "docs/**/draft.md",
+        "build/",
+        "a/b/",
+    ])
+    assert rules.is_ignored(path, is_dir) is ignored
+
+
+@pytest.fixture
+def vault(tmp_path):
+    for folder in ["", "projetos", "projetos/2026", "templates", ".obsidian", ".trash"]:
+        (tmp_path / folder).mkdir(parents=True, exist_ok=True)
+        for i in range(3):
+            (tmp_path / folder / f"nota{i}.md").write_text("x")
+        (tmp_path / folder / "imagem.png").write_text("x")
+    return tmp_path
+
+
+def test_iter_notes_matches_walk_and_skips_internal_folders(vault):
+    scanner = VaultScanner(max_workers=4, patterns=[])
+    notes = {path: size for path, _, size in scanner.iter_notes(str(vault))}
+
+    expected = {
+        path.relative_to(vault).as_posix()
+        for path in vault.rglob("*.md")
+        if path.relative_to(vault).parts[0] not in (".obsidian", ".trash")
+    }
+    assert set(notes) == expected
+    assert set(notes.values()) == {1}
+
+
+def test_count_notes_with_limit_and_ignore_file(vault):
+    scanner = VaultScanner(max_workers=4, patterns=[])
+    assert scanner.count_notes(str(vault)) == 12
+    assert scanner.count_notes(str(vault), limit=5) == 5
+
+    (vault / IGNORE_FILE).write_text("templates/\n")
+    assert scanner.count_notes(str(vault)) == 9
+    assert scanner.is_ignored(str(vault), "templates/nota0.md")
+    assert not scanner.is_ignored(str(vault), "projetos/nota0.md")
@@ -0,0 +1,86 @@
+import errno
+import os
+import threading
+
+import pytest
+
+from app.services.vault_writer import VaultWriter
+
+
+@pytest.fixture
+def writer():
+    writer = VaultWriter(batch_size=50, fsync=True)
+    yield writer
+    writer.stop()
+
+
+def leftovers(folder):
+    return [path.name for path in folder.rglob(".*.tmp")]
+
+
+def test_writes_submitted_during_a_batch_form_the_next_one(writer, tmp_path, monkeypatch):
+    """Notas que chegam enquanto um lote é gravado são gravadas juntas no lote seguinte"""
+    batches = []
+    started, release = threading.Event(), threading.Event()
+    commit = writer._commit
+
+    def recording_commit(batch):
+        batches.append([item.path.name for item in batch])
+        if len(batches) == 1:
+            started.set()
+            release.wait(5)
+        commit(batch)
+
+    monkeypatch.setattr(writer, "_commit", recording_commit)
+    first = writer.submit(tmp_path / "Inbox" / "primeira.md", "primeira")
+    assert started.wait(5)
+    futures = [writer.submit(tmp_path / "Inbox" / f"nota{i}.md", f"nota {i}") for i in range(9)]
+    release.set()
+
+    assert first.result(5) == str(tmp_path / "Inbox" / "primeira.md")
+    assert [future.result(5) for future in futures] == [str(tmp_path / "Inbox" / f"nota{i}.md") for i in range(9)]
+    assert batches == [["primeira.md"], [f"nota{i}.md" for i in range(9)]]
+    assert (tmp_path / "Inbox" / "nota8.md").read_text() == "nota 8"
+    assert leftovers(tmp_path) == []
+
+
+def test_failures_reach_each_waiter_and_spare_the_other_notes(writer, tmp_path):
+    """Cada nota com erro recebe a própria exceção; as demais são gravadas"""
+    (tmp_path / "arquivo").write_text("não é pasta")
+    futures = [
+        writer.submit(tmp_path / "arquivo" / "a.md", "a"),
+        writer.submit(tmp_path / "Inbox" / "b.md", "b"),
+        writer.submit(tmp_path / "arquivo" / "c.md", "c"),
+        writer.submit(tmp_path / "Inbox" / "d.md", "d"),
+    ]
+    writer.stop()
+
+    assert isinstance(futures[0].exception(5), OSError)
+    assert isinstance(futures[2].exception(5), OSError)
+    assert futures[1].result(5) and futures[3].result(5)
+    assert sorted(path.name for path in (tmp_path / "Inbox").iterdir()) == ["b.md", "d.md"]
+    assert leftovers(tmp_path) == []
+
+
+def test_failed_write_leaves_previous_version_and_no_partial_file(writer, tmp_path, monkeypatch):
+    """Disco cheio no meio da escrita: o destino mantém a versão anterior e o temporário é removido"""
+    note = tmp_path / "Inbox" / "nota.md"
+    note.parent.mkdir()
+    note.write_text("versão anterior")
+    real_write = os.write
+
+    def disk_full(fd, data):
+        if bytes(data).startswith(b"nova"):
+            real_write(fd, bytes(data)[:4])
+            raise OSError(errno.ENOSPC, "No space left on device")
+        return real_write(fd, data)
+
+    monkeypatch.setattr(os, "write", disk_full)
+    failed = writer.submit(note, "nova versão " * 1000)
+    ok = writer.submit(tmp_path / "Inbox" / "outra.md", "outra")
+
+    with pytest.raises(OSError):
+        failed.result(5)
+    assert ok.result(5)
+    assert note.read_text() == "versão anterior"
+    assert leftovers(tmp_path) == []
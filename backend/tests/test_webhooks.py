@@ -0,0 +1,198 @@
+import asyncio
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.webhook import WebhookSubscription
+from app.services.webhooks import (
+    SIGNATURE_HEADER,
+    TIMESTAMP_HEADER,
+    WebhookDispatcher,
+    event_for_snapshot,
+    sign_payload,
+)
+
+
+class WebhookReceiver:
+    """Servidor HTTP local que registra as entregas recebidas"""
+
+    def __init__(self, responses=None):
+        self.requests = []
+        self.responses = list(responses or [])
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                receiver.requests.append((dict(self.headers), body))
+                status = receiver.responses.pop(0) if receiver.responses else 200
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def subscription(database, monkeypatch):
+    """Cria assinaturas no banco temporário do teste (o receptor local exige endereços privados)"""
+    monkeypatch.setattr(settings, "WEBHOOK_ALLOW_PRIVATE_URLS", True)
+    db = SessionLocal()
+
+    def create(url, events=("job.synced", "job.failed")):
+        item = WebhookSubscription(
+            user_id=f"test-{uuid.uuid4().hex[:12]}",
+            url=url,
+            secret=uuid.uuid4().hex
+        )
+        item.set_events(list(events))
+        db.add(item)
+        db.commit()
+        db.refresh(item)
+        return item
+
+    yield create
+    db.close()
+
+
+async def _dispatch(dispatcher, events, wait_for=lambda: True, timeout=5.0):
+    dispatcher.start()
+    try:
+        for user_id, event_type, data in events:
+            dispatcher.notify(user_id, event_type, data)
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not wait_for() and asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.02)
+    finally:
+        await dispatcher.stop()
+
+
+def test_events_are_batched_and_signed(subscription):
+    """Eventos da mesma janela chegam num único POST assinado com HMAC"""
+    with WebhookReceiver() as receiver:
+        sub = subscription(receiver.url)
+        dispatcher = WebhookDispatcher(batch_window_seconds=0.2)
+        events = [
+            (sub.user_id, "job.synced", {"job_id": f"job-{i}", "user_id": sub.user_id, "status": "synced"})
+            for i in range(3)
+        ]
+        asyncio.run(_dispatch(dispatcher, events, wait_for=lambda: receiver.requests))
+
+    assert len(receiver.requests) == 1
+    headers, body = receiver.requests[0]
+    assert headers[SIGNATURE_HEADER] == sign_payload(sub.secret, headers[TIMESTAMP_HEADER], body)
+
+    payload = json.loads(body)
+    assert [event["data"]["job_id"] for event in payload["events"]] == ["job-0", "job-1", "job-2"]
+    assert all("user_id" not in event["data"] for event in payload["events"])
+
+
+def test_failed_delivery_is_retried(subscription):
+    """Erro 5xx gera nova tentativa do mesmo lote"""
+    with WebhookReceiver(responses=[503]) as receiver:
+        sub = subscription(receiver.url)
+        dispatcher = WebhookDispatcher(batch_window_seconds=0.05, retry_base_delay=0.05)
+        events = [(sub.user_id, "job.failed", {"job_id": "job-x", "status": "failed"})]
+        asyncio.run(_dispatch(dispatcher, events, wait_for=lambda: len(receiver.requests) >= 2))
+
+    assert len(receiver.requests) == 2
+    first, second = (json.loads(body) for _, body in receiver.requests)
+    assert first["delivery_id"] == second["delivery_id"]
+
+
+def test_unsubscribed_events_are_not_delivered(subscription):
+    """Apenas eventos assinados são entregues"""
+    with WebhookReceiver() as receiver:
+        sub = subscription(receiver.url, events=["job.failed"])
+        dispatcher = WebhookDispatcher(batch_window_seconds=0.05)
+        events = [(sub.user_id, "job.synced", {"job_id": "job-y", "status": "synced"})]
+        asyncio.run(_dispatch(dispatcher, events, wait_for=lambda: False, timeout=0.3))
+
+    assert receiver.requests == []
+
+
+def test_event_sent_right_before_stop_is_delivered(subscription):
+    """stop() durante a janela de agrupamento entrega o lote parcial em vez de descartá-lo"""
+    with WebhookReceiver() as receiver:
+        sub = subscription(receiver.url)
+        dispatcher = WebhookDispatcher(batch_window_seconds=1.0)
+
+        async def scenario():
+            dispatcher.start()
+            dispatcher.notify(sub.user_id, "job.synced", {"job_id": "job-z", "status": "synced"})
+            await asyncio.sleep(0.1)
+            await dispatcher.stop()
+
+        asyncio.run(scenario())
+
+    assert len(receiver.requests) == 1
+    payload = json.loads(receiver.requests[0][1])
+    assert [event["data"]["job_id"] for event in payload["events"]] == ["job-z"]
+
+
+def test_private_address_is_blocked_at_delivery(subscription, monkeypatch):
+    """O endereço é verificado de novo na entrega: assinatura antiga que passou a resolver para a rede interna não recebe"""
+    with WebhookReceiver() as receiver:
+        sub = subscription(receiver.url)
+        monkeypatch.setattr(settings, "WEBHOOK_ALLOW_PRIVATE_URLS", False)
+        dispatcher = WebhookDispatcher(batch_window_seconds=0.05, retry_base_delay=0.05)
+        events = [(sub.user_id, "job.synced", {"job_id": "job-w", "status": "synced"})]
+        asyncio.run(_dispatch(dispatcher, events, wait_for=lambda: False, timeout=0.3))
+
+    assert receiver.requests == []
+    db = SessionLocal()
+    stored = db.query(WebhookSubscription).filter_by(id=sub.id).one()
+    assert stored.last_error and stored.consecutive_failures == 1
+    db.close()
+
+
+def test_failed_event_only_for_terminal_failures():
+    """Falha com nova tentativa agendada não publica job.failed; a dead-letter publica"""
+    assert event_for_snapshot({"status": "failed", "next_attempt_at": "2026-01-01T00:00:00"}) is None
+    assert event_for_snapshot({"status": "failed", "next_attempt_at": None}) == "job.failed"
+    assert event_for_snapshot({"status": "dead_letter", "next_attempt_at": None}) == "job.failed"
+    assert event_for_snapshot({"status": "synced", "next_attempt_at": None}) == "job.synced"
+    assert event_for_snapshot({"status": "processing", "next_attempt_at": None}) is None
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1:8080/hook",
+    "http://localhost/hook",
+    "http://169.254.169.254/latest/meta-data",
+    "http://10.0.0.5/hook",
+    "http://192.168.1.10/hook",
+    "http://[::1]/hook",
+])
+def test_private_webhook_urls_are_rejected(api, auth, url):
+    response = api.post("/api/webhooks", json={"url": url}, headers=auth("u1"))
+    assert response.status_code == 422
+    assert api.get("/api/webhooks", headers=auth("u1")).json()["webhooks"] == []
+
+
+def test_private_webhook_urls_allowed_by_setting(api, auth, monkeypatch):
+    """WEBHOOK_ALLOW_PRIVATE_URLS libera endereços internos; endereços públicos são sempre aceitos"""
+    public = api.post("/api/webhooks", json={"url": "https://93.184.216.34/hook"}, headers=auth("u1"))
+    assert public.status_code == 200
+
+    monkeypatch.setattr(settings, "WEBHOOK_ALLOW_PRIVATE_URLS", True)
+    private = api.post("/api/webhooks", json={"url": "http://127.0.0.1:8080/hook"}, headers=auth("u1"))
+    assert private.status_code == 200
+    assert len(api.get("/api/webhooks", headers=auth("u1")).json()["webhooks"]) == 2